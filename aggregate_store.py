@@ -0,0 +1,310 @@
+"""Append-only aggregates behind the time-series and distribution charts.
+
+Scraped posts only ever append, so instead of regrouping the whole history on
+every refresh an ``AggregateStore`` keeps running totals and folds new posts
+into them:
+
+* per-day score sums and post counts (date range of the summary stats);
+* per-month counts by ``sentiment_category`` (monthly breakdown);
+* fixed-width confidence-score bin counts (histogram);
+* a ``time_pyramid.TimePyramid`` of per-hour score sums, post counts and
+  score sketches, rolled up to days, weeks and months (timeline, volume);
+* a score quantile sketch per ``broad_category`` (score quantiles in the
+  summary stats);
+* word counters per broad category and day (word analysis);
+* post counts per category pair, the score sum and the first post of each
+  category (distribution chart, summary stats);
+* a length x score count grid (density view) and, per sentiment_category, a
+  uniform reservoir sample of at most ``sample_size`` points (sampled
+  scatter), plus every point while there are no more than ``sample_size``.
+
+New data arrives as prepared frames, raw record batches, chunks from
+``step_3_dashboard.iter_prepared_chunks`` or the tail of an NDJSON file, and
+costs time proportional to its own size. Every chart and
+``generate_summary_stats`` accept a store through their ``aggregates``
+argument, so a dataset can be charted chunk by chunk in memory bounded by the
+chunk size and ``sample_size``. Everything except the sampled scatter matches
+the in-memory charts exactly, apart from float rounding in the means.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+import step_3_dashboard as dashboard
+from data_sources import read_ndjson_tail
+from score_sketch import QuantileSketch
+from time_pyramid import TimePyramid
+from word_frequency import WordFrequencyIndex
+
+
+# Columns of the scatter's points; the full points also carry the hover text
+POINT_COLUMNS = ['timestamp', 'tweet_length', 'confidence_score', 'sentiment_category']
+TEXT_POINT_COLUMNS = POINT_COLUMNS + ['tweet', 'reasoning']
+
+
+class AggregateStore:
+    """Mergeable per-day, per-month and per-bin totals for a growing dataset"""
+
+    def __init__(self, stopwords=None, sample_size=None, seed=0, brand=None):
+        self.brand = brand or dashboard.DEFAULT_BRAND
+        if stopwords is None:
+            stopwords = dashboard.brand_stopwords(self.brand)
+        self.rows = 0
+        self.daily = {}  # 'YYYY-MM-DD' -> [score sum, post count]
+        self.monthly = {}  # ('YYYY-MM', sentiment_category) -> post count
+        self.score_counts, self.score_edges = dashboard.score_histogram([])
+        self.words = WordFrequencyIndex(stopwords=stopwords)
+        self.tail_offsets = {}  # NDJSON path -> bytes already ingested
+        self.categories = {}  # (broad_category, sentiment_category) -> post count
+        self.first_seen = {}  # sentiment_category -> earliest timestamp
+        self.score_sum = 0.0
+        self.time_pyramid = TimePyramid()
+        self.broad_sketches = {}  # broad_category -> QuantileSketch
+        self.sample_size = dashboard.SCATTER_MAX_POINTS if sample_size is None else sample_size
+        self.points = []  # every point's frame while rows <= sample_size, else None
+        self.samples = {}  # sentiment_category -> [posts seen, reservoir frame]
+        self.max_length = 0  # longest post, over all scores
+        self.length_scores = np.zeros((0, dashboard.DENSITY_BINS[1]), dtype=np.int64)  # [length, score row]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_frame(cls, df, stopwords=None):
+        """Build a store over an existing prepared frame, for the brand it is tagged with"""
+        if stopwords is None:
+            stopwords = dashboard.frame_stopwords(df)
+        store = cls(stopwords=stopwords, brand=dashboard.brand_of(df))
+        store.ingest_frame(df)
+        return store
+
+    @classmethod
+    def from_chunks(cls, chunks, stopwords=None, sample_size=None, brand=None):
+        """Build a store from prepared chunks, holding one chunk at a time"""
+        store = cls(stopwords=stopwords, sample_size=sample_size, brand=brand)
+        store.ingest_chunks(chunks)
+        return store
+
+    def copy(self):
+        """Independent copy, so a published store is never mutated in place"""
+        return copy.deepcopy(self)
+
+    def ingest_frame(self, df):
+        """Fold the rows of a prepared frame into the totals"""
+        if len(df) == 0:
+            return
+        self.rows += len(df)
+
+        daily = df.groupby('day', observed=True)['confidence_score'].agg(['sum', 'count'])
+        for day, score_sum, count in zip(daily.index, daily['sum'], daily['count']):
+            totals = self.daily.setdefault(str(day), [0.0, 0])
+            totals[0] += float(score_sum)
+            totals[1] += int(count)
+
+        monthly = df.groupby(['month', 'sentiment_category'], observed=True).size()
+        for (month, category), count in monthly.items():
+            key = (str(month), str(category))
+            self.monthly[key] = self.monthly.get(key, 0) + int(count)
+
+        counts, _ = dashboard.score_histogram(df['confidence_score'])
+        self.score_counts = self.score_counts + counts
+        self.words.add_frame(df)
+
+        pairs = df.groupby(['broad_category', 'sentiment_category'], observed=True).size()
+        for key, count in pairs.items():
+            key = tuple(str(part) for part in key)
+            self.categories[key] = self.categories.get(key, 0) + int(count)
+        first = df.groupby('sentiment_category', observed=True)['timestamp'].min()
+        self._merge_first_seen({str(category): moment for category, moment in first.items()})
+        self.score_sum += float(df['confidence_score'].sum())
+        self.time_pyramid.merge(TimePyramid.from_frame(df))
+        self._add_sketches(df, 'broad_category', self.broad_sketches)
+
+        self._add_points(df)
+        self._add_length_scores(df)
+
+    def ingest_chunks(self, chunks):
+        """Fold prepared chunks in one by one; only the current chunk is held in memory"""
+        for chunk in chunks:
+            self.ingest_frame(chunk)
+        return self
+
+    def ingest_records(self, records, batch_size=dashboard.STREAM_BATCH_SIZE):
+        """Prepare and ingest raw records; returns the prepared frame of the new rows"""
+        df = dashboard.prepare_data_stream(records, batch_size)
+        self.ingest_frame(df)
+        return df
+
+    def ingest_ndjson_tail(self, path, batch_size=dashboard.STREAM_BATCH_SIZE):
+        """Ingest the complete lines appended to an NDJSON file since the last call
+
+        Returns the prepared frame of the new rows. A trailing partial line is
+        left for the next call.
+        """
+        offset = self.tail_offsets.get(path, 0)
+        consumed, chunks = read_ndjson_tail(path, offset)
+        df = self.ingest_records(dashboard.iter_sentiment_records(chunks), batch_size)
+        self.tail_offsets[path] = offset + consumed
+        return df
+
+    def merge(self, other):
+        """Add another store's totals (e.g. from another shard) into this one"""
+        self.rows += other.rows
+        for day, (score_sum, count) in other.daily.items():
+            totals = self.daily.setdefault(day, [0.0, 0])
+            totals[0] += score_sum
+            totals[1] += count
+        for key, count in other.monthly.items():
+            self.monthly[key] = self.monthly.get(key, 0) + count
+        self.score_counts = self.score_counts + other.score_counts
+        self.words.merge(other.words)
+        for key, count in other.categories.items():
+            self.categories[key] = self.categories.get(key, 0) + count
+        self._merge_first_seen(other.first_seen)
+        self.score_sum += other.score_sum
+        self.time_pyramid.merge(other.time_pyramid)
+        for key, sketch in other.broad_sketches.items():
+            self.broad_sketches.setdefault(key, QuantileSketch()).merge(sketch)
+        if self.points is not None and other.points is not None:
+            self.points = self.points + other.points
+            self._trim_points()
+        else:
+            self.points = None
+        for category, (seen, reservoir) in other.samples.items():
+            self._merge_sample(category, seen, reservoir)
+        self._merge_length_scores(other.length_scores, other.max_length)
+        return self
+
+    def _merge_first_seen(self, first_seen):
+        for category, moment in first_seen.items():
+            if category not in self.first_seen or moment < self.first_seen[category]:
+                self.first_seen[category] = moment
+
+    @staticmethod
+    def _add_sketches(df, column, sketches):
+        for value, sketch in dashboard.score_sketches(df, column).items():
+            sketches.setdefault(value, QuantileSketch()).merge(sketch)
+
+    def _add_points(self, df):
+        if self.points is not None:
+            self.points.append(df[[c for c in TEXT_POINT_COLUMNS if c in df.columns]])
+            self._trim_points()
+        codes = df['sentiment_category'].cat.codes.to_numpy()
+        categories = df['sentiment_category'].cat.categories
+        for code in np.unique(codes):
+            positions = np.flatnonzero(codes == code)
+            seen = len(positions)
+            if seen > self.sample_size:
+                positions = np.sort(self._rng.choice(positions, self.sample_size, replace=False))
+            self._merge_sample(str(categories[code]), seen, df.iloc[positions][POINT_COLUMNS])
+
+    def _trim_points(self):
+        # Past sample_size posts the scatter is sampled, so the full points are dropped for good
+        if sum(len(frame) for frame in self.points) > self.sample_size:
+            self.points = None
+
+    def _merge_sample(self, category, seen, reservoir):
+        """Merge a uniform sample of ``seen`` posts into the category's reservoir, staying uniform"""
+        if category not in self.samples:
+            self.samples[category] = [seen, reservoir]
+            return
+        kept_seen, kept = self.samples[category]
+        size = min(kept_seen + seen, self.sample_size)
+        if kept_seen + seen <= self.sample_size:
+            merged = pd.concat([kept, reservoir])
+        else:
+            # How many of the size picks come from each side, as if drawn from all posts
+            from_kept = self._rng.hypergeometric(kept_seen, seen, size)
+            merged = pd.concat([
+                kept.iloc[np.sort(self._rng.choice(len(kept), from_kept, replace=False))],
+                reservoir.iloc[np.sort(self._rng.choice(len(reservoir), size - from_kept, replace=False))],
+            ])
+        self.samples[category] = [kept_seen + seen, merged]
+
+    def _add_length_scores(self, df):
+        lengths = df['tweet_length'].to_numpy(dtype='float64')
+        scores = df['confidence_score'].to_numpy(dtype='float64')
+        in_range = (scores >= 0) & (scores <= 1) & ~np.isnan(lengths)
+        grid = np.zeros((int(lengths[in_range].max()) + 1 if in_range.any() else 0, dashboard.DENSITY_BINS[1]), dtype=np.int64)
+        np.add.at(grid, (lengths[in_range].astype(np.int64), dashboard.density_score_rows(scores[in_range])), 1)
+        known = lengths[~np.isnan(lengths)]
+        self._merge_length_scores(grid, known.max() if len(known) else 0)
+
+    def _merge_length_scores(self, grid, max_length):
+        if len(grid) > len(self.length_scores):
+            self.length_scores = np.pad(self.length_scores, ((0, len(grid) - len(self.length_scores)), (0, 0)))
+        self.length_scores[:len(grid)] += grid
+        self.max_length = max(self.max_length, max_length)
+
+    def daily_frame(self):
+        """Per-day ``date``, mean ``confidence_score`` and post count (``tweet``), by date"""
+        days = sorted(self.daily)
+        sums = [self.daily[day][0] for day in days]
+        counts = [self.daily[day][1] for day in days]
+        return pd.DataFrame({
+            'date': pd.to_datetime(pd.Series(days, dtype=object)).dt.date,
+            'confidence_score': [s / c for s, c in zip(sums, counts)],
+            'tweet': counts,
+        })
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the store, for cache budgets"""
+        frames = [reservoir for _, reservoir in self.samples.values()] + list(self.points or [])
+        return (
+            sum(int(frame.memory_usage(index=True, deep=True).sum()) for frame in frames)
+            + self.length_scores.nbytes
+            + self.words.nbytes
+            + self.time_pyramid.nbytes
+            + sum(sketch.nbytes for sketch in self.broad_sketches.values())
+            # Small dicts: a few hundred bytes per day, month and category key
+            + 200 * (len(self.daily) + len(self.monthly) + len(self.categories))
+        )
+
+    def category_pair_counts(self):
+        """Post counts indexed by (``broad_category``, ``sentiment_category``)"""
+        index = pd.MultiIndex.from_tuples(list(self.categories), names=['broad_category', 'sentiment_category'])
+        return pd.Series(list(self.categories.values()), index=index, dtype='int64')
+
+    def category_counts(self):
+        """Posts per ``sentiment_category``, most first; ties in order of each category's first post"""
+        totals = {}
+        for (_, category), count in self.categories.items():
+            totals[category] = totals.get(category, 0) + count
+        order = sorted(totals, key=self.first_seen.get)
+        counts = pd.Series([totals[category] for category in order], index=order, dtype='int64')
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def points_frame(self):
+        """Every post's scatter point, by timestamp; only while ``rows <= sample_size``"""
+        if self.points is None:
+            raise ValueError('AggregateStore holds more posts than sample_size; use sample_frame')
+        if not self.points:
+            return pd.DataFrame(columns=TEXT_POINT_COLUMNS)
+        return pd.concat(self.points).sort_values('timestamp', kind='stable')
+
+    def sample_frame(self, max_points):
+        """About ``max_points`` points keeping each category's share, by timestamp"""
+        # Seeded per call, so re-rendering the same store draws the same points
+        rng = np.random.default_rng(0)
+        picks = []
+        for category, (seen, reservoir) in self.samples.items():
+            quota = dashboard.stratum_quota(max_points, seen, self.rows)
+            if quota < len(reservoir):
+                reservoir = reservoir.iloc[np.sort(rng.choice(len(reservoir), quota, replace=False))]
+            picks.append(reservoir)
+        if not picks:
+            return pd.DataFrame(columns=POINT_COLUMNS)
+        return pd.concat(picks).sort_values('timestamp', kind='stable')
+
+    def length_score_grid(self):
+        """``(counts, length edges, score edges)`` of the density view, as from ``np.histogram2d``"""
+        lengths, rows = np.nonzero(self.length_scores)
+        score_edges = np.linspace(0.0, 1.0, dashboard.DENSITY_BINS[1] + 1)
+        # Bin centres land back in their own bin, weighted by the count
+        centres = (score_edges[rows] + score_edges[rows + 1]) / 2
+        return dashboard.length_score_grid(lengths, centres, self.max_length, weights=self.length_scores[lengths, rows])
+
+    def monthly_frame(self):
+        """Long-form ``month``, ``sentiment_category``, ``count`` rows"""
+        rows = [(month, category, count) for (month, category), count in sorted(self.monthly.items())]
+        return pd.DataFrame(rows, columns=['month', 'sentiment_category', 'count'])
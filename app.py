@@ -1,20 +1,403 @@
-from flask import Flask, render_template
+from flask import Flask, Response, abort, g, jsonify, render_template, request
+import gzip
+import hashlib
+import importlib
 import os
-import json
-from urllib.parse import urlparse
-import step_3_dashboard as dashboard
-
-try:
-    import boto3  # type: ignore
-except Exception:  # pragma: no cover
-    boto3 = None  # type: ignore
-try:
-    import requests  # type: ignore
-except Exception:  # pragma: no cover
-    requests = None  # type: ignore
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+import brands
+import metrics
+from dashboard_artifact import load_artifact
+from dashboard_cache import CacheEntry, DashboardCache
+from data_sources import Appended, fetch_dataset, warm_clients
 
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+# Brands served, from $BRANDS_FILE or else DATA_FILE / DASHBOARD_ARTIFACT (see brands.py);
+# brands with a pre-rendered artifact are served as pure I/O
+BRANDS = brands.load_registry()
+DEFAULT_BRAND = next(iter(BRANDS))
+
+# Keep post text in a compact text_store.TextStore instead of the frame (see _offload_text)
+OFFLOAD_TEXT = os.environ.get("OFFLOAD_TEXT", "0") != "0"
+
+# Build a search_index.SearchIndex over post and reasoning text for /api/search
+SEARCH_INDEX = os.environ.get("SEARCH_INDEX", "1") != "0"
+# Results per /api/search page by default, and the most one page may hold
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Query args re-bucketing the time charts for a zoomed x range (see _zoomed_figure)
+ZOOM_ARGS = ("from", "to", "level")
+# step_3_dashboard.TIME_FIGURES, named here so /api/figures never imports pandas to check
+TIME_FIGURES = ("timeline", "volume")
+
+# Heavy modules (pandas, plotly) behind the first dashboard request, loaded by prewarm()
+PREWARM_MODULES = ("step_3_dashboard", "figure_builder", "aggregate_store", "snapshot")
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+# Encoded figure/stats bodies kept for repeat requests, keyed by data version
+MAX_ENCODED_RESPONSES = 64
+_encoded = OrderedDict()
+_encoded_lock = threading.Lock()
+
+EMPTY_STATS = {
+    "total_posts": 0,
+    "negative_posts": 0,
+    "neutral_posts": 0,
+    "positive_posts": 0,
+    "avg_confidence": 0.0,
+    "p10_confidence": 0.0,
+    "median_confidence": 0.0,
+    "p90_confidence": 0.0,
+    "category_confidence_bands": {},
+    "date_range": "N/A",
+    "negative_percentage": 0.0,
+    "neutral_percentage": 0.0,
+    "positive_percentage": 0.0,
+    "extremely_negative": 0,
+    "clearly_negative": 0,
+    "somewhat_negative": 0,
+    "neutral_detailed": 0,
+    "somewhat_positive": 0,
+    "clearly_positive": 0,
+    "extremely_positive": 0,
+}
+
+
+def _candidate_paths(data_file):
+    # Try local paths: as given, app root, and static/data
+    static_folder = app.static_folder or os.path.join(app.root_path, "static")
+    return [
+        data_file,
+        os.path.join(app.root_path, data_file),
+        os.path.join(static_folder, "data", os.path.basename(data_file)),
+        os.path.join(app.root_path, "static", "data", os.path.basename(data_file)),
+    ]
+
+
+def _dashboard():
+    # Imported on first use so artifact serving never loads pandas or plotly
+    if "step_3_dashboard" not in sys.modules:
+        with metrics.span("import"):
+            import step_3_dashboard
+    return sys.modules["step_3_dashboard"]
+
+
+def _load(chunks):
+    # Parse records as the body streams in and prepare them in bounded batches;
+    # the nested spans split the time into download, parse and prepare
+    dashboard = _dashboard()
+    batch_size = int(os.environ.get("STREAM_BATCH_SIZE", dashboard.STREAM_BATCH_SIZE))
+    records = metrics.timed_iter(dashboard.iter_sentiment_records(metrics.timed_iter(chunks, "download")), "parse")
+    with metrics.span("prepare"):
+        return dashboard.prepare_data_stream(records, batch_size)
+
+
+def _fetch(data_file, validators):
+    with metrics.span("import"):
+        import snapshot
+
+    # Columnar snapshots are memory-mapped instead of parsed
+    load_path = snapshot.load_snapshot if snapshot.is_snapshot_path(data_file) else None
+    with metrics.span("fetch"):
+        return fetch_dataset(
+            data_file,
+            _candidate_paths(data_file),
+            _load,
+            validators=validators,
+            load_path=load_path,
+            load_appended=_load,
+            # Shards are prepared concurrently, then merged into one sorted frame
+            combine=lambda frames: _dashboard().combine_prepared(frames),
+        )
+
+
+def _extend(previous, new_rows):
+    # Appended NDJSON lines: fold only the new rows into the running aggregates
+    from aggregate_store import AggregateStore
+
+    if previous is None or previous.state is None:
+        return new_rows, AggregateStore.from_frame(new_rows), None, _search_index(new_rows), None
+    base_df, base_store, base_texts, base_index = previous.state
+    # Memory of the base frame alone, taken before the text store and index grow in place
+    base_bytes = previous.nbytes - sum(part.nbytes for part in (base_store, base_texts, base_index) if part is not None)
+    # New post ids continue after the existing ones, so earlier ids stay valid
+    offset = int(base_df.index.max()) + 1 if len(base_df) else 0
+    new_rows = new_rows.set_axis(new_rows.index + offset)
+    store = base_store.copy()
+    store.ingest_frame(new_rows)
+    if base_index is not None:
+        # Append-only like the text store; rows the old frame lacks are skipped when it searches
+        with metrics.span("search_index"):
+            base_index.extend(new_rows)
+    if base_texts is not None:
+        # Append-only, so the entry being replaced can keep sharing it
+        base_texts.extend(new_rows)
+        new_rows = new_rows.drop(columns=base_texts.columns)
+    # Appended posts are newer than the frame, so they go on the end without a re-sort
+    df = _dashboard().append_prepared(base_df, new_rows)
+    return df, store, base_texts, base_index, base_bytes + _frame_bytes(new_rows)
+
+
+def _frame_bytes(df):
+    # A deep count reads every string of the object columns, so appends only count their new rows
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _search_index(df):
+    # Built while the frame still holds its text, i.e. before _offload_text
+    if not SEARCH_INDEX or df is None or len(df) == 0:
+        return None
+    from search_index import SearchIndex
+
+    with metrics.span("search_index"):
+        return SearchIndex.from_frame(df)
+
+
+def _offload_text(df):
+    # Small frames keep their text: the scatter ships it with every point anyway
+    if not OFFLOAD_TEXT or len(df) <= _dashboard().SCATTER_MAX_POINTS:
+        return df, None
+    from text_store import TextStore
+
+    texts = TextStore.from_frame(df)
+    return df.drop(columns=texts.columns), texts
+
+
+def _fetch_brand(name, validators):
+    brand = BRANDS[name]
+    if brand.artifact:
+        return _fetch_artifact(brand.artifact, validators)
+    validators, data = _fetch(brand.data_file, validators)
+    frame = data.data if isinstance(data, Appended) else data
+    if frame is not None:
+        # Titles, labels and stopwords follow the brand through every slice of the frame
+        _dashboard().set_brand(frame, brand.display_name, brand.stopwords)
+    return validators, data
+
+
+def _build_brand(data, previous=None):
+    if isinstance(data, dict):
+        return _artifact_contents(data, previous)
+    return _build(data, previous)
+
+
+def _build(data, previous=None):
+    frame_bytes = None
+    if isinstance(data, Appended):
+        df, store, texts, index, frame_bytes = _extend(previous, data.data)
+    elif data is None or len(data) == 0:
+        df, store, texts, index = data, None, None, None
+    else:
+        from aggregate_store import AggregateStore
+
+        with metrics.span("aggregate"):
+            df, store, texts = data, AggregateStore.from_frame(data), None
+        index = _search_index(df)
+    if df is not None and texts is None:
+        df, texts = _offload_text(df)
+        if texts is not None:
+            # The text columns just left the frame
+            frame_bytes = None
+    rows = 0 if df is None else len(df)
+    brand = "" if df is None else df.attrs.get("brand", "")
+    metrics.DATASET_ROWS.set(rows, brand=brand)
+    if frame_bytes is None:
+        frame_bytes = 0 if df is None else _frame_bytes(df)
+    nbytes = frame_bytes + (texts.nbytes if texts is not None else 0) + (store.nbytes if store is not None else 0)
+    nbytes += index.nbytes if index is not None else 0
+    metrics.DATASET_BYTES.set(nbytes, brand=brand)
+    metrics.log_event(
+        "dataset_built", brand=brand, rows=rows, bytes=nbytes,
+        appended=isinstance(data, Appended), text_offloaded=texts is not None, search_index=index is not None,
+    )
+    return {**_payload(df, store, texts, index), "nbytes": nbytes}
+
+
+def _payload(df, store=None, texts=None, index=None, word_index=None):
+    """CacheEntry fields for a prepared frame and, if kept, its aggregates, text store and search index.
+
+    ``word_index`` overrides the word counts of the word analysis chart.
+    """
+    if df is None or len(df) == 0:
+        return {"stats": dict(EMPTY_STATS), "figure_names": []}
+    dashboard = _dashboard()
+    import figure_builder
+
+    # Charts build concurrently in the background; each API call waits only
+    # for its own chart, and failures come back as placeholder figures
+    futures = figure_builder.submit_figures(df, aggregates=store, word_index=word_index)
+
+    def render(name):
+        try:
+            return futures[name].result()
+        except Exception as exc:
+            logger.exception("Building figure %s failed", name)
+            return figure_builder.placeholder_figure_json(name, exc)
+
+    def post_lookup(post_id):
+        row = df.loc[post_id]
+        text = row if texts is None else {column: texts.get(post_id, column) for column in texts.columns}
+        return {
+            "id": post_id,
+            "timestamp": row["timestamp"].isoformat(),
+            "tweet": text["tweet"],
+            "reasoning": text["reasoning"],
+            "confidence_score": float(row["confidence_score"]),
+            "sentiment_category": row["sentiment_category"],
+        }
+
+    with metrics.span("stats"):
+        stats = dashboard.generate_summary_stats(df, aggregates=store)
+    return {
+        "stats": stats,
+        "figure_names": list(dashboard.FIGURE_BUILDERS),
+        "render": render,
+        "post_lookup": post_lookup,
+        "state": (df, store, texts, index),
+    }
+
+
+def _fetch_artifact(artifact, validators):
+    return fetch_dataset(artifact, _candidate_paths(artifact), load_artifact, validators=validators)
+
+
+def _artifact_contents(document, previous=None):
+    figures = document.get("figures") or {}
+    return {
+        "stats": document.get("stats") or dict(EMPTY_STATS),
+        "figure_names": list(figures),
+        "figures": figures,
+    }
+
+
+def _cache_budget():
+    # DATA_CACHE_MAX_MB, else 40% of the Lambda's memory, else unbounded
+    megabytes = os.environ.get("DATA_CACHE_MAX_MB") or (
+        0.4 * float(os.environ["AWS_LAMBDA_FUNCTION_MEMORY_SIZE"])
+        if "AWS_LAMBDA_FUNCTION_MEMORY_SIZE" in os.environ else None
+    )
+    return int(float(megabytes) * 2 ** 20) if megabytes else None
+
+
+# One cache for all brands, keyed by brand name and bounded in memory as a whole;
+# DATA_CACHE_TTL is the seconds between freshness checks (0 revalidates on every request)
+cache = DashboardCache(
+    _fetch_brand,
+    _build_brand,
+    ttl=float(os.environ.get("DATA_CACHE_TTL", "60")),
+    stale_while_revalidate=os.environ.get("DATA_CACHE_SWR", "1") != "0",
+    max_bytes=_cache_budget(),
+)
+
+
+@lru_cache(maxsize=None)
+def _brotli():
+    try:
+        import brotli  # type: ignore
+    except ImportError:
+        return None
+    return brotli
+
+
+def _negotiate_encoding():
+    accepted = request.accept_encodings
+    if accepted["br"] and _brotli() is not None:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(raw, encoding):
+    if encoding == "br":
+        return _brotli().compress(raw, quality=5)
+    return gzip.compress(raw, compresslevel=6)
+
+
+def _send(make_body, mimetype, key=None):
+    """Send ``make_body()`` compressed for the client, with a strong ETag.
+
+    The ETag is a digest of the uncompressed body. ``key`` (which must
+    include the data version) memoizes the encoded body and its digest, so
+    a repeat visit gets ``304 Not Modified`` without re-serializing or
+    re-compressing anything.
+    """
+    encoding = _negotiate_encoding()
+    cached = None
+    if key is not None:
+        with _encoded_lock:
+            cached = _encoded.get((key, encoding))
+            if cached is not None:
+                _encoded.move_to_end((key, encoding))
+    if cached is None:
+        body = make_body()
+        raw = body if isinstance(body, bytes) else body.encode("utf-8")
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        used = encoding if encoding and len(raw) >= MIN_COMPRESS_BYTES else None
+        if used:
+            with metrics.span("compress"):
+                raw = _compress(raw, used)
+        cached = (digest, used, raw)
+        if key is not None:
+            with _encoded_lock:
+                _encoded[(key, encoding)] = cached
+                while len(_encoded) > MAX_ENCODED_RESPONSES:
+                    _encoded.popitem(last=False)
+
+    digest, used, payload = cached
+    # One strong tag per representation; any of them proves the client has this version
+    if any(tag.split(".", 1)[0] == digest for tag in request.if_none_match.as_set()):
+        response = Response(status=304)
+    else:
+        response = Response(payload, mimetype=mimetype)
+        if used:
+            response.headers["Content-Encoding"] = used
+    response.set_etag(f"{digest}.{used}" if used else digest)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _response_key(entry):
+    return (entry.version, request.path, *(request.args.get(arg) for arg in ("start", "end") + ZOOM_ARGS))
+
+
+@app.before_request
+def _start_timing():
+    g.metrics_job = metrics.begin_job()
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def _report_timing(response):
+    token = g.pop("metrics_job", None)
+    if token is None:
+        return response
+    elapsed = time.perf_counter() - g.started
+    timings = metrics.end_job(token)
+    endpoint = request.endpoint or "unmatched"
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+    response.headers["Server-Timing"] = metrics.server_timing(timings, total=elapsed)
+    if endpoint not in ("health", "metrics_endpoint"):
+        metrics.log_event(
+            "request",
+            method=request.method,
+            path=request.path,
+            query=request.query_string.decode("latin-1"),
+            status=response.status_code,
+            ms=round(elapsed * 1000, 1),
+            stages={stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+        )
+    return response
 
 
 @app.route("/health")
@@ -22,82 +405,241 @@ def health() -> str:
     return "ok"
 
 
-@app.route("/")
-def index():
-    data_file = os.environ.get(
-        "DATA_FILE",
-        "static/data/sample_data.json",
-    )
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+def prewarm(event=None, context=None) -> dict:
+    """Scheduled Zappa event that pays import costs before a user request does.
+
+    ``PREWARM=imports`` (default) imports ``PREWARM_MODULES`` and creates the
+    sources' S3/HTTP clients; ``PREWARM=data`` also loads the default brand's
+    dataset into the cache; ``PREWARM=off`` turns the event into a plain
+    keep-warm ping.
+    """
+    mode = os.environ.get("PREWARM", "imports")
+    if mode == "off":
+        return {"prewarm": mode}
+    started = time.perf_counter()
+    if any(brand.data_file for brand in BRANDS.values()):
+        for name in PREWARM_MODULES:
+            importlib.import_module(name)
+    for brand in BRANDS.values():
+        warm_clients(brand.source)
+    if mode == "data":
+        try:
+            cache.get(DEFAULT_BRAND)
+        except Exception:
+            logger.exception("Prewarming %s failed", DEFAULT_BRAND)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info("Prewarm (%s) took %.0f ms", mode, elapsed_ms)
+    return {"prewarm": mode, "ms": round(elapsed_ms)}
+
+
+def _brand(name=None):
+    """The requested brand's config (the default brand without a name); 404 if unknown."""
+    brand = BRANDS.get(name or DEFAULT_BRAND)
+    if brand is None:
+        abort(404)
+    return brand
+
 
-    data = []
-    # Try S3 / HTTP(S) / local file in that order based on scheme
-    parsed = urlparse(data_file)
+def _entry(name=None, narrow=True):
+    """Cache entry for a brand's dataset, narrowed to ?start=&end= if given and ``narrow``."""
+    brand = _brand(name)
     try:
-        if parsed.scheme == "s3" and boto3 is not None:
-            s3 = boto3.client("s3")
-            bucket = parsed.netloc
-            key = parsed.path.lstrip("/")
-            obj = s3.get_object(Bucket=bucket, Key=key)
-            body = obj["Body"].read()
-            data = json.loads(body)
-        elif parsed.scheme in ("http", "https") and requests is not None:
-            resp = requests.get(data_file, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
-        else:
-            # Try local paths: as given, app root, and static/data
-            candidate_paths = []
-            candidate_paths.append(data_file)
-            candidate_paths.append(os.path.join(app.root_path, data_file))
-            static_folder = app.static_folder or os.path.join(app.root_path, "static")
-            candidate_paths.append(os.path.join(static_folder, "data", os.path.basename(data_file)))
-            candidate_paths.append(os.path.join(app.root_path, "static", "data", os.path.basename(data_file)))
-            for path in candidate_paths:
-                if os.path.exists(path):
-                    data = dashboard.load_sentiment_data(path)
-                    break
-    except Exception:
-        # Fall back to empty dataset
-        data = []
-
-    if not data:
-        figures_json = []
-        stats = {
-            "total_posts": 0,
-            "negative_posts": 0,
-            "neutral_posts": 0,
-            "positive_posts": 0,
-            "avg_confidence": 0.0,
-            "date_range": "N/A",
-            "negative_percentage": 0.0,
-            "neutral_percentage": 0.0,
-            "positive_percentage": 0.0,
-            "extremely_negative": 0,
-            "clearly_negative": 0,
-            "somewhat_negative": 0,
-            "neutral_detailed": 0,
-            "somewhat_positive": 0,
-            "clearly_positive": 0,
-            "extremely_positive": 0,
-        }
+        entry = cache.get(brand.name)
+    except Exception as exc:
+        # Fall back to empty dataset, but count and log the failure
+        metrics.LOAD_FAILURES.inc(stage="load")
+        metrics.log_event(
+            "load_failed", level=logging.ERROR, exc_info=True,
+            brand=brand.name, source=brand.source, error=repr(exc), serving="empty",
+        )
+        return None
+
+    start = request.args.get("start") or None
+    end = request.args.get("end") or None
+    if not narrow or not (start or end) or entry.state is None:
+        if narrow and (start or end) and brand.artifact:
+            abort(400, "Date filtering needs DATA_FILE rather than a pre-rendered artifact")
+        return entry
+
+    def build_view():
+        df, store, texts, _ = entry.state
+        # Binary search over the sorted timestamps; stats and charts cover the slice only
+        view = _dashboard().filter_date_range(df, start, end)
+        word_index = None
+        if store is not None and len(view) and all(bound is None or len(bound.strip()) == 10 for bound in (start, end)):
+            # Whole days: the word chart reads the store's daily counts instead of re-tokenizing the slice
+            word_index = store.words.between(str(view["day"].iloc[0]), str(view["day"].iloc[-1]))
+        if texts is not None:
+            view = texts.attach(view)
+        return CacheEntry(entry.validators, **_payload(view, word_index=word_index))
+
+    try:
+        return entry.derived(("range", start, end), build_view)
+    except ValueError:
+        abort(400, "start and end must be ISO dates, e.g. 2025-08-01")
+
+
+def _base_path(brand=None):
+    # Where a brand's page and API live: the default brand also answers at the root
+    return f"/brand/{brand}" if brand else ""
+
+
+@app.route("/")
+@app.route("/brand/<brand>")
+def index(brand=None):
+    config = _brand(brand)
+    entry = _entry(brand)
+    if entry is None:
+        stats, figure_names = dict(EMPTY_STATS), []
     else:
-        df = dashboard.prepare_data(data)
-        stats = dashboard.generate_summary_stats(df)
-        figures = [
-            dashboard.create_sentiment_timeline(df),
-            dashboard.create_sentiment_distribution(df),
-            dashboard.create_tweet_volume_chart(df),
-            dashboard.create_monthly_sentiment_breakdown(df),
-            dashboard.create_sentiment_by_tweet_length(df),
-            dashboard.create_confidence_score_histogram(df),
-            dashboard.create_word_analysis_chart(df),
-        ]
-        figures_json = [fig.to_json() for fig in figures]
-
-    return render_template("dashboard.html", figures_json=figures_json, stats=stats)
+        stats, figure_names = entry.stats, entry.figure_names
 
+    def render():
+        # Charts are fetched one by one from <base>/api/figures as they scroll into view
+        with metrics.span("render"):
+            return render_template(
+                "dashboard.html",
+                figure_names=figure_names,
+                stats=stats,
+                start=request.args.get("start", ""),
+                end=request.args.get("end", ""),
+                brand=config,
+                brands=list(BRANDS.values()),
+                base_path=_base_path(brand),
+            )
 
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+    return _send(render, "text/html")
+
+
+@app.route("/api/brands")
+def api_brands():
+    return jsonify([
+        {"name": brand.name, "display_name": brand.display_name, "path": _base_path(brand.name)}
+        for brand in BRANDS.values()
+    ])
+
+
+@app.route("/api/cache")
+def api_cache():
+    return jsonify(cache.stats())
+
+
+@app.route("/api/stats")
+@app.route("/brand/<brand>/api/stats")
+def api_stats(brand=None):
+    entry = _entry(brand)
+    if entry is None:
+        return jsonify(EMPTY_STATS)
+    return _send(lambda: app.json.dumps(entry.stats), "application/json", key=_response_key(entry))
+
+
+@app.route("/api/figures/<name>")
+@app.route("/brand/<brand>/api/figures/<name>")
+def api_figure(name, brand=None):
+    entry = _entry(brand)
+    if entry is None:
+        abort(503)
+    if name not in entry.figure_names:
+        abort(404)
+    zoomed = name in TIME_FIGURES and any(request.args.get(arg) for arg in ZOOM_ARGS)
+    if zoomed and entry.state is None:
+        abort(400, "Zooming needs DATA_FILE rather than a pre-rendered artifact")
+
+    def body():
+        with metrics.span("figure"):
+            if zoomed:
+                return _zoomed_figure(entry, name)
+            # Waits for the chart's background build if it has not finished yet
+            return entry.figure_json(name)
+
+    return _send(body, "application/json", key=_response_key(entry))
 
 
+def _zoomed_figure(entry, name):
+    """JSON of a time chart re-bucketed for ?from=&to= (its zoomed x range) and ?level=."""
+    import figure_builder
+    from time_pyramid import LEVELS, TimePyramid
+
+    level = request.args.get("level") or None
+    if level is not None and level not in LEVELS:
+        abort(400, f"level must be one of {', '.join(LEVELS)}")
+    df, store = entry.state[:2]
+    # The store keeps its pyramid current as posts append; a date-range view counts its own once
+    if store is not None:
+        pyramid = store.time_pyramid
+    else:
+        pyramid = entry.derived(("time_pyramid",), lambda: TimePyramid.from_frame(df))
+    window = (request.args.get("from") or None, request.args.get("to") or None)
+    try:
+        figure = _dashboard().create_figure(name, df, window=window, level=level, pyramid=pyramid)
+    except ValueError:
+        abort(400, "from and to must be ISO dates or times, e.g. 2025-08-01 12:00")
+    return figure_builder.encode_figure(figure)
+
+
+@app.route("/api/posts/<int:post_id>")
+@app.route("/brand/<brand>/api/posts/<int:post_id>")
+def api_post(post_id, brand=None):
+    # Text left out of summarized charts is fetched here when a point is clicked
+    entry = _entry(brand)
+    if entry is None:
+        abort(503)
+    try:
+        return jsonify(entry.post(post_id))
+    except KeyError:
+        abort(404)
+
+
+@app.route("/api/search")
+@app.route("/brand/<brand>/api/search")
+def api_search(brand=None):
+    # ?q= words (all must occur in the post or its reasoning), best match first;
+    # ?category= (repeatable, detailed or broad), ?start=&end=, ?page=&per_page=
+    if _brand(brand).artifact:
+        abort(400, "Search needs DATA_FILE rather than a pre-rendered artifact")
+    entry = _entry(brand, narrow=False)
+    if entry is None:
+        abort(503)
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("per_page", SEARCH_PAGE_SIZE)), 1), MAX_SEARCH_PAGE_SIZE)
+    except ValueError:
+        abort(400, "page and per_page must be integers")
+    query = request.args.get("q", "")
+    found = {"terms": [], "total": 0, "results": []}
+    if entry.state is not None:
+        df, _, _, index = entry.state
+        if index is None:
+            abort(501, "Search is turned off (SEARCH_INDEX=0)")
+        dashboard = _dashboard()
+        categories = [part for value in request.args.getlist("category") for part in value.split(",") if part]
+        unknown = set(categories) - set(dashboard.SENTIMENT_CATEGORIES) - set(dashboard.BROAD_CATEGORIES)
+        if unknown:
+            abort(400, f"Unknown category {sorted(unknown)[0]!r}")
+        from search_index import search_posts
+
+        try:
+            with metrics.span("search"):
+                found = search_posts(
+                    df, index, query, categories,
+                    request.args.get("start") or None, request.args.get("end") or None, page, per_page,
+                )
+        except ValueError:
+            abort(400, "start and end must be ISO dates, e.g. 2025-08-01")
+    return jsonify({
+        "query": query,
+        "terms": found["terms"],
+        "total": found["total"],
+        "page": page,
+        "per_page": per_page,
+        "results": [{**entry.post(post_id), "score": round(score, 4)} for post_id, score in found["results"]],
+    })
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
@@ -0,0 +1,153 @@
+"""Synthetic sentiment exports for benchmarking.
+
+Records follow the schema of ``static/data/sample_data.json`` (``id``,
+``tweet``, ``confidence_score``, ``reasoning``, ``timestamp``,
+``thread_id``) with realistic shape: posts cluster in daytime hours and in
+threads, their length varies from a few words to a long rant, scores are
+skewed towards the negative end as in the real scrapes, and the wording
+follows the score so the word and length charts have something to show.
+
+    python benchmarks/generate_data.py 100k benchmarks/data/posts_100k.json
+    python benchmarks/generate_data.py 1m benchmarks/data/posts_1m.ndjson
+
+Output is written incrementally, so 1M records never sit in memory.
+"""
+import argparse
+import datetime as dt
+import json
+import random
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+BRAND_WORDS = ["Nestle", "Nescafe", "KitKat", "Milo", "Maggi", "Nespresso", "Cerelac", "Purina"]
+TOPICS = [
+    "coffee", "chocolate", "water", "packaging", "price", "recall", "formula", "noodles",
+    "delivery", "supply", "advert", "campaign", "plastic", "recipe", "flavour", "sugar",
+]
+NEGATIVE = [
+    "terrible", "disappointed", "boycott", "overpriced", "awful", "unethical", "scandal",
+    "refund", "complaint", "worst", "stale", "misleading", "angry", "never again",
+]
+NEUTRAL = [
+    "noticed", "wondering", "announced", "available", "compared", "switched", "tried",
+    "reported", "update", "apparently", "launching", "stores",
+]
+POSITIVE = [
+    "love", "delicious", "excellent", "favourite", "recommend", "amazing", "perfect",
+    "thanks", "great", "impressed", "smooth", "fantastic",
+]
+FILLER = [
+    "the", "new", "their", "again", "today", "really", "this", "week", "about", "with",
+    "honestly", "still", "every", "morning", "local", "shop", "kids", "after", "since",
+]
+REASONS = {
+    "negative": [
+        "Strongly negative language about {topic}",
+        "Complaint about {topic} with calls to boycott",
+        "Frustration with {topic} and customer service",
+    ],
+    "neutral": [
+        "Factual statement about {topic}",
+        "Question about {topic} without clear stance",
+        "Mixed remarks on {topic}",
+    ],
+    "positive": [
+        "Praise for {topic}",
+        "Recommends the brand's {topic}",
+        "Positive personal experience with {topic}",
+    ],
+}
+
+
+def _score(rng):
+    # Real scrapes skew negative: roughly 45% negative, 30% neutral, 25% positive
+    roll = rng.random()
+    if roll < 0.45:
+        return round(rng.betavariate(2, 5) * 0.4, 3)
+    if roll < 0.75:
+        return round(0.4 + rng.random() * 0.2, 3)
+    return round(0.6 + rng.betavariate(5, 2) * 0.4, 3)
+
+
+def _tone(score):
+    return "negative" if score < 0.4 else "positive" if score > 0.6 else "neutral"
+
+
+def _tweet(rng, tone, topic):
+    vocab = {"negative": NEGATIVE, "neutral": NEUTRAL, "positive": POSITIVE}[tone]
+    # Mostly short posts with a long tail of rants
+    length = min(int(rng.lognormvariate(2.6, 0.6)) + 3, 80)
+    words = [rng.choice(BRAND_WORDS), topic]
+    for _ in range(length - 2):
+        roll = rng.random()
+        words.append(rng.choice(vocab) if roll < 0.25 else rng.choice(TOPICS) if roll < 0.35 else rng.choice(FILLER))
+    rng.shuffle(words)
+    return " ".join(words).capitalize() + rng.choice([".", "!", "?", "..."])
+
+
+def generate_records(n, seed=0, days=90, start=dt.datetime(2025, 5, 1, tzinfo=dt.timezone.utc)):
+    """Yield ``n`` synthetic records spread over ``days`` days from ``start``."""
+    rng = random.Random(seed)
+    thread = 0
+    thread_left = 0
+    for i in range(n):
+        if thread_left == 0:
+            thread += 1
+            thread_left = 1 + int(rng.expovariate(1 / 4))
+        thread_left -= 1
+        # Daytime-weighted posting hours
+        moment = start + dt.timedelta(
+            days=rng.randrange(days),
+            hours=min(max(rng.gauss(14, 4), 0), 23.99),
+        )
+        score = _score(rng)
+        tone = _tone(score)
+        topic = rng.choice(TOPICS)
+        yield {
+            "id": f"post_{i + 1}",
+            "tweet": _tweet(rng, tone, topic),
+            "confidence_score": score,
+            "reasoning": rng.choice(REASONS[tone]).format(topic=topic),
+            "timestamp": moment.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "thread_id": f"thread_{thread}",
+        }
+
+
+def write_records(records, path):
+    """Write records as NDJSON (``.ndjson``/``.jsonl``) or a JSON array, one by one."""
+    ndjson = path.endswith((".ndjson", ".jsonl"))
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        if not ndjson:
+            f.write("[\n")
+        for record in records:
+            if not ndjson and count:
+                f.write(",\n")
+            f.write(json.dumps(record))
+            if ndjson:
+                f.write("\n")
+            count += 1
+        if not ndjson:
+            f.write("\n]\n")
+    return count
+
+
+def parse_scale(value):
+    """``1k``/``100k``/``1m`` or a plain record count."""
+    return SCALES.get(value.lower()) or int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic sentiment export")
+    parser.add_argument("scale", help="1k, 100k, 1m or a record count")
+    parser.add_argument("output", help="output path; .ndjson/.jsonl writes NDJSON, anything else a JSON array")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=90, help="days the timestamps are spread over")
+    args = parser.parse_args()
+
+    count = write_records(generate_records(parse_scale(args.scale), args.seed, args.days), args.output)
+    print(f"Wrote {count} records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Time and memory-profile each stage of the ``step_3_dashboard`` pipeline.
+
+Every stage is measured on its own over synthetic records from
+``generate_data.py``: ``prepare_data``, ``generate_summary_stats``, each
+``create_*`` chart (from the frame, and from an ``AggregateStore``), each
+figure's ``to_json``, ``create_dashboard_html``, the chunked pipeline
+(``AggregateStore.from_chunks`` over ``CHUNK_SIZE``-record chunks) and the
+search index (``SearchIndex.from_frame`` and a ``search_posts`` query) and the time
+pyramid (``TimePyramid.from_frame`` and a zoomed ``buckets`` window). Wall time is the median of ``--repeat`` runs;
+peak memory comes from one extra run under ``tracemalloc``, kept apart so
+tracing overhead does not skew the timings.
+
+    python benchmarks/run_benchmarks.py --scales 1k 100k
+    python benchmarks/run_benchmarks.py --scales 1k 100k --save-baseline
+    python benchmarks/run_benchmarks.py --scales 1k 100k --baseline benchmarks/baseline.json
+
+Results are written as JSON (``--output``). With a baseline, any stage that
+got slower by more than ``--threshold`` (and by at least ``--min-delta-ms``)
+is flagged and the exit status is 1, so CI can gate on it. Baselines are
+only comparable on the machine that recorded them.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+import plotly  # noqa: E402
+
+import step_3_dashboard as dashboard  # noqa: E402
+from aggregate_store import AggregateStore  # noqa: E402
+from generate_data import generate_records, parse_scale  # noqa: E402
+from search_index import SearchIndex, search_posts  # noqa: E402
+from time_pyramid import TimePyramid  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+CHUNK_SIZE = 10_000
+
+
+def measure(fn, repeat):
+    """Run ``fn`` ``repeat`` times plus once traced; return its result and the numbers."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def warm_up():
+    """Build every chart once so plotly's lazy imports are not charged to the first stage."""
+    df = dashboard.prepare_data(list(generate_records(200, seed=1)))
+    for figure in dashboard.create_figures(df):
+        figure.to_json()
+
+
+def run_scale(rows, repeat, seed):
+    """Benchmark every stage over ``rows`` synthetic records."""
+    records = list(generate_records(rows, seed=seed))
+    results = {}
+
+    def step(name, fn):
+        value, results[name] = measure(fn, repeat)
+        print(f"  {name:<48}{results[name]['seconds'] * 1000:>10.1f} ms{results[name]['peak_mb']:>10.1f} MB")
+        return value
+
+    df = step("prepare_data", lambda: dashboard.prepare_data(records))
+    step("AggregateStore.from_chunks", lambda: AggregateStore.from_chunks(
+        dashboard.iter_prepared_chunks(records, CHUNK_SIZE)
+    ))
+    del records
+    stats = step("generate_summary_stats", lambda: dashboard.generate_summary_stats(df))
+    store = step("AggregateStore.from_frame", lambda: AggregateStore.from_frame(df))
+    step("generate_summary_stats[aggregates]", lambda: dashboard.generate_summary_stats(df, aggregates=store))
+    index = step("SearchIndex.from_frame", lambda: SearchIndex.from_frame(df))
+    step("search_posts", lambda: search_posts(df, index, "coffee price", categories=["Negative"]))
+    pyramid = step("TimePyramid.from_frame", lambda: TimePyramid.from_frame(df))
+    # A zoom on the last week of posts, as the dashboard requests it
+    last_day = str(df["day"].iloc[-1]) if len(df) else None
+    step("TimePyramid.buckets[zoom]", lambda: pyramid.buckets(
+        start=str(pd.Timestamp(last_day) - pd.Timedelta(days=7)) if last_day else None, end=last_day
+    ))
+
+    figures = {}
+    for name, builder in dashboard.FIGURE_BUILDERS.items():
+        figure = step(builder.__name__, lambda: builder(df))
+        figures[name] = step(f"to_json[{name}]", figure.to_json)
+        if name in dashboard.AGGREGATE_FIGURES:
+            step(f"{builder.__name__}[aggregates]", lambda: builder(df, aggregates=store))
+
+    step("create_dashboard_html", lambda: dashboard.create_dashboard_html(list(figures.values()), stats))
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Stages slower than the baseline beyond both tolerances, as printable lines."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, numbers in stages.items():
+            before = baseline.get("results", {}).get(scale, {}).get(stage)
+            if not before:
+                continue
+            delta_ms = (numbers["seconds"] - before["seconds"]) * 1000
+            if numbers["seconds"] > before["seconds"] * (1 + threshold) and delta_ms >= min_delta_ms:
+                regressions.append(
+                    f"{scale} {stage}: {before['seconds'] * 1000:.1f} ms -> "
+                    f"{numbers['seconds'] * 1000:.1f} ms (+{numbers['seconds'] / before['seconds'] - 1:.0%})"
+                )
+    return regressions
+
+
+def _write_json(document, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipeline stage by stage")
+    parser.add_argument("--scales", nargs="+", default=["1k", "100k"], help="1k, 100k, 1m or record counts")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the results JSON")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also store the results as {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown flagged as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    warm_up()
+    results = {}
+    for scale in args.scales:
+        rows = parse_scale(scale)
+        print(f"{scale} ({rows} records)")
+        results[scale] = run_scale(rows, args.repeat, args.seed)
+
+    document = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "pandas": pd.__version__,
+            "plotly": plotly.__version__,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    _write_json(document, args.output)
+    print(f"Wrote results to {args.output}")
+    if args.save_baseline:
+        _write_json(document, DEFAULT_BASELINE)
+        print(f"Saved baseline to {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Registry of the brands the dashboard serves, one dataset config each.
+
+``BRANDS_FILE`` names a JSON document listing them; the first is the default
+brand, served at ``/``, and every brand is served at ``/brand/<name>``::
+
+    {"brands": [
+        {"name": "nestle", "display_name": "Nestle", "data_file": "static/data/sample_data.json"},
+        {"name": "kitkat", "display_name": "KitKat", "data_file": "s3://bucket/kitkat/",
+         "stopwords": ["break"]},
+        {"name": "milo", "display_name": "Milo", "artifact": "s3://bucket/milo.json.gz"}
+    ]}
+
+``data_file`` takes anything ``DATA_FILE`` does (a local file, URL, snapshot
+or shard prefix) and ``artifact`` a pre-rendered dashboard from
+``dashboard_artifact.py``. ``display_name`` appears in titles and labels, and
+it and ``stopwords`` are left out of the word analysis. Without
+``BRANDS_FILE`` the registry holds the single brand configured by
+``DATA_FILE`` / ``DASHBOARD_ARTIFACT`` as before, named by ``BRAND_NAME`` and
+``BRAND_DISPLAY_NAME``.
+"""
+import json
+import os
+import re
+from collections import OrderedDict
+
+# Display name of the default brand; also step_3_dashboard's default for the CLI and static export
+DEFAULT_BRAND = "Nestle"
+
+# URL-safe brand names
+_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+
+class Brand:
+    """Dataset config of one brand."""
+
+    def __init__(self, name, display_name=None, data_file=None, artifact=None, stopwords=()):
+        if not _NAME.match(name or ""):
+            raise ValueError(f"Brand name {name!r} must be lowercase letters, digits, '-' or '_'")
+        if bool(data_file) == bool(artifact):
+            raise ValueError(f"Brand {name!r} needs exactly one of data_file and artifact")
+        self.name = name
+        self.display_name = display_name or name.title()
+        self.data_file = data_file
+        self.artifact = artifact
+        self.stopwords = tuple(stopwords)
+
+    @property
+    def source(self) -> str:
+        """Where the brand's dashboard is loaded from."""
+        return self.artifact or self.data_file
+
+    def __repr__(self):
+        return f"Brand({self.name!r}, source={self.source!r})"
+
+
+def parse_registry(document) -> "OrderedDict[str, Brand]":
+    """``{name: Brand}`` in document order from a parsed registry document."""
+    brands = OrderedDict()
+    for config in document.get("brands") or []:
+        brand = Brand(
+            config.get("name"),
+            display_name=config.get("display_name"),
+            data_file=config.get("data_file"),
+            artifact=config.get("artifact"),
+            stopwords=config.get("stopwords") or (),
+        )
+        if brand.name in brands:
+            raise ValueError(f"Brand {brand.name!r} is listed twice")
+        brands[brand.name] = brand
+    if not brands:
+        raise ValueError("The brand registry lists no brands")
+    return brands
+
+
+def load_registry(path=None) -> "OrderedDict[str, Brand]":
+    """Brands from ``path`` (or ``$BRANDS_FILE``), else the single brand from the environment."""
+    path = path or os.environ.get("BRANDS_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return parse_registry(json.load(f))
+    artifact = os.environ.get("DASHBOARD_ARTIFACT")
+    brand = Brand(
+        os.environ.get("BRAND_NAME", "nestle"),
+        display_name=os.environ.get("BRAND_DISPLAY_NAME", DEFAULT_BRAND),
+        data_file=None if artifact else os.environ.get("DATA_FILE", "static/data/sample_data.json"),
+        artifact=artifact,
+    )
+    return OrderedDict([(brand.name, brand)])
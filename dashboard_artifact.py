@@ -0,0 +1,118 @@
+"""Pre-rendered dashboard artifacts.
+
+``python dashboard_artifact.py OUTPUT`` runs the full ``step_3_dashboard``
+pipeline once over ``DATA_FILE`` (or ``--data-file``) and writes the summary
+stats plus every serialized figure, keyed by figure name in display order, as
+one gzip-compressed JSON document to a local path or an ``s3://`` URL. With
+``DASHBOARD_ARTIFACT`` pointing at that document, ``app.py`` serves the
+dashboard straight from it.
+
+Reading an artifact only needs the standard library, so the serving path never
+imports pandas or plotly.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+import zlib
+from urllib.parse import urlparse
+
+ARTIFACT_FORMAT = 1
+
+
+def _to_builtin(value):
+    # numpy scalars (e.g. the mean confidence) are not JSON serializable
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def encode_artifact(stats, figures, source=None) -> bytes:
+    """Serialize stats and ``{name: figure JSON}`` into a compressed artifact."""
+    document = {
+        "format": ARTIFACT_FORMAT,
+        "built_at": time.time(),
+        "source": source,
+        "stats": stats,
+        "figures": figures,
+    }
+    payload = json.dumps(document, default=_to_builtin, separators=(",", ":"))
+    return gzip.compress(payload.encode("utf-8"), compresslevel=9)
+
+
+def load_artifact(chunks) -> dict:
+    """Decompress and parse an artifact from an iterator of byte chunks."""
+    decompressor = zlib.decompressobj(wbits=31)
+    parts = [decompressor.decompress(chunk) for chunk in chunks]
+    parts.append(decompressor.flush())
+    payload = b"".join(parts)
+    if not payload:
+        return {"stats": None, "figures": {}}
+    document = json.loads(payload)
+    if document.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported dashboard artifact format {document.get('format')}")
+    return document
+
+
+def write_artifact(blob: bytes, output: str) -> None:
+    """Write an encoded artifact to a local path or an s3:// URL."""
+    parsed = urlparse(output)
+    if parsed.scheme == "s3":
+        import boto3  # type: ignore
+
+        boto3.client("s3").put_object(
+            Bucket=parsed.netloc,
+            Key=parsed.path.lstrip("/"),
+            Body=blob,
+            ContentType="application/gzip",
+        )
+        return
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, output)
+
+
+def build_artifact(data_file: str, brand=None, stopwords=()) -> bytes:
+    """Run the dashboard pipeline over ``data_file`` (posts about ``brand``) and encode the result."""
+    import figure_builder
+    import snapshot
+    import step_3_dashboard as dashboard
+    from data_sources import fetch_dataset
+
+    load_path = snapshot.load_snapshot if snapshot.is_snapshot_path(data_file) else None
+    _, df = fetch_dataset(
+        data_file,
+        [data_file],
+        dashboard.load_prepared_stream,
+        load_path=load_path,
+        combine=dashboard.combine_prepared,
+    )
+    if len(df) == 0:
+        raise SystemExit(f"No records loaded from {data_file}")
+    dashboard.set_brand(df, brand or dashboard.DEFAULT_BRAND, stopwords)
+    stats = dashboard.generate_summary_stats(df)
+    figures = figure_builder.build_figures(df)
+    return encode_artifact(stats, figures, source=data_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a pre-rendered dashboard artifact")
+    parser.add_argument("output", help="local path or s3://bucket/key for the artifact (e.g. dashboard.json.gz)")
+    parser.add_argument(
+        "--data-file",
+        default=os.environ.get("DATA_FILE", "static/data/sample_data.json"),
+        help="sentiment export or snapshot to build from (defaults to $DATA_FILE)",
+    )
+    parser.add_argument("--brand", help="display name of the brand, for titles and labels (see brands.py)")
+    parser.add_argument("--stopword", action="append", default=[], help="extra word to leave out of the word analysis")
+    args = parser.parse_args()
+
+    blob = build_artifact(args.data_file, args.brand, args.stopword)
+    write_artifact(blob, args.output)
+    print(f"Wrote dashboard artifact for {args.data_file} to {args.output} ({len(blob)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
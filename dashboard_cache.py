@@ -0,0 +1,243 @@
+"""Process-level cache of the rendered dashboard, keyed by source version.
+
+A warm Lambda keeps the prepared stats and serialized figures between
+requests. Entries are revalidated at most once per ``ttl`` seconds with a
+conditional fetch; with stale-while-revalidate enabled the revalidation runs
+on a background thread and the request is answered from the cached copy.
+
+One cache holds every source (e.g. one per brand). With ``max_bytes`` set,
+the least recently used entries are evicted once the entries' estimated
+memory goes over it, so many datasets can share one bounded process.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from data_sources import version_key
+
+logger = logging.getLogger(__name__)
+
+# Derived views (e.g. date-range slices) kept per entry, least recently used first out
+MAX_DERIVED_VIEWS = 16
+
+
+class CacheEntry:
+    """One built dashboard together with the validators it was built from.
+
+    Figures are serialized on first request through ``render(name)`` unless
+    they were supplied up front in ``figures``; ``post_lookup(post_id)``
+    returns the details of a single post when the dataset itself is cached.
+    ``nbytes`` is the memory held by ``state``, for the cache's budget.
+    """
+
+    def __init__(self, validators, stats, figure_names, figures=None, render=None, post_lookup=None, state=None,
+                 nbytes=0):
+        self.validators = validators
+        self.version = version_key(validators)
+        self.stats = stats
+        self.figure_names = list(figure_names)
+        self.figures = dict(figures or {})
+        self._render = render
+        self._post_lookup = post_lookup
+        # Whatever the builder needs to extend this entry incrementally
+        self.state = state
+        self.nbytes = nbytes
+        self._derived = OrderedDict()
+        self._derived_lock = threading.Lock()
+        self.built_at = time.time()
+        self.checked_at = time.monotonic()
+
+    def figure_json(self, name) -> str:
+        """Serialized figure ``name``; raises ``KeyError`` for unknown names."""
+        if name not in self.figures:
+            if self._render is None or name not in self.figure_names:
+                raise KeyError(name)
+            # No lock: concurrent first requests may both render, which is
+            # harmless, and one slow chart never blocks the others
+            self.figures[name] = self._render(name)
+        return self.figures[name]
+
+    def derived(self, key, factory):
+        """Memoize ``factory()`` under ``key`` for the lifetime of this version."""
+        with self._derived_lock:
+            if key in self._derived:
+                self._derived.move_to_end(key)
+                return self._derived[key]
+        value = factory()
+        with self._derived_lock:
+            self._derived[key] = value
+            while len(self._derived) > MAX_DERIVED_VIEWS:
+                self._derived.popitem(last=False)
+        return value
+
+    def size(self) -> int:
+        """Estimated bytes held: ``nbytes`` plus serialized figures and derived views (or their ``nbytes``)."""
+        with self._derived_lock:
+            derived = list(self._derived.values())
+        return (
+            self.nbytes
+            + sum(len(figure) for figure in list(self.figures.values()))
+            + sum(view.size() if isinstance(view, CacheEntry) else getattr(view, "nbytes", 0) for view in derived)
+        )
+
+    def post(self, post_id) -> dict:
+        """Details of one post; raises ``KeyError`` if unknown or unavailable."""
+        if self._post_lookup is None:
+            raise KeyError(post_id)
+        return self._post_lookup(post_id)
+
+
+class DashboardCache:
+    """Version-keyed cache with optional stale-while-revalidate refreshes.
+
+    ``fetch(key, validators)`` returns ``(validators, data)`` with ``data`` set
+    to ``None`` when the source is unchanged; ``build(data, previous)`` turns
+    fetched data (plus the entry it replaces, for incremental updates) into
+    the keyword arguments of a ``CacheEntry`` (``stats``, ``figure_names``
+    and either ``figures`` or a ``render`` callable).
+
+    ``max_bytes`` bounds the summed ``CacheEntry.size()`` of all keys; the
+    entry just used is never evicted, even when it alone is over budget.
+    """
+
+    def __init__(self, fetch, build, ttl=60.0, stale_while_revalidate=True, max_bytes=None):
+        self._fetch = fetch
+        self._build = build
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # least recently used first
+        self._locks = {}
+        self._refreshing = set()
+        self._guard = threading.Lock()
+        self._lookups = {}
+        self.evictions = 0
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, result):
+        metrics.CACHE_LOOKUPS.inc(result=result)
+        with self._guard:
+            self._lookups[result] = self._lookups.get(result, 0) + 1
+
+    def _touch(self, key):
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key) -> CacheEntry:
+        """Return the entry for ``key``, refreshing it if it is due."""
+        entry = self._touch(key)
+        if entry is None:
+            self._lookup("miss")
+            return self.refresh(key)
+        if time.monotonic() - entry.checked_at < self.ttl:
+            self._lookup("hit")
+            # Figures rendered since the last check count toward the budget too
+            self._evict(keep=key)
+            return entry
+        if self.stale_while_revalidate:
+            self._lookup("stale")
+            self._refresh_in_background(key)
+            return entry
+        self._lookup("revalidate")
+        return self.refresh(key)
+
+    def refresh(self, key) -> CacheEntry:
+        """Revalidate ``key`` now and rebuild it if the source changed."""
+        with self._lock_for(key):
+            entry = self._entries.get(key)
+            # Another request may have refreshed while we waited on the lock
+            if entry is not None and time.monotonic() - entry.checked_at < self.ttl:
+                return entry
+            try:
+                validators, data = self._fetch(key, entry.validators if entry else None)
+            except Exception as exc:
+                metrics.CACHE_REFRESHES.inc(outcome="failed")
+                if entry is None:
+                    raise
+                metrics.LOAD_FAILURES.inc(stage="revalidate")
+                metrics.log_event(
+                    "revalidate_failed", level=logging.ERROR, exc_info=True,
+                    source=key, error=repr(exc), serving="cached",
+                )
+                entry.checked_at = time.monotonic()
+                return entry
+            if data is None and entry is not None:
+                metrics.CACHE_REFRESHES.inc(outcome="not_modified")
+                entry.checked_at = time.monotonic()
+                return entry
+            metrics.CACHE_REFRESHES.inc(outcome="rebuilt")
+            with metrics.span("build"):
+                entry = CacheEntry(validators, **self._build(data, entry))
+            with self._guard:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            self._evict(keep=key)
+            return entry
+
+    def _evict(self, keep=None):
+        """Drop least recently used entries (never ``keep``) until within ``max_bytes``."""
+        with self._guard:
+            sizes = OrderedDict((key, entry.size()) for key, entry in self._entries.items())
+            total = sum(sizes.values())
+            if self.max_bytes is not None:
+                for key, size in sizes.items():
+                    if total <= self.max_bytes:
+                        break
+                    if key == keep:
+                        continue
+                    del self._entries[key]
+                    total -= size
+                    self.evictions += 1
+                    metrics.CACHE_EVICTIONS.inc()
+                    metrics.log_event("cache_evicted", source=key, bytes=size)
+            metrics.CACHE_BYTES.set(total)
+            metrics.CACHE_ENTRIES.set(len(self._entries))
+
+    def stats(self) -> dict:
+        """Entries, estimated bytes, lookups by result, hit rate and evictions."""
+        with self._guard:
+            entries = {key: entry.size() for key, entry in self._entries.items()}
+            lookups = dict(self._lookups)
+        total = sum(lookups.values())
+        return {
+            "entries": len(entries),
+            "bytes": sum(entries.values()),
+            "max_bytes": self.max_bytes,
+            "entry_bytes": entries,
+            "lookups": lookups,
+            # Stale answers come from the cache too; only misses pay for a build
+            "hit_rate": (total - lookups.get("miss", 0)) / total if total else None,
+            "evictions": self.evictions,
+        }
+
+    def _refresh_in_background(self, key):
+        with self._guard:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.refresh(key)
+            except Exception:
+                logger.exception("Background refresh of %s failed", key)
+            finally:
+                with self._guard:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._guard:
+            self._entries.clear()
+            metrics.CACHE_BYTES.set(0)
+            metrics.CACHE_ENTRIES.set(0)
@@ -0,0 +1,396 @@
+"""Conditional fetching of the sentiment dataset from S3, HTTP(S) or local disk.
+
+Every fetch takes the validators of the copy the caller already holds and
+returns ``None`` instead of the data when the source has not changed, so a
+warm process only pays for a HEAD-sized round trip (or a ``stat``) per check.
+Bodies are never read whole: they are handed to a ``load`` callable as an
+iterator of byte chunks so records can be parsed while they stream in.
+
+A source may also name many shards (e.g. one file per scrape day): an S3 or
+local prefix ending in ``/``, a glob such as ``s3://bucket/days/*.json``, or
+a ``.manifest`` file listing one shard per line. Shards are fetched
+concurrently through one pooled S3 client / ``requests.Session``, whose
+timeouts and retries apply to each shard, and their loaded parts are combined
+in order.
+"""
+import fnmatch
+import glob
+import importlib
+import json
+import os
+import posixpath
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# Shards fetched at once, and attempts per S3/HTTP request (the clients' own retries)
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "8"))
+SHARD_ATTEMPTS = int(os.environ.get("SHARD_ATTEMPTS", "3"))
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+MANIFEST_SUFFIX = ".manifest"
+_GLOB_CHARS = "*?["
+
+_s3_client = None
+_http_session = None
+_client_lock = threading.Lock()
+
+
+def _optional(name):
+    """Import a client library on first use (boto3 alone costs ~0.2 s); None if missing."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+class Appended:
+    """Wraps data loaded from only the bytes appended since the last version."""
+
+    def __init__(self, data):
+        self.data = data
+
+
+def version_key(validators: dict) -> str:
+    """Stable string identifying one version of a source."""
+    return json.dumps(validators, sort_keys=True)
+
+
+def _is_not_modified(exc: Exception) -> bool:
+    response = getattr(exc, "response", None) or {}
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    code = response.get("Error", {}).get("Code")
+    return status == 304 or code in ("304", "NotModified")
+
+
+def _s3():
+    """Process-wide S3 client; clients are thread-safe and keep a connection pool."""
+    global _s3_client
+    with _client_lock:
+        if _s3_client is None:
+            from botocore.config import Config  # type: ignore
+
+            _s3_client = _optional("boto3").client(
+                "s3",
+                config=Config(
+                    max_pool_connections=max(SHARD_WORKERS, 10),
+                    connect_timeout=CONNECT_TIMEOUT,
+                    read_timeout=READ_TIMEOUT,
+                    retries={"max_attempts": SHARD_ATTEMPTS, "mode": "standard"},
+                ),
+            )
+        return _s3_client
+
+
+def _session():
+    """Process-wide ``requests.Session`` with a pool sized for the shard workers."""
+    global _http_session
+    with _client_lock:
+        if _http_session is None:
+            from requests.adapters import HTTPAdapter  # type: ignore
+            from urllib3.util.retry import Retry  # type: ignore
+
+            retry = Retry(
+                total=SHARD_ATTEMPTS - 1,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+            )
+            adapter = HTTPAdapter(pool_connections=SHARD_WORKERS, pool_maxsize=SHARD_WORKERS, max_retries=retry)
+            session = _optional("requests").Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def warm_clients(data_file) -> None:
+    """Create the pooled client ``data_file`` will need, ahead of the first fetch."""
+    scheme = urlparse(data_file).scheme
+    if scheme == "s3" and _optional("boto3") is not None:
+        _s3()
+    elif scheme in ("http", "https") and _optional("requests") is not None:
+        _session()
+
+
+def _fetch_s3(parsed, validators, load):
+    kwargs = {"Bucket": parsed.netloc, "Key": parsed.path.lstrip("/")}
+    if validators and validators.get("etag"):
+        kwargs["IfNoneMatch"] = validators["etag"]
+    try:
+        obj = _s3().get_object(**kwargs)
+    except Exception as exc:
+        if _is_not_modified(exc):
+            return validators, None
+        raise
+    body = obj["Body"]
+    try:
+        data = load(body.iter_chunks(chunk_size=CHUNK_SIZE))
+    finally:
+        body.close()
+    return {"etag": obj.get("ETag")}, data
+
+
+def _fetch_http(url, validators, load):
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    with _session().get(url, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True) as resp:
+        if resp.status_code == 304:
+            return validators, None
+        resp.raise_for_status()
+        new_validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+        return new_validators, load(resp.iter_content(chunk_size=CHUNK_SIZE))
+
+
+def _spooled(load_path):
+    """Adapt a path-based loader to chunks by spooling them to a temp file."""
+
+    def load(chunks):
+        fd, path = tempfile.mkstemp(prefix="dataset-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            return load_path(path)
+        finally:
+            # Memory maps opened by load_path stay valid after the unlink
+            os.unlink(path)
+
+    return load
+
+
+def _is_ndjson(path) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(4096).lstrip(b"\xef\xbb\xbf \t\r\n")
+    return head.startswith(b"{")
+
+
+def read_ndjson_tail(path, offset):
+    """Return ``(consumed, chunks)`` for the complete lines after byte ``offset``.
+
+    A trailing line without its newline is left out so a file that is still
+    being written is never parsed mid-record.
+    """
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        limit = offset
+        # Walk back from the end to the last newline
+        while pos > offset:
+            step = min(CHUNK_SIZE, pos - offset)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                limit = pos - step + newline + 1
+                break
+            pos -= step
+
+    def chunks():
+        with open(path, "rb") as f:
+            f.seek(offset)
+            remaining = limit - offset
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return limit - offset, chunks()
+
+
+def _fetch_local(candidate_paths, validators, load, load_path, load_appended):
+    for path in candidate_paths:
+        if os.path.exists(path):
+            st = os.stat(path)
+            new_validators = {"path": path, "ino": st.st_ino, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+            if validators == new_validators:
+                return validators, None
+            if (
+                load_appended is not None
+                and validators
+                and validators.get("path") == path
+                and validators.get("ino") == st.st_ino
+                and st.st_size > validators.get("size", 0)
+                and _is_ndjson(path)
+            ):
+                # NDJSON that only grew: load just the new complete lines
+                consumed, chunks = read_ndjson_tail(path, validators["size"])
+                new_validators["size"] = validators["size"] + consumed
+                return new_validators, Appended(load_appended(chunks))
+            if load_path is not None:
+                return new_validators, load_path(path)
+            with open(path, "rb") as f:
+                return new_validators, load(iter(lambda: f.read(CHUNK_SIZE), b""))
+    return {"path": None}, load(iter(()))
+
+
+def _is_manifest(data_file) -> bool:
+    parsed = urlparse(data_file)
+    # An HTTP(S) manifest may carry a query string, e.g. a presigned URL
+    path = parsed.path if parsed.scheme in ("http", "https") else data_file
+    return path.endswith(MANIFEST_SUFFIX)
+
+
+def is_sharded(data_file) -> bool:
+    """Whether ``data_file`` names a prefix, glob or manifest rather than one object.
+
+    HTTP(S) URLs cannot be listed, so only a manifest is sharded there; the
+    ``?`` and ``[`` of their query strings are not glob characters.
+    """
+    if urlparse(data_file).scheme in ("http", "https"):
+        return _is_manifest(data_file)
+    return (
+        data_file.endswith("/")
+        or _is_manifest(data_file)
+        or any(c in data_file for c in _GLOB_CHARS)
+    )
+
+
+def _read_manifest(manifest, candidate_paths):
+    parsed = urlparse(manifest)
+    if parsed.scheme == "s3":
+        body = _s3().get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))["Body"]
+        text = body.read().decode("utf-8")
+    elif parsed.scheme in ("http", "https"):
+        resp = _session().get(manifest, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        resp.raise_for_status()
+        text = resp.text
+        # Relative entries resolve against the manifest's path, not its query
+        manifest = parsed._replace(query="", fragment="").geturl()
+    else:
+        path = next((p for p in candidate_paths if os.path.exists(p)), None)
+        if path is None:
+            return []
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        manifest = path
+    base = manifest.rsplit("/", 1)[0] if "/" in manifest else ""
+    shards = []
+    for line in text.splitlines():
+        entry = line.split("#", 1)[0].strip()
+        if not entry:
+            continue
+        # Relative entries are resolved against the manifest's own location
+        if not urlparse(entry).scheme and not os.path.isabs(entry) and base:
+            entry = f"{base}/{entry}" if "://" in base else posixpath.join(base, entry)
+        shards.append(entry)
+    return shards
+
+
+def _list_s3(parsed):
+    pattern = parsed.path.lstrip("/")
+    glob_at = min((pattern.find(c) for c in _GLOB_CHARS if c in pattern), default=-1)
+    prefix = pattern if glob_at < 0 else pattern[:glob_at]
+    keys = []
+    for page in _s3().get_paginator("list_objects_v2").paginate(Bucket=parsed.netloc, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith("/") or (glob_at >= 0 and not fnmatch.fnmatchcase(key, pattern)):
+                continue
+            keys.append(key)
+    return [f"s3://{parsed.netloc}/{key}" for key in sorted(keys)]
+
+
+def list_shards(data_file, candidate_paths):
+    """Resolve a prefix, glob or manifest into its shard locations, in order.
+
+    Entries that would themselves be read as sharded (nested manifests, names
+    with glob characters) are left out: a shard must be a single object.
+    """
+    return [shard for shard in _list_shards(data_file, candidate_paths) if not is_sharded(shard)]
+
+
+def _list_shards(data_file, candidate_paths):
+    if _is_manifest(data_file):
+        return _read_manifest(data_file, candidate_paths)
+    parsed = urlparse(data_file)
+    if parsed.scheme == "s3":
+        return _list_s3(parsed)
+    if parsed.scheme in ("http", "https"):
+        raise ValueError(f"HTTP sources cannot be listed; point DATA_FILE at a {MANIFEST_SUFFIX} file instead")
+    for candidate in candidate_paths:
+        if candidate.endswith("/"):
+            if os.path.isdir(candidate):
+                names = sorted(n for n in os.listdir(candidate) if not n.startswith("."))
+                return [os.path.join(candidate, n) for n in names if os.path.isfile(os.path.join(candidate, n))]
+        else:
+            matches = sorted(p for p in glob.glob(candidate) if os.path.isfile(p))
+            if matches:
+                return matches
+    return []
+
+
+def _fetch_shard(shard, validators, load, load_path):
+    """Fetch one shard; transient errors are retried by the pooled clients alone."""
+    return fetch_dataset(shard, [shard], load, validators=validators, load_path=load_path)
+
+
+def _map_shards(fn, shards):
+    if not shards:
+        return []
+    with ThreadPoolExecutor(max_workers=min(SHARD_WORKERS, len(shards)), thread_name_prefix="shards") as pool:
+        return list(pool.map(fn, shards))
+
+
+def _fetch_sharded(data_file, candidate_paths, load, validators, load_path, combine):
+    shards = list_shards(data_file, candidate_paths)
+    previous = (validators or {}).get("shards", {})
+    results = _map_shards(lambda shard: _fetch_shard(shard, previous.get(shard), load, load_path), shards)
+    if validators is not None and set(shards) == set(previous) and all(data is None for _, data in results):
+        return validators, None
+
+    # Something changed, so shards that answered "not modified" are needed in full
+    unchanged = [i for i, (_, data) in enumerate(results) if data is None]
+    reloaded = _map_shards(lambda i: _fetch_shard(shards[i], None, load, load_path), unchanged)
+    for i, result in zip(unchanged, reloaded):
+        results[i] = result
+    if not results:
+        return {"shards": {}}, load(iter(()))
+    new_validators = {"shards": {shard: shard_validators for shard, (shard_validators, _) in zip(shards, results)}}
+    return new_validators, combine([data for _, data in results])
+
+
+def fetch_dataset(
+    data_file,
+    candidate_paths,
+    load,
+    validators=None,
+    load_path=None,
+    load_appended=None,
+    combine=list,
+):
+    """Fetch ``data_file`` unless it still matches ``validators``.
+
+    Returns ``(validators, data)``; ``data`` is ``None`` when the source is
+    unchanged. S3 and HTTP(S) use conditional GETs (ETag / Last-Modified),
+    local files compare mtime and size. ``load`` consumes an iterator of byte
+    chunks and returns the dataset; a missing local file loads as no chunks.
+    ``candidate_paths`` lists where a local file may live. Formats that must
+    be read from a file (memory-mapped snapshots) pass ``load_path`` instead;
+    remote bodies are then spooled to a temporary file first. When
+    ``load_appended`` is given and a local NDJSON file has only grown, just
+    the appended lines are loaded and returned wrapped in ``Appended``.
+
+    Sharded sources (see ``is_sharded``) load every shard concurrently and
+    return ``combine(parts)``, the parts being in shard order.
+    """
+    if is_sharded(data_file):
+        return _fetch_sharded(data_file, candidate_paths, load, validators, load_path, combine)
+    parsed = urlparse(data_file)
+    remote_load = _spooled(load_path) if load_path is not None else load
+    if parsed.scheme == "s3" and _optional("boto3") is not None:
+        return _fetch_s3(parsed, validators, remote_load)
+    if parsed.scheme in ("http", "https") and _optional("requests") is not None:
+        return _fetch_http(data_file, validators, remote_load)
+    return _fetch_local(candidate_paths, validators, load, load_path, load_appended)
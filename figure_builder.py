@@ -0,0 +1,241 @@
+"""Concurrent construction and serialization of the dashboard figures.
+
+Each chart is built and serialized (``create_*`` followed by ``to_json``) as
+its own task on a worker pool, so a full build takes roughly as long as the
+slowest chart. A chart that raises is replaced by a placeholder figure and
+logged instead of failing the whole dashboard.
+
+``FIGURE_EXECUTOR`` selects ``thread`` (default), ``process`` or ``serial``;
+``FIGURE_WORKERS`` caps the pool size. Process pools side-step the GIL for
+plotly's pure-Python figure building but need POSIX semaphores, which AWS
+Lambda does not provide, so keep threads there.
+
+Figures are serialized by ``encode_figure``: numeric arrays become base64
+typed arrays (``{"dtype": "f8", "bdata": ...}``, read natively by
+plotly.js >= 2.28) instead of decimal text, and the JSON is written by
+orjson when it is installed. ``FIGURE_TYPED_ARRAYS=0`` restores plain
+``to_json`` output.
+"""
+import base64
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import plotly.io as pio
+
+import metrics
+import step_3_dashboard as dashboard
+
+logger = logging.getLogger(__name__)
+
+_thread_pool = None
+_worker_frame = None
+
+TYPED_ARRAYS = os.environ.get("FIGURE_TYPED_ARRAYS", "1") != "0"
+# Shorter arrays stay as JSON lists; the base64 wrapper is not worth it
+TYPED_ARRAY_MIN_LENGTH = 16
+try:
+    import orjson  # noqa: F401
+
+    JSON_ENGINE = "orjson"
+except ImportError:  # pragma: no cover
+    JSON_ENGINE = "json"
+
+# Smallest first; plotly.js has no 64-bit integer typed array
+_INTEGER_CODES = (("u1", np.uint8), ("i1", np.int8), ("u2", np.uint16), ("i2", np.int16), ("u4", np.uint32), ("i4", np.int32))
+# Floats with at most this many decimals are shorter as JSON text
+SHORT_DECIMALS = 4
+
+
+def _typed_array(values):
+    """Base64 typed-array spec for ``values``, or ``values`` when text is as compact."""
+    if values.dtype.kind in "iu":
+        low, high = values.min(), values.max()
+        for code, dtype in _INTEGER_CODES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                values = values.astype(f"<{code}", copy=False)
+                break
+        else:
+            return values
+    else:
+        if np.array_equal(np.round(values, SHORT_DECIMALS), values):
+            # e.g. confidence scores: "0.585" beats 8 bytes of base64
+            return values
+        code = "f4" if values.dtype.itemsize == 4 else "f8"
+        values = values.astype(f"<{code}", copy=False)
+    return {"dtype": code, "bdata": base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")}
+
+
+def _with_typed_arrays(value):
+    if isinstance(value, dict):
+        return {key: _with_typed_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_with_typed_arrays(item) for item in value]
+    if (
+        isinstance(value, np.ndarray)
+        and value.ndim == 1
+        and value.size >= TYPED_ARRAY_MIN_LENGTH
+        and value.dtype.kind in "fiu"
+    ):
+        return _typed_array(value)
+    return value
+
+
+def encode_figure(figure) -> str:
+    """Serialize a figure, with numeric trace arrays as base64 typed arrays."""
+    if not TYPED_ARRAYS:
+        return figure.to_json(engine=JSON_ENGINE)
+    plotly_json = figure.to_plotly_json()
+    plotly_json["data"] = _with_typed_arrays(plotly_json["data"])
+    return pio.json.to_json_plotly(plotly_json, engine=JSON_ENGINE)
+
+
+def placeholder_figure_json(name, error=None) -> str:
+    """Serialized empty figure shown in place of a chart that failed to build."""
+    message = "This chart could not be built"
+    if error is not None:
+        message += f" ({type(error).__name__})"
+    return json.dumps({
+        "data": [],
+        "layout": {
+            "title": {"text": name.replace("_", " ").title()},
+            "template": "plotly_white",
+            "height": 500,
+            "xaxis": {"visible": False},
+            "yaxis": {"visible": False},
+            "annotations": [{
+                "text": message,
+                "xref": "paper",
+                "yref": "paper",
+                "x": 0.5,
+                "y": 0.5,
+                "showarrow": False,
+                "font": {"size": 16, "color": "#7f8c8d"},
+            }],
+        },
+    })
+
+
+def render_figure(name, df, aggregates=None, word_index=None) -> str:
+    """Build and serialize one figure, falling back to a placeholder on error."""
+    try:
+        with metrics.span(f"create.{name}"):
+            figure = dashboard.create_figure(name, df, aggregates, word_index=word_index)
+        with metrics.span(f"to_json.{name}"):
+            return encode_figure(figure)
+    except Exception as exc:
+        logger.exception("Building figure %s failed", name)
+        return placeholder_figure_json(name, exc)
+
+
+def _set_worker_frame(df, aggregates, word_index):
+    global _worker_frame
+    _worker_frame = (df, aggregates, word_index)
+
+
+def _render_in_worker(name) -> str:
+    return render_figure(name, *_worker_frame)
+
+
+class _TimedFuture(Future):
+    """Figure JSON rendered on the shared thread pool, with the chart's stage timings.
+
+    The ``create.<name>`` and ``to_json.<name>`` timings go to the thread that
+    waited in ``result()`` for the chart, so that request reports them in its
+    Server-Timing header; a chart nobody waited for feeds the histogram.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._timings = None
+        self._waited = False
+        self._timings_lock = threading.Lock()
+
+    def _settle(self, inner):
+        try:
+            figure_json, timings = inner.result()
+        except Exception as exc:
+            self.set_exception(exc)
+            return
+        with self._timings_lock:
+            waited = self._waited
+            if waited:
+                self._timings = timings
+        if not waited:
+            # Pool threads have no metrics job, so these go straight to the histogram
+            metrics.record(timings)
+        self.set_result(figure_json)
+
+    def result(self, timeout=None):
+        with self._timings_lock:
+            self._waited = self._waited or not self.done()
+        figure_json = super().result(timeout)
+        with self._timings_lock:
+            timings, self._timings = self._timings, None
+        if timings:
+            metrics.record(timings)
+        return figure_json
+
+
+def _submit_timed(pool, name, df, aggregates, word_index):
+    future = _TimedFuture()
+    pool.submit(metrics.collect, render_figure, name, df, aggregates, word_index).add_done_callback(future._settle)
+    return future
+
+
+def _shared_thread_pool(max_workers):
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="figures")
+    return _thread_pool
+
+
+def submit_figures(df, names=None, executor=None, max_workers=None, aggregates=None, word_index=None) -> dict:
+    """Start building ``names`` (default: all figures) and return ``{name: Future}``.
+
+    ``aggregates`` is an optional ``AggregateStore`` for the charts that can
+    render from running totals; ``word_index`` an optional prebuilt
+    ``WordFrequencyIndex`` for the word analysis.
+    """
+    names = list(names or dashboard.FIGURE_BUILDERS)
+    executor = executor or os.environ.get("FIGURE_EXECUTOR", "thread")
+    max_workers = max_workers or int(os.environ.get("FIGURE_WORKERS", "0")) or len(dashboard.FIGURE_BUILDERS)
+
+    if executor == "serial":
+        futures = {}
+        for name in names:
+            futures[name] = Future()
+            futures[name].set_result(render_figure(name, df, aggregates, word_index))
+        return futures
+    if executor == "process":
+        # The frame is pickled once per worker rather than once per chart
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(names)) or 1,
+            initializer=_set_worker_frame,
+            initargs=(df, aggregates, word_index),
+        ) as pool:
+            futures = {name: pool.submit(_render_in_worker, name) for name in names}
+        return futures
+    if executor != "thread":
+        raise ValueError(f"Unknown FIGURE_EXECUTOR {executor!r}")
+    pool = _shared_thread_pool(max_workers)
+    # Spans on pool threads miss the request's metrics job, so their timings travel with the future
+    return {name: _submit_timed(pool, name, df, aggregates, word_index) for name in names}
+
+
+def build_figures(df, names=None, executor=None, max_workers=None, aggregates=None) -> dict:
+    """Build figures concurrently and return ``{name: figure JSON}`` in display order."""
+    futures = submit_figures(df, names, executor=executor, max_workers=max_workers, aggregates=aggregates)
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as exc:
+            # Only reachable when a worker process itself dies
+            logger.exception("Figure worker for %s failed", name)
+            results[name] = placeholder_figure_json(name, exc)
+    return results
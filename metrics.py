@@ -0,0 +1,242 @@
+"""In-process metrics: per-stage timings, Prometheus-style counters and logs.
+
+Code wraps each pipeline stage in ``span(stage)`` (or an iterator in
+``timed_iter``). Spans nest and each records its own time only, so a
+``prepare`` span around streaming ``parse`` and ``download`` work is charged
+just for the preparation itself. While a job is active (one per request,
+see ``begin_job``) the times are collected for the ``Server-Timing``
+header; either way they end up in the ``dashboard_stage_seconds``
+histogram. ``render_prometheus`` renders every metric in the Prometheus
+text format, and ``log_event`` writes one JSON object per line, which
+CloudWatch Logs Insights can filter on field by field.
+
+Counts are per process, which on Lambda means per warm container.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("dashboard.metrics")
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REGISTRY = []
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    type = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + _format_labels(key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Last value set per label set"""
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Bucketed observations per label set, with sum and count"""
+
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._values = {}  # label key -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def count(self, **labels):
+        state = self._values.get(_label_key(labels))
+        return sum(state[:-1]) if state else 0
+
+    def samples(self):
+        lines = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), state[:-1]):
+                    cumulative += n
+                    lines.append((f"{self.name}_bucket" + _format_labels(key, [("le", bound)]), cumulative))
+                lines.append((f"{self.name}_sum" + _format_labels(key), state[-1]))
+                lines.append((f"{self.name}_count" + _format_labels(key), cumulative))
+        return lines
+
+
+REQUEST_SECONDS = Histogram("dashboard_request_seconds", "Request latency by endpoint")
+STAGE_SECONDS = Histogram("dashboard_stage_seconds", "Time spent in each pipeline stage")
+CACHE_LOOKUPS = Counter("dashboard_cache_lookups_total", "Dashboard cache lookups by result")
+CACHE_REFRESHES = Counter("dashboard_cache_refreshes_total", "Source revalidations by outcome")
+CACHE_EVICTIONS = Counter("dashboard_cache_evictions_total", "Entries evicted to stay within the cache budget")
+CACHE_BYTES = Gauge("dashboard_cache_bytes", "Estimated memory held by cached dashboards")
+CACHE_ENTRIES = Gauge("dashboard_cache_entries", "Dashboards held in the cache")
+LOAD_FAILURES = Counter("dashboard_load_failures_total", "Dataset loads or revalidations that raised")
+DATASET_ROWS = Gauge("dashboard_dataset_rows", "Rows in the cached dataset")
+DATASET_BYTES = Gauge("dashboard_dataset_bytes", "Memory held by the cached dataset's columns")
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(f"{name} {value}" for name, value in metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+_job = contextvars.ContextVar("metrics_job", default=None)
+_spans = contextvars.ContextVar("metrics_spans", default=())
+
+
+def begin_job():
+    """Start collecting stage times in the current context; pass the result to ``end_job``."""
+    return _job.set({})
+
+
+def end_job(token) -> dict:
+    """Stop collecting, feed the stage histogram and return ``{stage: seconds}``."""
+    timings = _job.get()
+    _job.reset(token)
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    return timings
+
+
+def collect(fn, *args):
+    """Run ``fn(*args)`` as a job of its own and return ``(result, {stage: seconds})``.
+
+    Pool threads do not see the submitting request's job; work done there
+    hands its timings back to be passed to ``record`` on the request's thread.
+    """
+    token = _job.set({})
+    try:
+        result = fn(*args)
+    finally:
+        timings = _job.get()
+        _job.reset(token)
+    return result, timings
+
+
+def record(timings):
+    """Charge ``{stage: seconds}`` measured elsewhere (see ``collect``) to the current job."""
+    for stage, seconds in timings.items():
+        _record(stage, seconds)
+
+
+def _record(stage, seconds):
+    timings = _job.get()
+    if timings is None:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    else:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage):
+    """Charge the time of the ``with`` block, minus nested spans, to ``stage``."""
+    parent = _spans.get()
+    frame = [0.0]  # time spent in nested spans
+    token = _spans.set(parent + (frame,))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _spans.reset(token)
+        if parent:
+            parent[-1][0] += elapsed
+        _record(stage, elapsed - frame[0])
+
+
+def timed_iter(iterable, stage):
+    """Yield from ``iterable``, charging the time spent producing items to ``stage``."""
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            parent = _spans.get()
+            frame = [0.0]
+            token = _spans.set(parent + (frame,))
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - started
+                _spans.reset(token)
+                if parent:
+                    parent[-1][0] += elapsed
+                total += elapsed - frame[0]
+            yield item
+    finally:
+        _record(stage, total)
+
+
+def server_timing(timings, total=None) -> str:
+    """``Server-Timing`` header value for ``{stage: seconds}`` (durations in ms)."""
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def log_event(event, level=logging.INFO, exc_info=False, **fields):
+    """Log one JSON object, ``{"event": event, **fields}``, on a single line."""
+    logger.log(level, json.dumps({"event": event, **fields}, default=str, separators=(",", ":")), exc_info=exc_info)
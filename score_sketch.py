@@ -0,0 +1,102 @@
+"""Mergeable quantile sketches of confidence scores.
+
+A sketch counts scores into ``SKETCH_BINS`` bins centred on the multiples of
+``1 / SKETCH_RESOLUTION`` over [0, 1] (scores outside are clamped to the
+ends). Sketches merge by adding their counts, so a day, a category, a shard or
+a whole date range is the same couple of hundred integers however many posts
+it covers, and combining them costs O(bins), never O(posts).
+
+Quantiles use the nearest-rank (inverted CDF) definition over the bin values:
+exact for scores on the ``1 / SKETCH_RESOLUTION`` grid (every two-decimal
+score) and within half a bin width otherwise.
+"""
+import numpy as np
+
+SKETCH_RESOLUTION = 200
+SKETCH_BINS = SKETCH_RESOLUTION + 1
+
+# Quantiles shown as bands on the timeline and in the summary stats
+BAND_QUANTILES = (0.1, 0.5, 0.9)
+
+
+def sketch_bins(scores):
+    """Sketch bin of each score; NaN scores must be dropped first"""
+    scores = np.asarray(scores, dtype='float64')
+    return np.clip(np.floor(scores * SKETCH_RESOLUTION + 0.5), 0, SKETCH_RESOLUTION).astype(np.intp)
+
+
+def grouped_counts(codes, scores, groups):
+    """``[groups, SKETCH_BINS]`` bin counts of ``scores`` by integer group code
+
+    Codes outside ``0..groups - 1`` (e.g. -1 for a missing category) and NaN
+    scores are left out.
+    """
+    codes = np.asarray(codes, dtype=np.intp)
+    scores = np.asarray(scores, dtype='float64')
+    keep = (codes >= 0) & (codes < groups) & ~np.isnan(scores)
+    flat = codes[keep] * SKETCH_BINS + sketch_bins(scores[keep])
+    return np.bincount(flat, minlength=groups * SKETCH_BINS).reshape(groups, SKETCH_BINS)
+
+
+def quantiles(counts, qs=BAND_QUANTILES):
+    """Nearest-rank quantiles ``qs`` of each row of bin counts, shape ``[rows, len(qs)]``
+
+    Rows without any scores give NaN.
+    """
+    counts = np.atleast_2d(np.asarray(counts))
+    cumulative = np.cumsum(counts, axis=1)
+    totals = cumulative[:, -1:]
+    # Rounded before the ceiling so that e.g. 0.1 * 30 is rank 3, not 4
+    ranks = np.maximum(np.ceil(np.round(np.asarray(qs, dtype='float64')[None, :] * totals, 9)), 1)
+    # First bin whose cumulative count reaches each rank
+    bins = (cumulative[:, None, :] < ranks[:, :, None]).sum(axis=2)
+    values = np.minimum(bins, SKETCH_RESOLUTION) / SKETCH_RESOLUTION
+    values[totals[:, 0] == 0] = np.nan
+    return values
+
+
+class QuantileSketch:
+    """Mergeable bin counts of one set of confidence scores"""
+
+    def __init__(self, counts=None):
+        if counts is None:
+            counts = np.zeros(SKETCH_BINS, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_scores(cls, scores):
+        return cls().add(scores)
+
+    def add(self, scores):
+        """Count more scores in; NaN scores are ignored"""
+        scores = np.asarray(scores, dtype='float64')
+        self.counts = self.counts + np.bincount(sketch_bins(scores[~np.isnan(scores)]), minlength=SKETCH_BINS)
+        return self
+
+    def merge(self, other):
+        """Add another sketch's counts into this one"""
+        self.counts = self.counts + other.counts
+        return self
+
+    @classmethod
+    def combine(cls, sketches):
+        """A new sketch over everything the given sketches counted"""
+        combined = cls()
+        for sketch in sketches:
+            combined.merge(sketch)
+        return combined
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def quantile(self, q):
+        return float(quantiles(self.counts, (q,))[0, 0])
+
+    def quantiles(self, qs=BAND_QUANTILES):
+        """The quantiles ``qs`` as a list of floats (NaN when empty)"""
+        return [float(value) for value in quantiles(self.counts, qs)[0]]
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes
@@ -0,0 +1,258 @@
+"""Inverted index for full-text search over post and reasoning text.
+
+Each indexed column (``tweet`` and ``reasoning``) gets posting lists from
+word to the posts containing it, tokenized like the word analysis
+(``word_frequency.tokenize_batch``: lowercase ASCII words, here of at least
+``SEARCH_MIN_LENGTH`` letters, stopwords kept). Postings are ascending
+numpy arrays of 32-bit row numbers (positions in the index's sorted row
+labels, the post ids) with a 16-bit term count per post, so a query is a few
+binary searches plus vectorized intersections, never a pass over the text.
+
+Appended rows become a new segment; once there are ``MAX_SEGMENTS``, the
+segments are merged into one. ``extend`` builds the new rows, lengths and
+segments off to the side and swaps them in as one value, so a search running
+meanwhile sees the index before or after the append, never half of it. ``search_posts`` ranks matches with BM25
+(``tweet`` weighted above ``reasoning``), filters them by category and date
+range through the prepared frame and returns one page.
+
+    index = SearchIndex.from_frame(df)
+    page = search_posts(df, index, 'price increase', categories=['Negative'], start='2025-08-01')
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+import step_3_dashboard as dashboard
+from word_frequency import DOCUMENT_SEPARATOR, tokenize, tokenize_batch, WORD_ENTRY_BYTES
+
+SEARCH_MIN_LENGTH = 2
+# Ranking weight of a match in each indexed column
+FIELD_WEIGHTS = {'tweet': 1.0, 'reasoning': 0.5}
+# Texts tokenized per regex scan while building
+INDEX_BATCH = 10000
+MAX_SEGMENTS = 8
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class _Segment:
+    """Postings of one column for a run of rows: ``docs[offsets[i]:offsets[i + 1]]`` contain ``terms[i]``
+
+    ``docs`` are row numbers of the index, ``counts`` how often the term occurs in each.
+    """
+
+    def __init__(self, terms, offsets, docs, counts):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.counts = counts
+
+    @classmethod
+    def from_pairs(cls, terms, docs, counts):
+        """Segment from (term, doc, count) triples, in any order"""
+        order = np.lexsort((docs, terms))
+        terms, docs, counts = terms[order], docs[order], counts[order]
+        unique, starts = np.unique(terms, return_index=True)
+        offsets = np.append(starts, len(terms)).astype(np.int64)
+        counts = np.minimum(counts, np.iinfo(np.uint16).max)
+        return cls(unique.astype(np.int32), offsets, docs.astype(np.int32), counts.astype(np.uint16))
+
+    def postings(self, term):
+        i = int(np.searchsorted(self.terms, term))
+        if i == len(self.terms) or self.terms[i] != term:
+            return self.docs[:0], self.counts[:0]
+        return self.docs[self.offsets[i]:self.offsets[i + 1]], self.counts[self.offsets[i]:self.offsets[i + 1]]
+
+    def pairs(self):
+        return np.repeat(self.terms, np.diff(self.offsets)), self.docs, self.counts
+
+    @property
+    def nbytes(self):
+        return self.terms.nbytes + self.offsets.nbytes + self.docs.nbytes + self.counts.nbytes
+
+
+class SearchIndex:
+    """Append-only inverted index of text columns, addressed by row label"""
+
+    def __init__(self, fields=tuple(FIELD_WEIGHTS), min_length=SEARCH_MIN_LENGTH):
+        self.fields = list(fields)
+        self.min_length = min_length
+        self.vocabulary = {}  # word -> term id, shared by the fields; only ever grows
+        self._rows = (
+            np.zeros(0, dtype=np.int64),  # label of each row number, ascending
+            {field: np.zeros(0, dtype=np.int32) for field in self.fields},  # tokens per row
+            {field: [] for field in self.fields},  # segments
+        )
+
+    @property
+    def labels(self):
+        return self._rows[0]
+
+    @property
+    def lengths(self):
+        return self._rows[1]
+
+    @property
+    def segments(self):
+        return self._rows[2]
+
+    @classmethod
+    def from_frame(cls, df, fields=tuple(FIELD_WEIGHTS)):
+        """Index the text ``fields`` of a prepared frame"""
+        index = cls([field for field in fields if field in df.columns])
+        index.extend(df)
+        return index
+
+    def extend(self, df):
+        """Index the rows of ``df``, whose labels must all exceed those indexed"""
+        df = df[self.fields].sort_index()
+        labels = df.index.to_numpy(dtype=np.int64)
+        if len(labels) == 0:
+            return self
+        old_labels, old_lengths, old_segments = self._rows
+        if len(old_labels) and labels[0] <= old_labels[-1]:
+            raise ValueError('SearchIndex.extend needs new row labels above the indexed ones')
+        lengths, segments = {}, {}
+        for field in self.fields:
+            segment, field_lengths = self._index_column(df[field].tolist(), len(old_labels))
+            lengths[field] = np.concatenate([old_lengths[field], field_lengths])
+            segments[field] = old_segments[field] + [segment]
+            if len(segments[field]) > MAX_SEGMENTS:
+                segments[field] = [_Segment.from_pairs(*map(np.concatenate, zip(*(s.pairs() for s in segments[field]))))]
+        self._rows = (np.concatenate([old_labels, labels]), lengths, segments)
+        return self
+
+    def _index_column(self, texts, first_row):
+        """One column's segment and per-row token counts, numbering rows from ``first_row``"""
+        terms, docs, counts = [], [], []
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        for start in range(0, len(texts), INDEX_BATCH):
+            batch = texts[start:start + INDEX_BATCH]
+            codes, uniques = pd.factorize(np.asarray(tokenize_batch(batch, self.min_length), dtype=object))
+            is_separator = np.isin(codes, np.flatnonzero(uniques == DOCUMENT_SEPARATOR))
+            rows = np.cumsum(is_separator)[~is_separator]
+            # Batch-local codes to vocabulary ids; only the batch's distinct words go through the dict
+            ids = np.array([
+                -1 if word == DOCUMENT_SEPARATOR else self.vocabulary.setdefault(word, len(self.vocabulary))
+                for word in uniques
+            ], dtype=np.int64)
+            term_ids = ids[codes[~is_separator]]
+            lengths[start:start + len(batch)] = np.bincount(rows, minlength=len(batch))
+            pairs, pair_counts = np.unique(term_ids * len(batch) + rows, return_counts=True)
+            terms.append(pairs // len(batch))
+            docs.append(first_row + start + pairs % len(batch))
+            counts.append(pair_counts)
+        if not terms:
+            empty = np.zeros(0, dtype=np.int64)
+            return _Segment.from_pairs(empty, empty, empty), lengths
+        return _Segment.from_pairs(np.concatenate(terms), np.concatenate(docs), np.concatenate(counts)), lengths
+
+    def terms(self, query):
+        """A query's distinct words, tokenized like the indexed text"""
+        return list(dict.fromkeys(tokenize(query, self.min_length)))
+
+    def postings(self, field, word, segments=None):
+        """``(rows, counts)`` of the row numbers whose ``field`` contains ``word``, ascending"""
+        segments = self.segments if segments is None else segments
+        term = self.vocabulary.get(word)
+        parts = [segment.postings(term) for segment in segments[field]] if term is not None else []
+        if not parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16)
+        return np.concatenate([docs for docs, _ in parts]), np.concatenate([counts for _, counts in parts])
+
+    def search(self, query):
+        """``(labels, scores)`` of the rows containing every query word in some field, by label
+
+        Scores are BM25 summed over words and fields, each field weighted
+        by ``FIELD_WEIGHTS``. A query without words matches nothing.
+        """
+        words = self.terms(query)
+        if not words:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        # One consistent version of the rows, whatever extend does meanwhile
+        labels, all_lengths, segments = self._rows
+        postings = {(field, word): self.postings(field, word, segments) for field in self.fields for word in words}
+        matches = None
+        for word in words:
+            rows = np.unique(np.concatenate([postings[(field, word)][0] for field in self.fields]))
+            matches = rows if matches is None else np.intersect1d(matches, rows, assume_unique=True)
+            if len(matches) == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0)
+        scores = np.zeros(len(matches))
+        total = len(labels)
+        for field in self.fields:
+            lengths = all_lengths[field]
+            average = max(float(lengths.mean()), 1.0)
+            norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths[matches] / average)
+            for word in words:
+                docs, counts = postings[(field, word)]
+                if len(docs) == 0:
+                    continue
+                idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+                # Postings and matches are both ascending: find each posting's slot in matches
+                positions = np.minimum(np.searchsorted(matches, docs), len(matches) - 1)
+                hit = matches[positions] == docs
+                positions, tf = positions[hit], counts[hit].astype('float64')
+                scores[positions] += FIELD_WEIGHTS.get(field, 1.0) * idf * tf * (BM25_K1 + 1) / (tf + norms[positions])
+        return labels[matches], scores
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def nbytes(self):
+        """Memory held by the postings, row arrays and vocabulary"""
+        labels, lengths, segments = self._rows
+        return (
+            sum(segment.nbytes for field_segments in segments.values() for segment in field_segments)
+            + sum(field_lengths.nbytes for field_lengths in lengths.values())
+            + labels.nbytes
+            + (WORD_ENTRY_BYTES + 48) * len(self.vocabulary)
+        )
+
+
+def search_posts(df, index, query='', categories=None, start=None, end=None, page=1, per_page=20):
+    """One page of the posts in ``df`` matching ``query``, best first
+
+    ``categories`` keeps posts whose ``sentiment_category`` or
+    ``broad_category`` is among them; ``start``/``end`` select a date range as
+    in ``step_3_dashboard.filter_date_range``. Without query words every post
+    passing the filters matches, newest first. Returns ``{'terms', 'total',
+    'results'}`` with ``results`` a list of ``(post id, score)``.
+    """
+    # Positions of the selected date range in the timestamp-sorted frame
+    window = dashboard.filter_date_range(df, start, end)
+    lo = 0 if len(window) == 0 else df.index.get_loc(window.index[0])
+    hi = lo + len(window)
+
+    if index.terms(query):
+        labels, scores = index.search(query)
+        positions = df.index.get_indexer(labels)
+        # Rows appended to the index after this frame was taken are not in it
+        keep = (positions >= lo) & (positions < hi)
+        labels, scores, positions = labels[keep], scores[keep], positions[keep]
+    else:
+        positions = np.arange(lo, hi)
+        scores = np.zeros(len(positions))
+        labels = df.index.to_numpy()[positions]
+
+    if categories:
+        wanted = set(categories)
+        keep = np.zeros(len(positions), dtype=bool)
+        for column in ('sentiment_category', 'broad_category'):
+            values = df[column].cat.categories
+            codes = [code for code, value in enumerate(values) if value in wanted]
+            keep |= np.isin(df[column].cat.codes.to_numpy()[positions], codes)
+        labels, scores, positions = labels[keep], scores[keep], positions[keep]
+
+    # Best score first, then the newest post (positions follow the timestamps)
+    order = np.lexsort((-positions, -scores))
+    first = (page - 1) * per_page
+    chosen = order[first:first + per_page]
+    return {
+        'terms': index.terms(query),
+        'total': len(labels),
+        'results': [(int(label), float(score)) for label, score in zip(labels[chosen], scores[chosen])],
+    }
@@ -0,0 +1,287 @@
+"""Columnar on-disk snapshots of the prepared dataset.
+
+A snapshot stores the output of ``step_3_dashboard.prepare_data`` column by
+column in a single file so that loading it is a handful of ``mmap`` calls
+instead of a JSON parse:
+
+* numeric and timestamp columns are raw little-endian arrays, memory-mapped
+  and handed to pandas without copying;
+* low-cardinality labels (categories, months, days, dates) are stored as
+  small integer codes plus their distinct values;
+* free text (posts, reasoning) is one UTF-8 blob plus character offsets.
+
+Layout: ``MAGIC``, format version (u32), header length (u32), JSON header,
+then 64-byte aligned column blocks whose offsets the header records relative
+to the start of the data section.
+
+Convert an export with::
+
+    python snapshot.py nestle_threads_sentiment_analysis_2025-08-12.json dataset.snap
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"SENTSNAP"
+FORMAT_VERSION = 3
+SNAPSHOT_SUFFIX = ".snap"
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+# Object columns with at most this many distinct values are stored as codes
+MAX_CATEGORIES = 1 << 15
+# Bytes of a text blob examined at a time when locating a row
+SCAN_BYTES = 1 << 20
+
+
+def is_snapshot_path(path: str) -> bool:
+    """Whether ``path`` names a columnar snapshot rather than a JSON export."""
+    return path.endswith(SNAPSHOT_SUFFIX)
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _code_dtype(n_categories: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _encode_categories(series, meta):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Keep the dtype's own categories (and their order), unused ones included
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series, sort=True)
+    values = list(uniques)
+    if values and isinstance(values[0], dt.date):
+        meta["value_type"] = "date"
+        values = [v.isoformat() for v in values]
+    else:
+        meta["value_type"] = "str"
+    meta.update(kind="category", categories=values)
+    codes = codes.astype(_code_dtype(len(values)))
+    meta["dtype"] = codes.dtype.str
+    return [("codes", codes)]
+
+
+def _encode_text(series, meta):
+    nulls = np.flatnonzero(series.isna().to_numpy())
+    strings = series.fillna("").astype(str).tolist()
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in strings], out=offsets[1:])
+    meta["kind"] = "text"
+    return [
+        ("blob", np.frombuffer("".join(strings).encode("utf-8"), dtype=np.uint8)),
+        ("offsets", offsets),
+        ("nulls", nulls.astype(np.int64)),
+    ]
+
+
+def _encode_column(series):
+    """Return the column's header entry and its named data blocks."""
+    meta = {"name": series.name}
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        meta["categorical"] = True
+        return meta, _encode_categories(series, meta)
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        meta.update(kind="datetime", tz=str(dtype.tz) if getattr(dtype, "tz", None) else None)
+        return meta, [("values", series.array.asi8.astype("<i8"))]
+    if pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        values = series.to_numpy()
+        meta.update(kind="numeric", dtype=values.dtype.newbyteorder("<").str)
+        return meta, [("values", values.astype(values.dtype.newbyteorder("<")))]
+
+    inferred = pd.api.types.infer_dtype(series, skipna=True)
+    if inferred == "datetime":
+        # Mixed UTC offsets cannot share one column; normalise to UTC
+        meta.update(kind="datetime", tz="UTC")
+        return meta, [("values", pd.to_datetime(series, utc=True).array.asi8.astype("<i8"))]
+    if inferred == "date":
+        return meta, _encode_categories(series, meta)
+    n_unique = series.nunique(dropna=False)
+    if inferred == "string" and n_unique <= MAX_CATEGORIES and n_unique * 2 <= max(len(series), 2):
+        return meta, _encode_categories(series, meta)
+    return meta, _encode_text(series, meta)
+
+
+def write_snapshot(df, path):
+    """Write a prepared frame to ``path`` atomically."""
+    columns = []
+    blocks = []
+    offset = 0
+    frames = [("__index__", pd.Series(df.index.to_numpy(), name="__index__"))]
+    frames += [(name, df[name]) for name in df.columns]
+    for name, series in frames:
+        meta, arrays = _encode_column(series.rename(name))
+        meta["blocks"] = {}
+        for block_name, array in arrays:
+            array = np.ascontiguousarray(array)
+            meta["blocks"][block_name] = {"offset": offset, "length": len(array), "dtype": array.dtype.str}
+            blocks.append((offset, array))
+            offset = _align(offset + array.nbytes)
+        columns.append(meta)
+
+    header = json.dumps({"rows": len(df), "columns": columns}).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for block_offset, array in blocks:
+            f.seek(data_start + block_offset)
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a sentiment snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} in {path}")
+        header = json.loads(f.read(header_len))
+    return header, _align(_PREAMBLE.size + header_len)
+
+
+def _map_block(path, data_start, block):
+    dtype = np.dtype(block["dtype"])
+    if block["length"] == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=data_start + block["offset"], shape=(block["length"],))
+
+
+class _TextSlicer:
+    """Decode rows ``lo:hi`` of a text column without decoding the rest of the blob.
+
+    Offsets count characters, so a row's byte position is found by counting
+    UTF-8 lead bytes. The last position found is remembered, so reading the
+    rows in order scans the blob once.
+    """
+
+    def __init__(self, blob, offsets, nulls):
+        self.blob = blob
+        self.offsets = offsets
+        self.nulls = nulls
+        self._known = (0, 0)  # (character, byte) of a character boundary
+
+    def _byte_at(self, char):
+        if char == 0:
+            return 0
+        if char == int(self.offsets[-1]):
+            return len(self.blob)
+        known_char, known_byte = self._known if char >= self._known[0] else (0, 0)
+        if known_char == char:
+            return known_byte
+        # Scan on until the character's own lead byte: a window may end inside a character
+        while True:
+            window = np.asarray(self.blob[known_byte:known_byte + SCAN_BYTES])
+            starts = np.flatnonzero((window & 0xC0) != 0x80)
+            if char - known_char < len(starts):
+                known_byte += int(starts[char - known_char])
+                break
+            known_char += len(starts)
+            known_byte += len(window)
+        self._known = (char, known_byte)
+        return known_byte
+
+    def slice(self, lo, hi):
+        first, last = int(self.offsets[lo]), int(self.offsets[hi])
+        text = bytes(self.blob[self._byte_at(first):self._byte_at(last)]).decode("utf-8")
+        offsets = (np.asarray(self.offsets[lo:hi + 1]) - first).tolist()
+        values = np.empty(hi - lo, dtype=object)
+        values[:] = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        nulls = np.asarray(self.nulls)
+        values[nulls[(nulls >= lo) & (nulls < hi)] - lo] = None
+        return values
+
+
+def _column_reader(path, data_start, meta):
+    """Return ``read(lo, hi)``, decoding rows ``lo:hi`` of the column only."""
+    blocks = {name: _map_block(path, data_start, block) for name, block in meta["blocks"].items()}
+    kind = meta["kind"]
+    if kind == "text":
+        return _TextSlicer(blocks["blob"], blocks["offsets"], blocks["nulls"]).slice
+    if kind == "numeric":
+        return lambda lo, hi: blocks["values"][lo:hi]
+    if kind == "datetime":
+        def read_datetimes(lo, hi):
+            values = blocks["values"][lo:hi].view("M8[ns]")
+            dtype = pd.DatetimeTZDtype("ns", meta["tz"]) if meta["tz"] else values.dtype
+            return pd.arrays.DatetimeArray(values, dtype=dtype)
+        return read_datetimes
+
+    categories = meta["categories"]
+    if meta["value_type"] == "date":
+        categories = [dt.date.fromisoformat(v) for v in categories]
+    if meta.get("categorical"):
+        return lambda lo, hi: pd.Categorical.from_codes(blocks["codes"][lo:hi], categories=categories)
+    lookup = np.empty(len(categories) + 1, dtype=object)
+    lookup[:-1] = categories
+    lookup[-1] = np.nan
+    return lambda lo, hi: lookup[blocks["codes"][lo:hi]]
+
+
+def load_snapshot(path):
+    """Load a snapshot written by ``write_snapshot`` as a prepared frame.
+
+    Numeric and timestamp columns stay memory-mapped, so they cost page cache
+    rather than process heap and need no parsing.
+    """
+    header, data_start = _read_header(path)
+    rows = header["rows"]
+    columns = {meta["name"]: _column_reader(path, data_start, meta)(0, rows) for meta in header["columns"]}
+    index = pd.Index(columns.pop("__index__"))
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def iter_snapshot_chunks(path, chunk_size, start=None, end=None):
+    """Yield a snapshot as prepared frames of at most ``chunk_size`` rows, in order.
+
+    Only the current chunk's text is decoded and everything else stays
+    memory-mapped, so memory is bounded by ``chunk_size``. ``start``/``end``
+    select a date range as in ``step_3_dashboard.filter_date_range``.
+    """
+    import step_3_dashboard as dashboard
+
+    header, data_start = _read_header(path)
+    readers = {meta["name"]: _column_reader(path, data_start, meta) for meta in header["columns"]}
+    lo, hi = 0, header["rows"]
+    if start or end:
+        timestamps = pd.DataFrame({"timestamp": readers["timestamp"](lo, hi)})
+        window = dashboard.filter_date_range(timestamps, start, end)
+        lo = int(window.index[0]) if len(window) else 0
+        hi = lo + len(window)
+    index_reader = readers.pop("__index__")
+    for first in range(lo, hi, chunk_size):
+        last = min(first + chunk_size, hi)
+        columns = {name: read(first, last) for name, read in readers.items()}
+        yield pd.DataFrame(columns, index=pd.Index(index_reader(first, last)), copy=False)
+
+
+def main():
+    import step_3_dashboard as dashboard
+
+    parser = argparse.ArgumentParser(description="Convert a sentiment export into a columnar snapshot")
+    parser.add_argument("source", help="JSON array or NDJSON sentiment export")
+    parser.add_argument("output", help=f"snapshot file to write (*{SNAPSHOT_SUFFIX})")
+    args = parser.parse_args()
+
+    df = dashboard.load_prepared_data(args.source)
+    write_snapshot(df, args.output)
+    print(f"Wrote {len(df)} records to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
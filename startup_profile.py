@@ -0,0 +1,79 @@
+"""Report where cold-start time goes.
+
+Runs a fresh interpreter with ``python -X importtime`` on the statements a
+Lambda cold start executes and prints the slowest top-level packages by
+import time::
+
+    python startup_profile.py                  # import app (what /health pays)
+    python startup_profile.py --prewarm        # ...then app.prewarm()
+    python startup_profile.py --request /      # ...then one request through Flask
+
+The same ``DATA_FILE`` / ``DASHBOARD_ARTIFACT`` environment as the deployment
+should be set so the measured paths match.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def _script(prewarm, request_path):
+    lines = ["import app"]
+    if prewarm:
+        lines.append("app.prewarm()")
+    if request_path:
+        lines.append(f"app.app.test_client().get({request_path!r})")
+    return "; ".join(lines)
+
+
+def parse_importtime(stderr):
+    """``{top-level package: microseconds}`` from ``-X importtime`` output.
+
+    Self times are summed per package, so pandas pulled in by plotly is
+    charged to pandas and nothing is counted twice.
+    """
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, module = match.group(1), match.group(3)
+            totals[module.split(".")[0]] += int(self_us)
+    return dict(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the app's cold start")
+    parser.add_argument("--prewarm", action="store_true", help="also run app.prewarm()")
+    parser.add_argument("--request", metavar="PATH", help="also serve one request, e.g. / or /api/stats")
+    parser.add_argument("--top", type=int, default=20, help="number of packages to list")
+    args = parser.parse_args()
+
+    script = _script(args.prewarm, args.request)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(result.returncode)
+
+    totals = parse_importtime(result.stderr)
+    import_ms = sum(totals.values()) / 1000
+    print(f"{script}\n")
+    print(f"{'package':<32}{'ms':>10}{'share':>8}")
+    for module, us in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{module:<32}{us / 1000:>10.1f}{us / 1000 / import_ms:>8.0%}")
+    print(f"\nimports: {import_ms:.0f} ms   process wall time: {wall_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""Score raw posts for sentiment and write the records ``step_3_dashboard`` reads.
+
+Posts come from a JSON array or NDJSON file of objects with the post text in
+``tweet`` (or ``text``), a ``timestamp`` (or ``created_at``) and optionally an
+``id`` and ``thread_id``. Each scored post becomes one NDJSON line of the
+dashboard's schema::
+
+    {"id": "...", "tweet": "...", "confidence_score": 0.85, "reasoning": "...",
+     "timestamp": "2025-08-19T10:00:00Z", "thread_id": "..."}
+
+Posts are sent to the model ``--batch-size`` at a time. At most
+``--concurrency`` batches are in flight, and at most ``--rpm`` requests start
+per minute. A failed batch is retried with backoff. If it still fails, its posts
+are left out of the output.
+
+Scores are cached by a hash of the model, the prompt version and the
+normalized post text, in an NDJSON file shared between runs. A repost or
+duplicate is therefore scored once. Records are appended to the output as
+their batch completes, and a rerun of the same command skips every post
+already written. An interrupted run resumes where it stopped, and a rerun
+after failures retries just the missing posts.
+
+    python step_2_sentiment_analysis.py posts.json --output scored.ndjson
+    python step_2_sentiment_analysis.py posts.json --output scored.ndjson --model stub
+
+``--model stub`` scores offline from a small word list, for tests and dry runs.
+Any object with a ``name`` and an async ``score_batch(texts)`` returning
+``[(confidence_score, reasoning), ...]`` can stand in for a model.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import metrics
+from step_3_dashboard import DEFAULT_BRAND, iter_file_chunks, iter_sentiment_records
+
+# Bump whenever the prompt changes, so cached scores from the old one are not reused
+PROMPT_VERSION = "1"
+
+BATCH_SIZE = int(os.environ.get("SCORING_BATCH_SIZE", "20"))
+CONCURRENCY = int(os.environ.get("SCORING_CONCURRENCY", "4"))
+REQUESTS_PER_MINUTE = float(os.environ.get("SCORING_RPM", "60"))
+MAX_ATTEMPTS = int(os.environ.get("SCORING_ATTEMPTS", "4"))
+BACKOFF_SECONDS = 1.0
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+DEFAULT_CACHE = ".sentiment_cache.ndjson"
+
+SYSTEM_PROMPT = """You rate the sentiment of social media posts towards {brand}.
+You get a JSON array of {{"index": ..., "post": ...}} objects. Answer with a JSON object
+{{"results": [{{"index": ..., "confidence_score": ..., "reasoning": ...}}, ...]}} holding one
+result per post, where confidence_score runs from 0.0 (extremely negative) through 0.5
+(neutral) to 1.0 (extremely positive), and reasoning explains the score in one short sentence."""
+
+
+def normalize_text(text) -> str:
+    """Post text with Unicode forms, case and whitespace folded, so reposts match."""
+    return " ".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+
+def content_key(model_name, text) -> str:
+    """Cache key of one post's score under one model and prompt version."""
+    material = "\0".join((model_name, PROMPT_VERSION, normalize_text(text)))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _read_ndjson_lines(path):
+    """Parsed lines of an NDJSON file; a line cut short by an interrupted write is skipped."""
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _open_append(path):
+    """Open an NDJSON file for appending, first dropping a last line cut short by an interrupted write.
+
+    The dashboard cannot parse a cut-off record, and a resumed run scores
+    its post again anyway.
+    """
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, "rb+") as f:
+            end = keep = f.seek(0, os.SEEK_END)
+            while keep > 0:
+                start = max(0, keep - 65536)
+                f.seek(start)
+                newline = f.read(keep - start).rfind(b"\n")
+                if newline >= 0:
+                    keep = start + newline + 1
+                    break
+                keep = start
+            if keep < end:
+                f.truncate(keep)
+    return open(path, "a", encoding="utf-8")
+
+
+class ScoreCache:
+    """Scores by content key, kept in memory and appended to an NDJSON file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._scores = {}
+        for entry in _read_ndjson_lines(path):
+            self._scores[entry["key"]] = (entry["confidence_score"], entry["reasoning"])
+        self._file = _open_append(path) if path else None
+
+    def get(self, key):
+        return self._scores.get(key)
+
+    def put(self, key, score, reasoning):
+        self._scores[key] = (score, reasoning)
+        if self._file:
+            self._file.write(json.dumps({"key": key, "confidence_score": score, "reasoning": reasoning}, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class RateLimiter:
+    """Spaces request starts at least ``60 / per_minute`` seconds apart."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class StubModel:
+    """Offline, deterministic scorer that counts words from a small sentiment list."""
+
+    POSITIVE = frozenset(
+        "love loved loves great excellent amazing good best delicious happy tasty awesome "
+        "like likes enjoy enjoyed perfect wonderful fantastic favourite favorite nice".split()
+    )
+    NEGATIVE = frozenset(
+        "hate hated hates bad worst terrible awful boycott disgusting poor disappointed "
+        "disappointing unhappy sad wrong angry horrible gross expensive not never".split()
+    )
+
+    def __init__(self, delay=0.0, fail_every=0):
+        self.name = "stub"
+        self.delay = delay
+        self.fail_every = fail_every  # raise on every n-th call, to exercise retries
+        self.calls = 0
+
+    async def score_batch(self, texts):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError(f"stub failure on call {self.calls}")
+        return [self._score(text) for text in texts]
+
+    def _score(self, text):
+        words = re.findall(r"[a-z']+", normalize_text(text))
+        positive = sum(word in self.POSITIVE for word in words)
+        negative = sum(word in self.NEGATIVE for word in words)
+        if not positive and not negative:
+            return 0.5, "No sentiment words"
+        score = round(0.5 + 0.5 * (positive - negative) / (positive + negative + 1), 2)
+        return score, f"{positive} positive and {negative} negative words"
+
+
+class OpenAIModel:
+    """Chat model scoring a numbered batch of posts with one JSON response."""
+
+    def __init__(self, model=OPENAI_MODEL, brand=DEFAULT_BRAND, client=None):
+        if client is None:
+            try:
+                from openai import AsyncOpenAI
+            except ImportError:
+                raise RuntimeError("--model openai needs the openai package (see requirements.txt)") from None
+            # Retries are done by SentimentScorer, under its rate limit
+            client = AsyncOpenAI(max_retries=0)
+        self.client = client
+        self.model = model
+        self.name = f"openai:{model}:{brand}"
+        self.system_prompt = SYSTEM_PROMPT.format(brand=brand)
+
+    async def score_batch(self, texts):
+        posts = [{"index": i, "post": text} for i, text in enumerate(texts)]
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": json.dumps(posts, ensure_ascii=False)},
+            ],
+        )
+        results = {int(r["index"]): r for r in json.loads(response.choices[0].message.content)["results"]}
+        return [(results[i]["confidence_score"], results[i]["reasoning"]) for i in range(len(texts))]
+
+
+def _checked(results, count):
+    """Validate a model's batch answer: one (score in [0, 1], reasoning) per post."""
+    results = list(results)
+    if len(results) != count:
+        raise ValueError(f"model returned {len(results)} results for {count} posts")
+    checked = []
+    for score, reasoning in results:
+        score = float(score)
+        if not 0.0 <= score <= 1.0:
+            raise ValueError(f"confidence_score {score} is outside [0, 1]")
+        checked.append((score, str(reasoning or "No reasoning provided")))
+    return checked
+
+
+def to_post(record, position):
+    """A raw input record as ``{id, tweet, timestamp, thread_id}``; None without text."""
+    text = record.get("tweet", record.get("text"))
+    if text is None or not str(text).strip():
+        return None
+    return {
+        "id": record["id"] if record.get("id") is not None else f"post_{position}",
+        "tweet": str(text),
+        "timestamp": record.get("timestamp", record.get("created_at")),
+        "thread_id": record.get("thread_id"),
+    }
+
+
+def scored_record(post, score, reasoning) -> dict:
+    """Output record in the schema ``step_3_dashboard.prepare_data`` reads."""
+    return {
+        "id": post["id"],
+        "tweet": post["tweet"],
+        "confidence_score": score,
+        "reasoning": reasoning,
+        "timestamp": post["timestamp"],
+        "thread_id": post["thread_id"],
+    }
+
+
+class SentimentScorer:
+    """Scores posts in batches with bounded concurrency, a rate limit and a score cache."""
+
+    def __init__(self, model, cache=None, batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                 requests_per_minute=REQUESTS_PER_MINUTE, max_attempts=MAX_ATTEMPTS):
+        self.model = model
+        self.cache = cache if cache is not None else ScoreCache()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(requests_per_minute)
+        self.max_attempts = max_attempts
+        self.counts = dict.fromkeys(("posts", "cached", "duplicates", "scored", "requests", "retries", "failed"), 0)
+
+    async def run(self, posts, write):
+        """Score an iterable of posts, calling ``write(records)`` as results arrive.
+
+        Posts already in the cache are written at once. Duplicates of a post in
+        flight wait for its result instead of joining another batch. Input is
+        read no faster than batches can be sent, so memory stays bounded by
+        ``concurrency * batch_size`` posts.
+        """
+        slots = asyncio.Semaphore(self.concurrency)
+        waiting = {}  # content key -> posts waiting on its score
+        tasks = set()
+        batch = []
+
+        async def send(batch):
+            await slots.acquire()
+            task = asyncio.ensure_future(self._score(batch, waiting, write))
+            task.add_done_callback(lambda _: slots.release())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        for post in posts:
+            self.counts["posts"] += 1
+            key = content_key(self.model.name, post["tweet"])
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.counts["cached"] += 1
+                write([scored_record(post, *cached)])
+            elif key in waiting:
+                self.counts["duplicates"] += 1
+                waiting[key].append(post)
+            else:
+                waiting[key] = [post]
+                batch.append((key, post["tweet"]))
+                if len(batch) == self.batch_size:
+                    await send(batch)
+                    batch = []
+        if batch:
+            await send(batch)
+        while tasks:
+            await asyncio.gather(*list(tasks))
+        return self.counts
+
+    async def _score(self, batch, waiting, write):
+        keys, texts = zip(*batch)
+        for attempt in range(1, self.max_attempts + 1):
+            await self.limiter.wait()
+            self.counts["requests"] += 1
+            try:
+                with metrics.span("score.batch"):
+                    results = _checked(await self.model.score_batch(list(texts)), len(texts))
+                break
+            except Exception as exc:
+                if attempt == self.max_attempts:
+                    failed = sum(len(waiting.pop(key)) for key in keys)
+                    self.counts["failed"] += failed
+                    metrics.log_event("scoring.batch_failed", level=logging.WARNING, posts=failed,
+                                      attempts=attempt, error=repr(exc))
+                    return
+                self.counts["retries"] += 1
+                await asyncio.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1))
+        records = []
+        for key, (score, reasoning) in zip(keys, results):
+            self.cache.put(key, score, reasoning)
+            records.extend(scored_record(post, score, reasoning) for post in waiting.pop(key))
+        self.counts["scored"] += len(keys)
+        self.cache.flush()
+        write(records)
+
+
+def score_file(input_path, output_path, model, cache=None, **options) -> dict:
+    """Score the posts in ``input_path`` into ``output_path``, resuming a previous run.
+
+    Returns the scorer's counts, plus ``resumed``: posts skipped because an
+    earlier run already wrote them.
+    """
+    done = {record.get("id") for record in _read_ndjson_lines(output_path)}
+    scorer = SentimentScorer(model, cache=cache, **options)
+    skipped = {"resumed": 0, "empty": 0}
+
+    def posts(records):
+        for position, record in enumerate(records):
+            post = to_post(record, position)
+            if post is None:
+                skipped["empty"] += 1
+            elif post["id"] in done:
+                skipped["resumed"] += 1
+            else:
+                yield post
+
+    with open(input_path, "rb") as source, _open_append(output_path) as out:
+        def write(records):
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        counts = asyncio.run(scorer.run(posts(iter_sentiment_records(iter_file_chunks(source))), write))
+    return {**counts, **skipped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score posts for sentiment into the dashboard's record format")
+    parser.add_argument("input", help="JSON array or NDJSON file of posts")
+    parser.add_argument("--output", help="NDJSON file to append scored records to (default: <input>_sentiment.ndjson)")
+    parser.add_argument("--model", choices=("openai", "stub"), default="openai", help="stub scores offline, for testing")
+    parser.add_argument("--openai-model", default=OPENAI_MODEL, help="chat model to use with --model openai")
+    parser.add_argument("--brand", default=DEFAULT_BRAND, help="brand the posts are about")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="posts per request")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="requests in flight at once")
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE, help="requests started per minute (0: no limit)")
+    parser.add_argument("--attempts", type=int, default=MAX_ATTEMPTS, help="tries per batch before its posts are skipped")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="score cache file shared between runs ('' for none)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0] + "_sentiment.ndjson"
+    if args.model == "stub":
+        model = StubModel()
+    else:
+        model = OpenAIModel(args.openai_model, brand=args.brand)
+    cache = ScoreCache(args.cache or None)
+    try:
+        counts = score_file(
+            args.input, output, model, cache=cache, batch_size=args.batch_size, concurrency=args.concurrency,
+            requests_per_minute=args.rpm, max_attempts=args.attempts,
+        )
+    except FileNotFoundError as exc:
+        print(f"Error: File {exc.filename} not found!")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; records scored so far are in {output}, run the same command again to resume")
+        sys.exit(130)
+    finally:
+        cache.close()
+
+    print(f"Wrote scored records to {output}")
+    print(f"- Posts read: {counts['posts'] + counts['resumed']} ({counts['resumed']} already written, {counts['empty']} without text skipped)")
+    print(f"- Scored by the model: {counts['scored']} in {counts['requests']} requests ({counts['retries']} retries)")
+    print(f"- From the cache: {counts['cached']}; duplicates of a post in flight: {counts['duplicates']}")
+    if counts["failed"]:
+        print(f"- Failed: {counts['failed']} posts left out; run again to retry them")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,82 @@
+import argparse
 import json
+import os
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import pandas as pd
+import numpy as np
 from datetime import datetime
-from collections import Counter
+from itertools import islice
+import codecs
+import html
 import re
+import unicodedata
+import warnings
+
+import score_sketch
+import snapshot
+import time_pyramid
+import word_frequency
+from brands import DEFAULT_BRAND
+
+# Bytes read per chunk and records prepared per batch when streaming
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_BATCH_SIZE = 50000
+
+_json_decoder = json.JSONDecoder()
+
+def iter_file_chunks(f, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield fixed-size chunks from an open binary file"""
+    return iter(lambda: f.read(chunk_size), b'')
+
+def iter_sentiment_records(chunks):
+    """Incrementally parse records from a JSON array or NDJSON byte/text stream"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    in_array = None
+    done = False
+    
+    def parse(final):
+        nonlocal buffer, in_array, done
+        pos = 0
+        while not done:
+            # Skip whitespace and the separators between array elements
+            while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+                pos += 1
+            if pos == len(buffer):
+                break
+            if in_array is None:
+                in_array = buffer[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == ']':
+                done = True
+                break
+            try:
+                record, pos = _json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                # Incomplete record; wait for the next chunk
+                break
+            yield record
+        buffer = buffer[pos:]
+    
+    for chunk in chunks:
+        buffer += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        yield from parse(final=False)
+        if done:
+            return
+    buffer += decoder.decode(b'', final=True)
+    yield from parse(final=True)
 
 def load_sentiment_data(filename):
-    """Load sentiment analysis results from JSON file"""
+    """Load sentiment analysis results from a JSON array or NDJSON file"""
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(filename, 'rb') as f:
+            data = list(iter_sentiment_records(iter_file_chunks(f)))
         print(f"Loaded {len(data)} sentiment analysis results")
         return data
     except FileNotFoundError:
@@ -21,91 +86,379 @@ def load_sentiment_data(filename):
         print(f"Error loading data: {e}")
         return []
 
+def load_prepared_stream(chunks, batch_size=STREAM_BATCH_SIZE):
+    """Parse a byte/text chunk stream and prepare its records in bounded batches"""
+    return prepare_data_stream(iter_sentiment_records(chunks), batch_size)
+
+def load_prepared_data(filename, batch_size=STREAM_BATCH_SIZE):
+    """Stream a JSON array or NDJSON file straight into a prepared DataFrame"""
+    try:
+        with open(filename, 'rb') as f:
+            df = load_prepared_stream(iter_file_chunks(f), batch_size)
+        print(f"Loaded {len(df)} sentiment analysis results")
+        return df
+    except FileNotFoundError:
+        print(f"Error: File {filename} not found!")
+        return prepare_data([])
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return prepare_data([])
+
+SENTIMENT_CATEGORIES = [
+    'Extremely Negative',
+    'Clearly Negative',
+    'Somewhat Negative',
+    'Neutral',
+    'Somewhat Positive',
+    'Clearly Positive',
+    'Extremely Positive',
+]
+
+# Upper (inclusive) edge of each category in SENTIMENT_CATEGORIES; the first
+# category also includes its lower edge of 0.0
+SENTIMENT_UPPER_EDGES = np.array([0.1, 0.3, 0.4, 0.6, 0.7, 0.9, 1.0])
+
+# Broad categories are brand-neutral in the data; broad_label() names the brand for display
+BROAD_CATEGORIES = ['Negative', 'Neutral', 'Positive']
+
+# Label columns are categoricals: one small integer code per row instead of a string
+SENTIMENT_DTYPE = pd.CategoricalDtype(SENTIMENT_CATEGORIES + ['Invalid Score'])
+BROAD_DTYPE = pd.CategoricalDtype(BROAD_CATEGORIES)
+
+# Columns that hold free text, see text_store.TextStore for keeping them out of the frame
+TEXT_COLUMNS = ['tweet', 'reasoning']
+
+def categorize_scores(scores):
+    """Map confidence scores to detailed and broad sentiment labels (as Categoricals) in bulk"""
+    scores = np.asarray(scores, dtype='float64')
+    valid = (scores >= 0.0) & (scores <= 1.0)
+    # side='left' picks the first edge >= score, i.e. the (lower, upper] bin
+    codes = np.searchsorted(SENTIMENT_UPPER_EDGES, scores, side='left')
+    sentiment_category = pd.Categorical.from_codes(
+        np.where(valid, codes, len(SENTIMENT_CATEGORIES)).astype('int8'), dtype=SENTIMENT_DTYPE
+    )
+    
+    # Create broader categories for summary analysis (NaN compares False, so it lands in Positive like before)
+    broad_codes = np.where(scores <= 0.4, 0, np.where(scores <= 0.6, 1, 2)).astype('int8')
+    broad_category = pd.Categorical.from_codes(broad_codes, dtype=BROAD_DTYPE)
+    return sentiment_category, broad_category
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except:
+        return pd.NaT
+
+def _parse_timestamps(raw):
+    """Parse ISO-8601 timestamps in bulk; anything unparseable becomes NaT"""
+    is_text = raw.map(type).eq(str)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        timestamps = pd.to_datetime(raw.where(is_text), format='ISO8601', errors='coerce')
+    if timestamps.dtype == object:
+        # Mixed UTC offsets do not fit a single datetime64 column; keep each
+        # record's own offset like the per-record parser did
+        timestamps = raw.map(_parse_timestamp)
+    return timestamps
+
+def brand_of(df=None, aggregates=None):
+    """Display name of the brand a prepared frame (df.attrs['brand']) or AggregateStore covers"""
+    if aggregates is not None:
+        return aggregates.brand
+    return (df.attrs.get('brand') if df is not None else None) or DEFAULT_BRAND
+
+def set_brand(df, brand, stopwords=()):
+    """Tag a prepared frame with its brand and extra stopwords; pandas carries attrs through slices and sorts"""
+    df.attrs['brand'] = brand
+    df.attrs['stopwords'] = tuple(stopwords)
+    return df
+
+def broad_label(category, brand=DEFAULT_BRAND):
+    """'Negative' -> 'Negative toward <brand>' for charts and pages; 'Neutral' stays as it is"""
+    return category if category == 'Neutral' else f'{category} toward {brand}'
+
+def brand_stopwords(brand=DEFAULT_BRAND, extra=()):
+    """Stopwords for a brand's word analysis: the defaults, the brand's own name (accents folded) and extra"""
+    folded = unicodedata.normalize('NFKD', brand).encode('ascii', 'ignore').decode('ascii')
+    names = set(word_frequency.tokenize(brand, min_length=1) + word_frequency.tokenize(folded, min_length=1))
+    return word_frequency.load_stopwords(extra=list(names) + list(extra))
+
+def frame_stopwords(df):
+    """brand_stopwords for the brand and extra stopwords tagged on df by set_brand"""
+    return brand_stopwords(brand_of(df), df.attrs.get('stopwords', ()))
+
+CALENDAR_COLUMNS = ['month', 'day']
+
+def _period_categorical(values, unit):
+    """Categorical of 'YYYY-MM' / 'YYYY-MM-DD' labels from datetime64 values, formatting only the distinct periods"""
+    periods, codes = np.unique(values.astype(f'datetime64[{unit}]'), return_inverse=True)
+    return pd.Categorical.from_codes(codes.astype('int32'), categories=np.datetime_as_string(periods, unit=unit))
+
+def _calendar_fields(timestamps):
+    """Return month and day Categoricals using each timestamp's wall-clock time"""
+    if timestamps.dtype == object:
+        return (
+            pd.Categorical(timestamps.map(lambda t: t.strftime('%Y-%m'))),
+            pd.Categorical(timestamps.map(lambda t: t.strftime('%Y-%m-%d'))),
+        )
+    local = timestamps.dt.tz_localize(None) if timestamps.dt.tz is not None else timestamps
+    values = local.to_numpy()
+    return _period_categorical(values, 'M'), _period_categorical(values, 'D')
+
+def _with_calendar_fields(df):
+    """Add the month and day columns; done once per frame so their categories cover every row"""
+    month, day = _calendar_fields(df['timestamp'])
+    return df.assign(month=month, day=day)
+
+def _text_lengths(tweets):
+    lengths = tweets.str.len()
+    # int32 unless some post has no text (NaN length)
+    return lengths.astype('int32') if not lengths.isna().any() else lengths
+
+def _prepare_frame(data):
+    """Build the unsorted prepared frame for one batch of records"""
+    raw = pd.DataFrame.from_records(list(data), columns=['timestamp', 'tweet', 'confidence_score', 'reasoning'])
+    
+    # Skip records whose timestamp cannot be parsed
+    timestamps = _parse_timestamps(raw['timestamp'])
+    keep = timestamps.notna().to_numpy()
+    raw = raw[keep].reset_index(drop=True)
+    timestamps = timestamps[keep].reset_index(drop=True)
+    
+    # Get confidence score (default to 0.5 if missing)
+    # Kept as float64: category edges (0.4, 0.6, ...) and the stats are defined on the exact scores
+    confidence_score = pd.to_numeric(raw['confidence_score'], errors='coerce').fillna(0.5)
+    sentiment_category, broad_category = categorize_scores(confidence_score)
+    
+    df = pd.DataFrame({
+        'timestamp': timestamps,
+        'tweet': raw['tweet'],
+        'confidence_score': confidence_score,
+        'reasoning': raw['reasoning'].fillna('No reasoning provided'),
+        'sentiment_category': sentiment_category,
+        'broad_category': broad_category,
+        'tweet_length': _text_lengths(raw['tweet']),
+    })
+    return df
+
 def prepare_data(data):
     """Convert JSON data to pandas DataFrame with proper datetime parsing and confidence score categorization"""
-    df_data = []
+    df = _with_calendar_fields(_prepare_frame(data))
+    df = df.sort_values('timestamp', kind='stable')
+    return df
+
+def prepare_data_stream(records, batch_size=STREAM_BATCH_SIZE):
+    """Prepare an iterable of records in bounded-size batches, yielding the same frame as prepare_data"""
+    records = iter(records)
+    frames = []
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        frames.append(_prepare_frame(batch))
+        del batch
+    if not frames:
+        return prepare_data([])
+    return combine_prepared(frames)
+
+def iter_prepared_chunks(records, chunk_size=STREAM_BATCH_SIZE, start=None, end=None):
+    """Prepare records chunk_size at a time and yield each chunk on its own, never the whole dataset
     
-    for item in data:
-        # Parse timestamp
-        try:
-            timestamp = datetime.fromisoformat(item['timestamp'].replace('Z', '+00:00'))
-        except:
-            continue
-            
-        # Get confidence score (default to 0.5 if missing)
-        confidence_score = item.get('confidence_score', 0.5)
-        
-        # Categorize based on confidence score ranges
-        if 0.0 <= confidence_score <= 0.1:
-            sentiment_category = 'Extremely Negative'
-            sentiment_label = 'Extremely Negative'
-        elif 0.1 < confidence_score <= 0.3:
-            sentiment_category = 'Clearly Negative'
-            sentiment_label = 'Clearly Negative'
-        elif 0.3 < confidence_score <= 0.4:
-            sentiment_category = 'Somewhat Negative'
-            sentiment_label = 'Somewhat Negative'
-        elif 0.4 < confidence_score <= 0.6:
-            sentiment_category = 'Neutral'
-            sentiment_label = 'Neutral'
-        elif 0.6 < confidence_score <= 0.7:
-            sentiment_category = 'Somewhat Positive'
-            sentiment_label = 'Somewhat Positive'
-        elif 0.7 < confidence_score <= 0.9:
-            sentiment_category = 'Clearly Positive'
-            sentiment_label = 'Clearly Positive'
-        elif 0.9 < confidence_score <= 1.0:
-            sentiment_category = 'Extremely Positive'
-            sentiment_label = 'Extremely Positive'
-        else:
-            sentiment_category = 'Invalid Score'
-            sentiment_label = 'Invalid Score'
-        
-        # Create broader categories for summary analysis
-        if confidence_score <= 0.4:
-            broad_category = 'Negative toward Nestle'
-        elif confidence_score <= 0.6:
-            broad_category = 'Neutral'
-        else:
-            broad_category = 'Positive toward Nestle'
-        
-        df_data.append({
-            'timestamp': timestamp,
-            'tweet': item['tweet'],
-            'confidence_score': confidence_score,
-            'reasoning': item.get('reasoning', 'No reasoning provided'),
-            'sentiment_category': sentiment_category,
-            'sentiment_label': sentiment_label,
-            'broad_category': broad_category,
-            'tweet_length': len(item['tweet']),
-            'date': timestamp.date(),
-            'month': timestamp.strftime('%Y-%m'),
-            'day': timestamp.strftime('%Y-%m-%d')
-        })
-    
-    df = pd.DataFrame(df_data)
-    df = df.sort_values('timestamp')
+    Chunks keep input order between them and are sorted by timestamp within;
+    row labels continue across chunks, so they match the post ids prepare_data_stream
+    gives the same input. start/end select a date range as in filter_date_range.
+    Feed the chunks to aggregate_store.AggregateStore.ingest_chunks for charts and
+    stats whose memory is bounded by the chunk size.
+    """
+    records = iter(records)
+    offset = 0
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch:
+            break
+        frame = _prepare_frame(batch)
+        del batch
+        frame.index += offset
+        offset += len(frame)
+        frame = filter_date_range(_with_calendar_fields(frame).sort_values('timestamp', kind='stable'), start, end)
+        if len(frame):
+            yield frame
+
+def combine_prepared(frames, ignore_index=True):
+    """Concatenate prepared frames (batches or shards) into one frame sorted by timestamp
+    
+    Month and day are re-derived on the combined frame since per-frame
+    categories would not line up. With ignore_index=False the row labels
+    (post ids) are kept as they are.
+    """
+    frames = [frame.drop(columns=CALENDAR_COLUMNS, errors='ignore') for frame in frames]
+    if not frames:
+        return prepare_data([])
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=ignore_index)
+    del frames
+    df = _with_calendar_fields(df)
+    df = df.sort_values('timestamp', kind='stable')
     return df
 
-def create_sentiment_timeline(df):
-    """Create confidence score over time line chart"""
-    # Group by day and calculate average confidence score
-    daily_sentiment = df.groupby('date').agg({
-        'confidence_score': 'mean',
-        'tweet': 'count'
-    }).reset_index()
+def append_prepared(df, new_rows):
+    """Append prepared rows to a prepared frame, keeping the row labels (post ids)
+    
+    Rows arriving at or after the frame's last timestamp, as appended posts
+    do, go on the end as they are: only the month and day categories are
+    widened. Rows that interleave with the frame fall back to combine_prepared,
+    which re-derives the calendar columns and re-sorts.
+    """
+    if len(new_rows) == 0:
+        return df
+    if (
+        len(df) == 0
+        or new_rows['timestamp'].dtype != df['timestamp'].dtype
+        or new_rows['timestamp'].iloc[0] < df['timestamp'].iloc[-1]
+    ):
+        return combine_prepared([df, new_rows], ignore_index=False)
+    # Sorted union, so the categories (and codes) stay in date order
+    calendar = {
+        column: df[column].cat.categories.union(new_rows[column].cat.categories)
+        for column in CALENDAR_COLUMNS
+    }
+    return pd.concat([
+        frame.assign(**{column: frame[column].cat.set_categories(categories) for column, categories in calendar.items()})
+        for frame in (df, new_rows)
+    ])
+
+def memory_report(df, texts=None):
+    """Bytes per column (deep, i.e. including string contents) as a DataFrame, largest first
+    
+    A text_store.TextStore holding text outside the frame is listed as its own row.
+    """
+    usage = df.memory_usage(index=True, deep=True)
+    rows = max(len(df), 1)
+    report = pd.DataFrame({
+        'dtype': [str(df.index.dtype)] + [str(df[column].dtype) for column in df.columns],
+        'bytes': usage.to_numpy(),
+    }, index=['(index)'] + list(df.columns))
+    if texts is not None:
+        report.loc['(text store)'] = [f'{len(texts.columns)} columns', texts.nbytes]
+    report['bytes_per_row'] = (report['bytes'] / rows).round(1)
+    report = report.sort_values('bytes', ascending=False)
+    report.loc['total'] = ['', report['bytes'].sum(), round(report['bytes'].sum() / rows, 1)]
+    return report
+
+def _range_bound(value, tz, end=False):
+    """Turn a start/end string into a Timestamp comparable with the timestamp column"""
+    text = str(value).strip()
+    bound = pd.Timestamp(text)
+    if tz is not None:
+        bound = bound.tz_localize(tz) if bound.tzinfo is None else bound.tz_convert(tz)
+    elif bound.tzinfo is not None:
+        bound = bound.tz_convert(None)
+    if end and len(text) == 10:
+        # A bare end date includes that whole day
+        bound += pd.Timedelta(days=1)
+    return bound
+
+def filter_date_range(df, start=None, end=None):
+    """Slice a prepared (timestamp-sorted) frame to [start, end] by binary search
+    
+    start and end are ISO dates or datetimes; a bare end date is inclusive of the
+    whole day. Naive bounds are read in the data's own time zone. Returns a
+    positional slice of df, never a boolean-masked copy.
+    """
+    if start in (None, '') and end in (None, ''):
+        return df
+    timestamps = df['timestamp']
+    tz = getattr(timestamps.dtype, 'tz', None)
+    lo, hi = 0, len(df)
+    if start not in (None, ''):
+        lo = int(timestamps.searchsorted(_range_bound(start, tz), side='left'))
+    if end not in (None, ''):
+        text = str(end).strip()
+        side = 'left' if len(text) == 10 else 'right'
+        hi = int(timestamps.searchsorted(_range_bound(end, tz, end=True), side=side))
+    return df.iloc[lo:max(lo, hi)]
+
+# Names of the score_sketch.BAND_QUANTILES, as band columns and summary stats keys
+BAND_NAMES = ('p10', 'p50', 'p90')
+    
+def score_sketches(df, column):
+    """{value: score_sketch.QuantileSketch} of the confidence scores for each value of a categorical column"""
+    values = df[column].cat.categories
+    counts = score_sketch.grouped_counts(df[column].cat.codes.to_numpy(), df['confidence_score'].to_numpy(), len(values))
+    return {str(value): score_sketch.QuantileSketch(row) for value, row in zip(values, counts) if row.any()}
+    
+# X axis title of each time_pyramid level
+TIME_LEVEL_TITLES = {'hour': 'Hour', 'day': 'Date', 'week': 'Week (from Monday)', 'month': 'Month'}
+    
+def time_buckets(df, aggregates=None, window=None, level=None, pyramid=None):
+    """(buckets, level) of the timeline and volume charts over window=(start, end)
+    
+    Buckets come from a time_pyramid.TimePyramid: the one given, an
+    aggregate_store.AggregateStore's own, or one counted from the frame, which
+    all give identical charts. Without a level the finest one drawing at most
+    time_pyramid.MAX_BUCKETS buckets over the window (default: all the posts)
+    is used.
+    """
+    if pyramid is None:
+        pyramid = aggregates.time_pyramid if aggregates is not None else time_pyramid.TimePyramid.from_frame(df)
+    start, end = window or (None, None)
+    return pyramid.buckets(level, start, end)
+    
+def _time_axis(level, window=None):
+    """Layout of a time-bucketed chart: axis title, zoomed range and the level for the client"""
+    xaxis = dict(title=TIME_LEVEL_TITLES[level])
+    if window and all(bound not in (None, '') for bound in window):
+        xaxis['range'] = list(window)
+    return dict(xaxis=xaxis, meta=dict(time_level=level))
+    
+def create_sentiment_timeline(df, aggregates=None, window=None, level=None, pyramid=None):
+    """Create confidence score over time line chart
+    
+    Points are time buckets (hours, days, weeks or months, see time_buckets)
+    over window=(start, end), all the posts by default. The p10-p90 band and
+    the median come from each bucket's quantile sketch.
+    """
+    buckets, level = time_buckets(df, aggregates, window, level, pyramid)
     
     fig = go.Figure()
     
+    # Spread of each bucket's scores: p90 line, then p10 filled up to it
     fig.add_trace(go.Scatter(
-        x=daily_sentiment['date'],
-        y=daily_sentiment['confidence_score'],
+        x=buckets['date'],
+        y=buckets['p90'],
+        mode='lines',
+        line=dict(width=0),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=buckets['date'],
+        y=buckets['p10'],
+        mode='lines',
+        line=dict(width=0),
+        fill='tonexty',
+        fillcolor='rgba(46, 134, 193, 0.15)',
+        name='p10-p90 Confidence',
+        customdata=buckets['p90'],
+        hovertemplate='Date: %{x}<br>p10: %{y:.3f}<br>p90: %{customdata:.3f}<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=buckets['date'],
+        y=buckets['p50'],
+        mode='lines',
+        name='Median Confidence Score',
+        line=dict(color='#2E86C1', width=1.5, dash='dash'),
+        hovertemplate='Date: %{x}<br>Median: %{y:.3f}<extra></extra>'
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=buckets['date'],
+        y=buckets['confidence_score'],
         mode='lines+markers',
         name='Average Confidence Score',
         line=dict(color='#2E86C1', width=3),
         marker=dict(size=8),
         hovertemplate='Date: %{x}<br>Avg Confidence: %{y:.3f}<br>Posts: %{customdata}<extra></extra>',
-        customdata=daily_sentiment['tweet']
+        customdata=buckets['tweet']
     ))
     
     # Add horizontal lines for key thresholds
@@ -116,25 +469,33 @@ def create_sentiment_timeline(df):
     fig.add_hline(y=0.7, line_dash="dot", line_color="green", 
                   annotation_text="Positive Threshold (0.7)")
     
+    brand = brand_of(df, aggregates)
     fig.update_layout(
-        title='Nestle Sentiment Confidence Over Time',
-        xaxis_title='Date',
+        title=f'{brand} Sentiment Confidence Over Time',
         yaxis_title='Average Confidence Score',
         yaxis=dict(range=[0, 1]),
         template='plotly_white',
         height=500,
         annotations=[
             dict(x=0.02, y=0.95, xref="paper", yref="paper", 
-                 text="Lower scores = More negative toward Nestle<br>Higher scores = More positive toward Nestle",
+                 text=f"Lower scores = More negative toward {brand}<br>Higher scores = More positive toward {brand}",
                  showarrow=False, font=dict(size=10), bgcolor="rgba(255,255,255,0.8)")
-        ]
+        ],
+        **_time_axis(level, window)
     )
     
     return fig
 
-def create_sentiment_distribution(df):
+def create_sentiment_distribution(df, aggregates=None):
     """Create overall sentiment distribution pie chart using confidence score categories"""
-    sentiment_counts = df['sentiment_category'].value_counts()
+    if aggregates is not None:
+        sentiment_counts = aggregates.category_counts()
+    else:
+        # Count the integer codes: unlike the Categorical itself this skips empty
+        # categories and breaks ties by first appearance, like counting the labels
+        category = df['sentiment_category']
+        sentiment_counts = category.cat.codes.value_counts()
+        sentiment_counts.index = category.cat.categories[sentiment_counts.index]
     
     # Color scheme for different sentiment levels (red to green gradient)
     color_map = {
@@ -167,30 +528,34 @@ def create_sentiment_distribution(df):
     
     return fig
 
-def create_tweet_volume_chart(df):
-    """Create tweet volume over time bar chart"""
-    daily_volume = df.groupby('date').size().reset_index(name='tweet_count')
+def create_tweet_volume_chart(df, aggregates=None, window=None, level=None, pyramid=None):
+    """Create tweet volume over time bar chart, bucketed like the timeline"""
+    buckets, level = time_buckets(df, aggregates, window, level, pyramid)
     
     fig = go.Figure(data=[go.Bar(
-        x=daily_volume['date'],
-        y=daily_volume['tweet_count'],
+        x=buckets['date'],
+        y=buckets['tweet'],
         marker_color='#3498DB',
         hovertemplate='Date: %{x}<br>Tweet Count: %{y}<extra></extra>'
     )])
     
     fig.update_layout(
         title='Tweet Volume Over Time',
-        xaxis_title='Date',
         yaxis_title='Number of Tweets',
         template='plotly_white',
-        height=500
+        height=500,
+        **_time_axis(level, window)
     )
     
     return fig
 
-def create_monthly_sentiment_breakdown(df):
+def create_monthly_sentiment_breakdown(df, aggregates=None):
     """Create monthly sentiment breakdown stacked bar chart using confidence score categories"""
-    monthly_sentiment = df.groupby(['month', 'sentiment_category']).size().reset_index(name='count')
+    if aggregates is not None:
+        monthly_sentiment = aggregates.monthly_frame()
+    else:
+        monthly_sentiment = df.groupby(['month', 'sentiment_category'], observed=True).size().reset_index(name='count')
+        monthly_sentiment = monthly_sentiment.astype({'month': str, 'sentiment_category': str})
     monthly_pivot = monthly_sentiment.pivot(index='month', columns='sentiment_category', values='count').fillna(0)
     
     fig = go.Figure()
@@ -227,8 +592,74 @@ def create_monthly_sentiment_breakdown(df):
     
     return fig
 
-def create_sentiment_by_tweet_length(df):
-    """Create confidence score vs tweet length scatter plot"""
+# Above this many posts the length-vs-score scatter is summarized instead of
+# shipping every point (and its full text) to the browser
+SCATTER_MAX_POINTS = int(os.environ.get('SCATTER_MAX_POINTS', 5000))
+# 'sample' keeps a stratified sample per sentiment_category, 'density' bins all posts
+SCATTER_MODE = os.environ.get('SCATTER_MODE', 'sample')
+
+def stratum_quota(max_points, size, total):
+    """Points a sentiment_category of size posts (out of total) gets in a stratified sample"""
+    return max(1, int(round(max_points * size / total)))
+
+def _stratified_sample(df, max_points, seed=0):
+    """Pick about max_points rows while keeping each sentiment_category's share"""
+    rng = np.random.default_rng(seed)
+    codes, uniques = pd.factorize(df['sentiment_category'])
+    picks = []
+    for code in range(len(uniques)):
+        positions = np.flatnonzero(codes == code)
+        quota = stratum_quota(max_points, len(positions), len(df))
+        if quota < len(positions):
+            positions = rng.choice(positions, quota, replace=False)
+        picks.append(positions)
+    return df.iloc[np.sort(np.concatenate(picks))]
+
+# Length x score grid of the density view
+DENSITY_BINS = (60, 50)
+
+def density_score_rows(scores):
+    """Grid row of each in-range score, binned exactly as np.histogram2d bins it (last bin closed)"""
+    edges = np.linspace(0.0, 1.0, DENSITY_BINS[1] + 1)
+    rows = np.searchsorted(edges, scores, side='right') - 1
+    rows[scores == edges[-1]] -= 1
+    return rows
+
+def length_score_grid(lengths, scores, max_length, weights=None):
+    """Count (length, score) pairs into the DENSITY_BINS grid over [0, max_length] x [0, 1]"""
+    return np.histogram2d(
+        lengths, scores, bins=list(DENSITY_BINS),
+        range=[[0, max(max_length, 1)], [0, 1]], weights=weights
+    )
+
+def _length_score_density(df=None, aggregates=None):
+    """Bin every post into a length x score grid and draw it as a heatmap"""
+    if aggregates is not None:
+        counts, x_edges, y_edges = aggregates.length_score_grid()
+    else:
+        lengths = df['tweet_length'].to_numpy(dtype='float64')
+        scores = df['confidence_score'].to_numpy(dtype='float64')
+        in_range = (scores >= 0) & (scores <= 1)
+        counts, x_edges, y_edges = length_score_grid(lengths[in_range], scores[in_range], lengths.max())
+    z = np.where(counts > 0, counts, np.nan).T
+    return go.Figure(data=[go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=z,
+        colorscale='Blues',
+        colorbar=dict(title='Posts'),
+        hovertemplate='Length: ~%{x:.0f}<br>Confidence: ~%{y:.2f}<br>Posts: %{z}<extra></extra>'
+    )])
+
+def create_sentiment_by_tweet_length(df, max_points=None, mode=None, aggregates=None):
+    """Create confidence score vs tweet length scatter plot
+    
+    Above max_points posts the chart is summarized (stratified sample or density
+    grid), full post text is left out of the payload and points carry their
+    post id in customdata so the text can be fetched on click. An AggregateStore
+    supplies its kept points, reservoir samples or density grid instead; it
+    holds at most its own sample size of points, which caps max_points.
+    """
     color_map = {
         'Extremely Negative': '#8B0000',  # Dark red
         'Clearly Negative': '#DC143C',    # Crimson
@@ -239,17 +670,64 @@ def create_sentiment_by_tweet_length(df):
         'Extremely Positive': '#006400',  # Dark green
         'Invalid Score': '#808080'        # Gray
     }
+    labels = {'tweet_length': 'Post Length (characters)', 'confidence_score': 'Confidence Score (0=Negative, 1=Positive)'}
+    max_points = SCATTER_MAX_POINTS if max_points is None else max_points
+    mode = mode or SCATTER_MODE
+    if aggregates is not None:
+        max_points = min(max_points, aggregates.sample_size)
+        total = aggregates.rows
+        if total <= max_points:
+            df = aggregates.points_frame()
+    else:
+        total = len(df)
     
-    fig = px.scatter(
-        df, 
-        x='tweet_length', 
-        y='confidence_score',
-        color='sentiment_category',
-        title='Confidence Score vs Post Length',
-        labels={'tweet_length': 'Post Length (characters)', 'confidence_score': 'Confidence Score (0=Negative, 1=Positive)'},
-        color_discrete_map=color_map,
-        hover_data=['tweet', 'reasoning']
-    )
+    if total <= max_points:
+        fig = px.scatter(
+            df, 
+            x='tweet_length', 
+            y='confidence_score',
+            color='sentiment_category',
+            title='Confidence Score vs Post Length',
+            labels=labels,
+            color_discrete_map=color_map,
+            hover_data=['tweet', 'reasoning']
+        )
+        shown = total
+    elif mode == 'density':
+        fig = _length_score_density(df, aggregates)
+        fig.update_layout(
+            title='Confidence Score vs Post Length (density)',
+            xaxis_title=labels['tweet_length'],
+            yaxis_title=labels['confidence_score']
+        )
+        shown = 0
+    else:
+        if aggregates is not None:
+            sample = aggregates.sample_frame(max_points)
+        else:
+            sample = _stratified_sample(df, max_points)
+        fig = px.scatter(
+            sample.assign(post_id=sample.index),
+            x='tweet_length', 
+            y='confidence_score',
+            color='sentiment_category',
+            title='Confidence Score vs Post Length',
+            labels=labels,
+            color_discrete_map=color_map,
+            custom_data=['post_id'],
+            render_mode='webgl'
+        )
+        shown = len(sample)
+    
+    if shown < total:
+        summary = f"{total - shown:,} of {total:,} posts summarized"
+        if shown:
+            summary = f"Showing a stratified sample of {shown:,} of {total:,} posts; click a point to read it"
+        fig.add_annotation(
+            x=0.99, y=1.08, xref='paper', yref='paper', xanchor='right',
+            text=summary, showarrow=False, font=dict(size=11, color='#7f8c8d')
+        )
+        fig.update_layout(meta=dict(total_points=total, shown_points=shown, summarized_points=total - shown, post_details=shown > 0))
     
     # Add horizontal reference lines
     fig.add_hline(y=0.5, line_dash="dash", line_color="gray", opacity=0.5)
@@ -264,14 +742,32 @@ def create_sentiment_by_tweet_length(df):
     
     return fig
 
-def create_confidence_score_histogram(df):
-    """Create histogram showing distribution of confidence scores"""
-    fig = go.Figure(data=[go.Histogram(
-        x=df['confidence_score'],
-        nbinsx=20,
+# Fixed-width bins over [0, 1] so counts can be accumulated incrementally
+SCORE_BINS = 20
+
+def score_histogram(scores):
+    """Count scores into SCORE_BINS equal bins over [0, 1]; out-of-range scores are dropped"""
+    counts, edges = np.histogram(np.asarray(scores, dtype='float64'), bins=SCORE_BINS, range=(0.0, 1.0))
+    return counts, edges
+
+def create_confidence_score_histogram(df, aggregates=None):
+    """Create histogram showing distribution of confidence scores
+    
+    Bins are counted server-side, so only SCORE_BINS bars are sent to the browser.
+    """
+    if aggregates is not None:
+        counts, edges = aggregates.score_counts, aggregates.score_edges
+    else:
+        counts, edges = score_histogram(df['confidence_score'])
+    
+    fig = go.Figure(data=[go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        customdata=[f"{low:.2f}-{high:.2f}" for low, high in zip(edges[:-1], edges[1:])],
         marker_color='#3498DB',
         opacity=0.7,
-        hovertemplate='Confidence Range: %{x}<br>Count: %{y}<extra></extra>'
+        hovertemplate='Confidence Range: %{customdata}<br>Count: %{y}<extra></extra>'
     )])
     
     # Add vertical lines for key thresholds
@@ -293,28 +789,27 @@ def create_confidence_score_histogram(df):
     
     return fig
 
-def extract_common_words(tweets, min_length=4):
-    """Extract common words from tweets"""
-    all_text = ' '.join(tweets).lower()
-    # Remove common words and extract meaningful words
-    words = re.findall(r'\b[a-zA-Z]{' + str(min_length) + r',}\b', all_text)
-    # Filter out common words
-    common_words = ['nestle', 'that', 'this', 'with', 'they', 'have', 'from', 'their', 'would', 'been', 'said', 'each', 'more', 'some', 'what', 'them']
-    words = [word for word in words if word not in common_words]
-    return Counter(words)
-
-def create_word_analysis_chart(df):
-    """Create word frequency comparison between negative and positive sentiment categories"""
-    # Use broad categories for better comparison
-    negative_tweets = df[df['broad_category'] == 'Negative toward Nestle']['tweet'].tolist()
-    positive_tweets = df[df['broad_category'] == 'Positive toward Nestle']['tweet'].tolist()
-    
-    negative_words = extract_common_words(negative_tweets)
-    positive_words = extract_common_words(positive_tweets)
-    
-    # Get top 10 words from each category
-    top_negative = dict(negative_words.most_common(10))
-    top_positive = dict(positive_words.most_common(10))
+def extract_common_words(tweets, min_length=4, stopwords=None, brand=DEFAULT_BRAND):
+    """Extract common words from tweets (the brand's own name counts as a stopword)"""
+    # Remove common words and extract meaningful words (set lookups, batched regex scans)
+    stopwords = brand_stopwords(brand) if stopwords is None else stopwords
+    return word_frequency.count_words(tweets, stopwords, min_length)
+
+def create_word_analysis_chart(df, aggregates=None, word_index=None, top_k=10):
+    """Create word frequency comparison between negative and positive sentiment categories
+    
+    Pass a prebuilt word_frequency.WordFrequencyIndex (or an AggregateStore,
+    which keeps one) to reuse its counts, e.g. for several date-filtered views.
+    """
+    if word_index is None and aggregates is not None:
+        word_index = aggregates.words
+    if word_index is None:
+        word_index = word_frequency.WordFrequencyIndex.from_frame(df, stopwords=frame_stopwords(df))
+    brand = brand_of(df, aggregates)
+    
+    # Use broad categories for better comparison; get top words from each category
+    top_negative = dict(word_index.top(top_k, broad_category='Negative'))
+    top_positive = dict(word_index.top(top_k, broad_category='Positive'))
     
     fig = make_subplots(
         rows=1, cols=2,
@@ -328,7 +823,7 @@ def create_word_analysis_chart(df):
             go.Bar(
                 x=list(top_negative.keys()),
                 y=list(top_negative.values()),
-                name='Negative toward Nestle',
+                name=broad_label('Negative', brand),
                 marker_color='#DC143C'
             ),
             row=1, col=1
@@ -340,7 +835,7 @@ def create_word_analysis_chart(df):
             go.Bar(
                 x=list(top_positive.keys()),
                 y=list(top_positive.values()),
-                name='Positive toward Nestle',
+                name=broad_label('Positive', brand),
                 marker_color='#32CD32'
             ),
             row=1, col=2
@@ -355,28 +850,60 @@ def create_word_analysis_chart(df):
     
     return fig
 
-def generate_summary_stats(df):
-    """Generate summary statistics based on confidence scores"""
-    total_posts = len(df)
+def generate_summary_stats(df, aggregates=None):
+    """Generate summary statistics based on confidence scores
     
-    # Count posts by broad categories
-    negative_posts = len(df[df['broad_category'] == 'Negative toward Nestle'])
-    neutral_posts = len(df[df['broad_category'] == 'Neutral'])
-    positive_posts = len(df[df['broad_category'] == 'Positive toward Nestle'])
+    With an aggregate_store.AggregateStore the counts, mean and date range come
+    from its running totals and df is not used.
+    """
+    if aggregates is not None:
+        total_posts = aggregates.rows
+        counts = aggregates.category_pair_counts()
+    else:
+        total_posts = len(df)
+        # Count broad and detailed categories in one grouped pass
+        counts = df.groupby(['broad_category', 'sentiment_category'], sort=False, observed=True).size()
+    broad_counts = counts.groupby(level=0, observed=True).sum()
+    detailed_counts = counts.groupby(level=1, observed=True).sum()
+    
+    negative_posts = int(broad_counts.get('Negative', 0))
+    neutral_posts = int(broad_counts.get('Neutral', 0))
+    positive_posts = int(broad_counts.get('Positive', 0))
     
     # Calculate average confidence score
-    avg_confidence = df['confidence_score'].mean()
+    if aggregates is not None:
+        avg_confidence = aggregates.score_sum / total_posts if total_posts else np.nan
+    else:
+        avg_confidence = df['confidence_score'].mean()
     
-    # Count posts by detailed sentiment categories
-    extremely_negative = len(df[df['sentiment_category'] == 'Extremely Negative'])
-    clearly_negative = len(df[df['sentiment_category'] == 'Clearly Negative'])
-    somewhat_negative = len(df[df['sentiment_category'] == 'Somewhat Negative'])
-    neutral_detailed = len(df[df['sentiment_category'] == 'Neutral'])
-    somewhat_positive = len(df[df['sentiment_category'] == 'Somewhat Positive'])
-    clearly_positive = len(df[df['sentiment_category'] == 'Clearly Positive'])
-    extremely_positive = len(df[df['sentiment_category'] == 'Extremely Positive'])
+    # Score quantiles per broad category; every post is in exactly one, so they add up to the overall sketch
+    # ('Invalid Score' spans both Negative and Positive, hence not per sentiment_category)
+    broad_sketches = aggregates.broad_sketches if aggregates is not None else score_sketches(df, 'broad_category')
+    overall = score_sketch.QuantileSketch.combine(broad_sketches.values())
+    p10_confidence, median_confidence, p90_confidence = overall.quantiles()
+    category_bands = {
+        broad: dict(zip(BAND_NAMES, broad_sketches[broad].quantiles()))
+        for broad in BROAD_CATEGORIES if broad in broad_sketches
+    }
     
-    date_range = f"{df['date'].min()} to {df['date'].max()}"
+    # Detailed sentiment categories
+    extremely_negative = int(detailed_counts.get('Extremely Negative', 0))
+    clearly_negative = int(detailed_counts.get('Clearly Negative', 0))
+    somewhat_negative = int(detailed_counts.get('Somewhat Negative', 0))
+    neutral_detailed = int(detailed_counts.get('Neutral', 0))
+    somewhat_positive = int(detailed_counts.get('Somewhat Positive', 0))
+    clearly_positive = int(detailed_counts.get('Clearly Positive', 0))
+    extremely_positive = int(detailed_counts.get('Extremely Positive', 0))
+    
+    if aggregates is not None:
+        first_day = min(aggregates.daily) if aggregates.daily else np.nan
+        last_day = max(aggregates.daily) if aggregates.daily else np.nan
+    else:
+        # Days are categorical with sorted categories, so the extreme codes are the first and last day
+        day_codes = df['day'].cat.codes
+        first_day = df['day'].cat.categories[day_codes.min()] if len(df) else np.nan
+        last_day = df['day'].cat.categories[day_codes.max()] if len(df) else np.nan
+    date_range = f"{first_day} to {last_day}"
     
     return {
         'total_posts': total_posts,
@@ -384,6 +911,11 @@ def generate_summary_stats(df):
         'neutral_posts': neutral_posts,
         'positive_posts': positive_posts,
         'avg_confidence': avg_confidence,
+        'p10_confidence': p10_confidence,
+        'median_confidence': median_confidence,
+        'p90_confidence': p90_confidence,
+        # {broad_category: {'p10': ..., 'p50': ..., 'p90': ...}}
+        'category_confidence_bands': category_bands,
         'date_range': date_range,
         'negative_percentage': (negative_posts / total_posts) * 100 if total_posts > 0 else 0,
         'neutral_percentage': (neutral_posts / total_posts) * 100 if total_posts > 0 else 0,
@@ -398,14 +930,74 @@ def generate_summary_stats(df):
         'extremely_positive': extremely_positive
     }
 
-def create_dashboard_html(figures, stats):
-    """Create HTML dashboard with all figures"""
-    html_content = f"""
+# Dashboard figures by name, in display order
+FIGURE_BUILDERS = {
+    # 1. Sentiment over time
+    'timeline': create_sentiment_timeline,
+    # 2. Sentiment distribution
+    'distribution': create_sentiment_distribution,
+    # 3. Tweet volume over time
+    'volume': create_tweet_volume_chart,
+    # 4. Monthly sentiment breakdown
+    'monthly': create_monthly_sentiment_breakdown,
+    # 5. Sentiment vs tweet length
+    'length_scatter': create_sentiment_by_tweet_length,
+    # 6. Confidence score histogram
+    'confidence_histogram': create_confidence_score_histogram,
+    # 7. Word analysis
+    'word_analysis': create_word_analysis_chart,
+}
+
+# Figures that can render from an aggregate_store.AggregateStore (all of them,
+# so the chunked pipeline never needs the whole frame)
+AGGREGATE_FIGURES = set(FIGURE_BUILDERS)
+
+# Figures bucketed by time_pyramid level, which the dashboard re-requests for a zoomed window
+TIME_FIGURES = ('timeline', 'volume')
+
+def create_figure(name, df, aggregates=None, window=None, level=None, pyramid=None, word_index=None):
+    """Create one dashboard figure by name, from aggregates where the chart supports them
+    
+    window=(start, end), level and a prebuilt time_pyramid.TimePyramid select
+    the buckets of the TIME_FIGURES, and a prebuilt word_frequency.WordFrequencyIndex
+    feeds the word analysis; the other figures ignore them.
+    """
+    options = dict(window=window, level=level, pyramid=pyramid) if name in TIME_FIGURES else {}
+    if name == 'word_analysis' and word_index is not None:
+        options['word_index'] = word_index
+    if aggregates is not None and name in AGGREGATE_FIGURES:
+        return FIGURE_BUILDERS[name](df, aggregates=aggregates, **options)
+    return FIGURE_BUILDERS[name](df, **options)
+
+def create_figures(df, aggregates=None):
+    """Create all dashboard figures in display order"""
+    return [create_figure(name, df, aggregates) for name in FIGURE_BUILDERS]
+
+def create_dashboard_html(figures, stats, brand=DEFAULT_BRAND):
+    """Create HTML dashboard with all figures (as one string; write_html streams the pieces instead)"""
+    return ''.join(iter_dashboard_html(figures, stats, brand))
+
+def _links_html(links):
+    items = ' |\n            '.join(f'<a href="{html.escape(href)}">{html.escape(label)}</a>' for href, label in links)
+    return f'''
+        <div style="text-align: center; margin-bottom: 30px; line-height: 2;">
+            {items}
+        </div>
+        '''
+
+def iter_dashboard_html(figures, stats, brand=DEFAULT_BRAND, title=None, links=None):
+    """Yield the dashboard page piece by piece, serializing each figure only when its script is reached
+    
+    figures are plotly Figures or already serialized JSON strings. links is a list of
+    (href, label) pairs shown under the header, for the pages of a multi-page export.
+    """
+    title = title or f'{brand} Sentiment Analysis Dashboard'
+    yield f"""
     <!DOCTYPE html>
     <html>
     <head>
-        <title>Nestle Sentiment Analysis Dashboard</title>
-        <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+        <title>{html.escape(title)}</title>
+        <script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
         <style>
             body {{
                 font-family: Arial, sans-serif;
@@ -453,11 +1045,14 @@ def create_dashboard_html(figures, stats):
     </head>
     <body>
         <div class="header">
-            <h1>🔍 Nestle Sentiment Analysis Dashboard</h1>
+            <h1>🔍 {html.escape(title)}</h1>
             <p>Confidence Score Analysis of {stats['total_posts']} posts from {stats['date_range']}</p>
             <p style="font-size: 14px; margin-top: 10px;">Confidence scores: 0.0 = Extremely Negative, 0.5 = Neutral, 1.0 = Extremely Positive</p>
         </div>
-        
+        """
+    if links:
+        yield _links_html(links)
+    yield f"""
         <div class="stats-grid">
             <div class="stat-card">
                 <div class="stat-value">{stats['total_posts']}</div>
@@ -465,7 +1060,7 @@ def create_dashboard_html(figures, stats):
             </div>
             <div class="stat-card">
                 <div class="stat-value">{stats['negative_posts']}</div>
-                <div class="stat-label">Negative toward Nestle</div>
+                <div class="stat-label">{broad_label('Negative', brand)}</div>
             </div>
             <div class="stat-card">
                 <div class="stat-value">{stats['neutral_posts']}</div>
@@ -473,12 +1068,16 @@ def create_dashboard_html(figures, stats):
             </div>
             <div class="stat-card">
                 <div class="stat-value">{stats['positive_posts']}</div>
-                <div class="stat-label">Positive toward Nestle</div>
+                <div class="stat-label">{broad_label('Positive', brand)}</div>
             </div>
             <div class="stat-card">
                 <div class="stat-value">{stats['avg_confidence']:.3f}</div>
                 <div class="stat-label">Average Confidence Score</div>
             </div>
+            <div class="stat-card">
+                <div class="stat-value">{stats['median_confidence']:.3f}</div>
+                <div class="stat-label">Median Confidence (p10 {stats['p10_confidence']:.2f}, p90 {stats['p90_confidence']:.2f})</div>
+            </div>
             <div class="stat-card">
                 <div class="stat-value">{stats['negative_percentage']:.1f}%</div>
                 <div class="stat-label">Negative %</div>
@@ -488,88 +1087,228 @@ def create_dashboard_html(figures, stats):
     
     # Add each figure to the HTML
     for i, fig in enumerate(figures):
-        html_content += f"""
+        yield f"""
         <div class="chart-container">
             <div id="chart{i}"></div>
         </div>
         """
     
-    html_content += """
+    yield """
         <script>
     """
     
-    # Add JavaScript to render each figure
+    # Add JavaScript to render each figure (figures may already be serialized)
     for i, fig in enumerate(figures):
-        fig_json = fig.to_json()
-        html_content += f"""
+        fig_json = fig if isinstance(fig, str) else fig.to_json()
+        yield f"""
             var figure{i} = {fig_json};
             Plotly.newPlot('chart{i}', figure{i}.data, figure{i}.layout);
         """
+        del fig_json
     
-    html_content += """
+    yield """
         </script>
     </body>
     </html>
     """
-    
-    return html_content
+
+# --pages choices of the CLI export: one page, or index.html plus a page per chart or per calendar month
+PAGE_MODES = ('single', 'chart', 'month')
+
+def write_html(path, chunks):
+    """Stream HTML chunks to path through a temporary file, so a failed export leaves no half page; returns bytes written"""
+    written = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk.encode('utf-8'))
+    os.replace(tmp_path, path)
+    return written
 
 def main():
-    # Load data
-    data = load_sentiment_data("nestle_threads_sentiment_analysis_2025-08-12.json")
+    parser = argparse.ArgumentParser(description='Build the static sentiment dashboard')
+    parser.add_argument('--start', help='first day (or datetime) to include, e.g. 2025-08-01')
+    parser.add_argument('--end', help='last day (or datetime) to include, e.g. 2025-08-07')
+    parser.add_argument('--memory-report', action='store_true', help='print the bytes held by each column')
+    parser.add_argument('--chunk-size', type=int, help='process the data this many records at a time, never all at once')
+    parser.add_argument('--brand', default=DEFAULT_BRAND, help='brand the posts are about, for titles and stopwords')
+    parser.add_argument('--pages', choices=PAGE_MODES, default='single',
+                        help='one page, or an index page plus a page per chart or per month')
+    parser.add_argument('--output', help='output file (or directory for --pages chart/month); named after the brand by default')
+    args = parser.parse_args()
+    output = args.output or default_output(args.brand, args.pages)
     
-    if not data:
+    data_file = os.environ.get('DATA_FILE', 'nestle_threads_sentiment_analysis_2025-08-12.json')
+    
+    if args.chunk_size:
+        build_chunked(data_file, args.chunk_size, args.start, args.end, args.brand, args.pages, output)
+        return
+    
+    if snapshot.is_snapshot_path(data_file):
+        # Columnar snapshot written by snapshot.py: memory-mapped, no parsing
+        df = snapshot.load_snapshot(data_file)
+        print(f"Loaded {len(df)} records from snapshot {data_file}")
+    else:
+        # Load and prepare data in streamed batches
+        df = load_prepared_data(data_file)
+    
+    if len(df) == 0:
         print("No data loaded. Exiting.")
         return
+    set_brand(df, args.brand)
+    
+    if args.start or args.end:
+        df = filter_date_range(df, args.start, args.end)
+        print(f"Selected {len(df)} records between {args.start or 'the start'} and {args.end or 'the end'}")
+        if len(df) == 0:
+            print("No records in the selected date range. Exiting.")
+            return
     
-    # Prepare data
-    df = prepare_data(data)
     print(f"Prepared {len(df)} records for visualization")
+    if args.memory_report:
+        print(memory_report(df).to_string())
     
     # Generate summary statistics
     stats = generate_summary_stats(df)
     
-    # Create visualizations
     print("Creating visualizations...")
-    figures = []
-    
-    # 1. Sentiment over time
-    figures.append(create_sentiment_timeline(df))
-    
-    # 2. Sentiment distribution
-    figures.append(create_sentiment_distribution(df))
+    if args.pages == 'chart':
+        paths = export_chart_pages(output, stats, args.brand, df=df)
+    elif args.pages == 'month':
+        months = sorted(str(month) for month in df['month'].unique())
+        paths = export_month_pages(output, stats, months, lambda month: (filter_date_range(df, *month_bounds(month)), None), args.brand)
+    else:
+        # Create visualizations concurrently (see figure_builder for pool settings)
+        import figure_builder
+        figures = list(figure_builder.build_figures(df).values())
+        paths = [write_dashboard(figures, stats, args.brand, output)]
+    print_summary(stats, args.brand, paths)
+
+def build_chunked(data_file, chunk_size, start=None, end=None, brand=DEFAULT_BRAND, pages='single', output=None):
+    """Build the dashboard chunk by chunk from running totals; memory is bounded by chunk_size"""
+    import figure_builder
     
-    # 3. Tweet volume over time
-    figures.append(create_tweet_volume_chart(df))
+    output = output or default_output(brand, pages)
+    by_month = pages == 'month'
+    if snapshot.is_snapshot_path(data_file):
+        # Memory-mapped columns; each chunk's text is decoded as it is reached
+        store, month_stores = aggregate_chunks(snapshot.iter_snapshot_chunks(data_file, chunk_size, start, end), brand, by_month)
+    else:
+        try:
+            with open(data_file, 'rb') as f:
+                records = iter_sentiment_records(iter_file_chunks(f))
+                store, month_stores = aggregate_chunks(iter_prepared_chunks(records, chunk_size, start, end), brand, by_month)
+        except FileNotFoundError:
+            print(f"Error: File {data_file} not found!")
+            return
+    print(f"Aggregated {store.rows} records in chunks of {chunk_size}")
+    if store.rows == 0:
+        print("No data loaded. Exiting.")
+        return
     
-    # 4. Monthly sentiment breakdown
-    figures.append(create_monthly_sentiment_breakdown(df))
+    stats = generate_summary_stats(None, aggregates=store)
+    print("Creating visualizations...")
+    if pages == 'chart':
+        paths = export_chart_pages(output, stats, brand, aggregates=store)
+    elif pages == 'month':
+        paths = export_month_pages(output, stats, sorted(month_stores), lambda month: (None, month_stores.pop(month)), brand)
+    else:
+        figures = list(figure_builder.build_figures(None, aggregates=store).values())
+        paths = [write_dashboard(figures, stats, brand, output)]
+    print_summary(stats, brand, paths)
+
+def aggregate_chunks(chunks, brand=DEFAULT_BRAND, by_month=False):
+    """AggregateStore over prepared chunks, plus {'YYYY-MM': store} of each month's rows when by_month
     
-    # 5. Sentiment vs tweet length
-    figures.append(create_sentiment_by_tweet_length(df))
+    The overall store is then the merge of the month stores, so every row is
+    read once either way.
+    """
+    from aggregate_store import AggregateStore
     
-    # 6. Confidence score histogram
-    figures.append(create_confidence_score_histogram(df))
+    if not by_month:
+        return AggregateStore.from_chunks(chunks, brand=brand), {}
+    month_stores = {}
+    for chunk in chunks:
+        for month, part in chunk.groupby('month', observed=True, sort=False):
+            month_stores.setdefault(str(month), AggregateStore(brand=brand)).ingest_frame(part)
+    store = AggregateStore(brand=brand)
+    for month in sorted(month_stores):
+        store.merge(month_stores[month])
+    return store, month_stores
+
+def default_output(brand=DEFAULT_BRAND, pages='single'):
+    """<brand>_sentiment_dashboard.html, or a directory of that name without the suffix for multi-page exports"""
+    slug = re.sub(r'[^a-z0-9]+', '_', unicodedata.normalize('NFKD', brand).encode('ascii', 'ignore').decode('ascii').lower())
+    return f"{slug}_sentiment_dashboard" + ('.html' if pages == 'single' else '')
+
+def write_dashboard(figures, stats, brand=DEFAULT_BRAND, output=None):
+    """Stream the HTML dashboard to output; returns its path"""
+    print("Generating HTML dashboard...")
+    output = output or default_output(brand)
+    write_html(output, iter_dashboard_html(figures, stats, brand))
+    return output
+
+def month_bounds(month):
+    """First and last day of a 'YYYY-MM' month, as filter_date_range bounds"""
+    period = pd.Period(month, freq='M')
+    return period.start_time.strftime('%Y-%m-%d'), period.end_time.strftime('%Y-%m-%d')
+
+def export_chart_pages(output_dir, stats, brand=DEFAULT_BRAND, df=None, aggregates=None):
+    """Write index.html (summary and links) plus one page per chart; returns the page paths
     
-    # 7. Word analysis
-    figures.append(create_word_analysis_chart(df))
+    Charts are built and written one at a time, so only one is held in memory.
+    """
+    import figure_builder
     
-    # Generate HTML dashboard
-    print("Generating HTML dashboard...")
-    html_content = create_dashboard_html(figures, stats)
+    os.makedirs(output_dir, exist_ok=True)
+    pages = [(f'chart-{name}.html', name.replace('_', ' ').title()) for name in FIGURE_BUILDERS]
+    paths = [os.path.join(output_dir, 'index.html')]
+    write_html(paths[0], iter_dashboard_html([], stats, brand, links=pages))
+    links = [('index.html', 'Overview')] + pages
+    for name, (filename, label) in zip(FIGURE_BUILDERS, pages):
+        figure = figure_builder.render_figure(name, df, aggregates)
+        paths.append(os.path.join(output_dir, filename))
+        write_html(paths[-1], iter_dashboard_html([figure], stats, brand, title=f'{brand} Sentiment Analysis: {label}', links=links))
+        del figure
+    return paths
+
+def export_month_pages(output_dir, stats, months, month_data, brand=DEFAULT_BRAND):
+    """Write index.html (overall summary and links) plus a full dashboard page per month; returns the page paths
     
-    # Save HTML file
-    output_filename = "nestle_sentiment_dashboard.html"
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    month_data(month) returns that month's (frame, aggregates), either of which
+    may be None; it is called once per month, in order, so a month's data can be
+    dropped as soon as its page is written.
+    """
+    import figure_builder
     
-    print(f"Dashboard saved as {output_filename}")
+    os.makedirs(output_dir, exist_ok=True)
+    pages = [(f'month-{month}.html', month) for month in months]
+    paths = [os.path.join(output_dir, 'index.html')]
+    write_html(paths[0], iter_dashboard_html([], stats, brand, links=pages))
+    links = [('index.html', 'Overview')] + pages
+    for month, (filename, _) in zip(months, pages):
+        df, aggregates = month_data(month)
+        month_stats = generate_summary_stats(df, aggregates=aggregates)
+        figures = list(figure_builder.build_figures(df, aggregates=aggregates).values())
+        paths.append(os.path.join(output_dir, filename))
+        write_html(paths[-1], iter_dashboard_html(figures, month_stats, brand, title=f'{brand} Sentiment Analysis: {month}', links=links))
+        del df, aggregates, figures
+    return paths
+
+def print_summary(stats, brand=DEFAULT_BRAND, paths=()):
+    """Print where the dashboard went and the summary statistics"""
+    if len(paths) == 1:
+        print(f"Dashboard saved as {paths[0]}")
+    elif paths:
+        print(f"Dashboard saved as {len(paths)} pages in {os.path.dirname(paths[0]) or '.'} (start at {paths[0]})")
     print(f"\nSummary Statistics:")
     print(f"- Total posts analyzed: {stats['total_posts']}")
-    print(f"- Negative toward Nestle: {stats['negative_posts']} ({stats['negative_percentage']:.1f}%)")
+    print(f"- {broad_label('Negative', brand)}: {stats['negative_posts']} ({stats['negative_percentage']:.1f}%)")
     print(f"- Neutral: {stats['neutral_posts']} ({stats['neutral_percentage']:.1f}%)")
-    print(f"- Positive toward Nestle: {stats['positive_posts']} ({stats['positive_percentage']:.1f}%)")
+    print(f"- {broad_label('Positive', brand)}: {stats['positive_posts']} ({stats['positive_percentage']:.1f}%)")
     print(f"- Average confidence score: {stats['avg_confidence']:.3f}")
+    print(f"- Median confidence score: {stats['median_confidence']:.3f} (p10 {stats['p10_confidence']:.3f}, p90 {stats['p90_confidence']:.3f})")
     print(f"- Date range: {stats['date_range']}")
     print(f"\nDetailed Breakdown:")
     print(f"- Extremely Negative: {stats['extremely_negative']}")
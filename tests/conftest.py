@@ -0,0 +1,26 @@
+import os
+import sys
+from collections import OrderedDict
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    """Serve NDJSON ``lines`` as the app's only brand, from an empty cache; returns a test client and the data file"""
+    import app
+    import brands
+    from dashboard_cache import DashboardCache
+
+    def serve(lines, **cache_options):
+        data_file = tmp_path / 'posts.ndjson'
+        data_file.write_text(''.join(lines))
+        monkeypatch.setattr(app, 'BRANDS', OrderedDict(test=brands.Brand('test', data_file=str(data_file))))
+        monkeypatch.setattr(app, 'DEFAULT_BRAND', 'test')
+        monkeypatch.setattr(app, 'cache', DashboardCache(app._fetch_brand, app._build_brand, **cache_options))
+        return app.app.test_client(), data_file
+
+    return serve
@@ -0,0 +1,71 @@
+import json
+
+import pandas as pd
+
+import step_3_dashboard as dashboard
+from aggregate_store import AggregateStore
+
+
+def frame(days, offset=0):
+    df = dashboard.prepare_data([
+        {'tweet': f'post {i}', 'reasoning': '', 'confidence_score': (i % 10) / 10, 'timestamp': f'2025-{day}T{i % 24:02d}:00:00Z'}
+        for i, day in enumerate(days)
+    ])
+    return df.set_axis(df.index + offset)
+
+
+def check_append(base, new):
+    appended = dashboard.append_prepared(base, new)
+    expected = dashboard.combine_prepared([base, new], ignore_index=False)
+    pd.testing.assert_frame_equal(appended, expected)
+    return appended
+
+
+def test_append_after_last_post_widens_categories():
+    base = frame(['07-30', '07-31', '07-31'])
+    new = frame(['07-31', '08-01', '08-02'], offset=3)
+    df = check_append(base, new)
+    assert list(df['month'].cat.categories) == ['2025-07', '2025-08']
+    assert list(df['day'].cat.categories) == ['2025-07-30', '2025-07-31', '2025-08-01', '2025-08-02']
+
+
+def test_interleaved_rows_are_sorted():
+    df = check_append(frame(['07-01', '07-20']), frame(['07-10'], offset=2))
+    assert list(df.index) == [0, 2, 1]
+
+
+def test_empty_sides():
+    base = frame(['07-01'])
+    assert dashboard.append_prepared(base, base.iloc[:0]) is base
+    check_append(base.iloc[:0], frame(['07-02'], offset=1))
+
+
+def test_stats_from_store_match_frame():
+    base, new = frame(['07-30', '07-31']), frame(['08-01', '08-02', '08-02'], offset=2)
+    store = AggregateStore.from_frame(base)
+    store.ingest_frame(new)
+    df = dashboard.append_prepared(base, new)
+    assert dashboard.generate_summary_stats(df, aggregates=store) == dashboard.generate_summary_stats(df)
+
+
+def test_appended_dataset_counts_only_new_rows(serve, monkeypatch):
+    import app
+
+    lines = [
+        json.dumps({'tweet': f'post {i} ' + 'word ' * (i % 7), 'reasoning': 'why', 'confidence_score': (i % 10) / 10,
+                    'timestamp': f'2025-08-{1 + i // 100:02d}T{i % 24:02d}:00:00Z'}) + '\n'
+        for i in range(600)
+    ]
+    _, data_file = serve(lines[:400], ttl=0, stale_while_revalidate=False)
+    app.cache.get('test')
+    with open(data_file, 'a') as f:
+        f.write(''.join(lines[400:]))
+
+    calls = []
+    frame_bytes = app._frame_bytes
+    monkeypatch.setattr(app, '_frame_bytes', lambda df: calls.append(len(df)) or frame_bytes(df))
+    entry = app.cache.get('test')
+    df, store, texts, index = entry.state
+    assert len(df) == 600 and calls == [200]
+    parts = sum(part.nbytes for part in (store, texts, index) if part is not None)
+    assert abs(entry.nbytes - parts - frame_bytes(df)) < 0.01 * entry.nbytes
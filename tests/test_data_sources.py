@@ -0,0 +1,50 @@
+import os
+
+from data_sources import fetch_dataset, is_sharded, list_shards
+
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_listing_skips_sharded_names(tmp_path):
+    write(tmp_path / 'a.json', '[]')
+    write(tmp_path / 'b.json', '[]')
+    write(tmp_path / 'more.manifest', 'a.json\n')
+    write(tmp_path / 'odd[1].json', '[]')
+    prefix = f'{tmp_path}/'
+    assert list_shards(prefix, [prefix]) == [os.path.join(prefix, 'a.json'), os.path.join(prefix, 'b.json')]
+
+
+def test_http_query_strings_are_not_globs():
+    assert not is_sharded('https://bucket.s3.amazonaws.com/posts.json?X-Amz-Signature=abc&list[0]=1')
+    assert is_sharded('https://example.com/days.manifest?token=abc')
+    assert not is_sharded('https://example.com/posts.json?file=a.manifest')
+    assert is_sharded('s3://bucket/days/*.json')
+    assert is_sharded('data/day-?.json')
+
+
+def test_unchanged_shards_are_refetched_after_a_change(tmp_path):
+    for name in ('a', 'b', 'c'):
+        write(tmp_path / f'{name}.json', name)
+    prefix = f'{tmp_path}/'
+    loaded = []
+
+    def load(chunks):
+        text = b''.join(chunks).decode()
+        loaded.append(text)
+        return text
+
+    validators, parts = fetch_dataset(prefix, [prefix], load)
+    assert parts == ['a', 'b', 'c'] and sorted(loaded) == ['a', 'b', 'c']
+
+    loaded.clear()
+    assert fetch_dataset(prefix, [prefix], load, validators=validators) == (validators, None)
+    assert loaded == []
+
+    # One changed shard: the unchanged ones answer "not modified", then load in full
+    write(tmp_path / 'b.json', 'b2')
+    os.utime(tmp_path / 'b.json', ns=(1, 1))
+    validators, parts = fetch_dataset(prefix, [prefix], load, validators=validators)
+    assert parts == ['a', 'b2', 'c'] and sorted(loaded) == ['a', 'b2', 'c']
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import pytest
+
+import step_3_dashboard as dashboard
+
+
+def frame(timestamps):
+    return dashboard.prepare_data([
+        {'tweet': f'post {i}', 'reasoning': '', 'confidence_score': 0.5, 'timestamp': timestamp}
+        for i, timestamp in enumerate(timestamps)
+    ])
+
+
+TIMESTAMPS = [f'2025-08-{day:02d}T{hour:02d}:00:00Z' for day in range(1, 11) for hour in (0, 12, 23)]
+
+
+def masked(df, start, end):
+    return df[(df['timestamp'] >= start) & (df['timestamp'] <= end)]
+
+
+def test_bare_dates_cover_whole_days():
+    df = frame(TIMESTAMPS)
+    view = dashboard.filter_date_range(df, '2025-08-03', '2025-08-05')
+    assert list(view.index) == list(masked(df, '2025-08-03T00:00:00Z', '2025-08-05T23:59:59Z').index)
+    assert np.shares_memory(view['confidence_score'].to_numpy(), df['confidence_score'].to_numpy())
+
+
+def test_datetime_bounds_and_open_ends():
+    df = frame(TIMESTAMPS)
+    view = dashboard.filter_date_range(df, '2025-08-02T12:00:00Z', '2025-08-03T12:00:00Z')
+    assert list(view['timestamp'].dt.hour) == [12, 23, 0, 12]
+    assert len(dashboard.filter_date_range(df, start='2025-08-10')) == 3
+    assert len(dashboard.filter_date_range(df, end='2025-08-01')) == 3
+    assert dashboard.filter_date_range(df) is df
+    assert len(dashboard.filter_date_range(df, '2025-08-05', '2025-08-04')) == 0
+    with pytest.raises(ValueError):
+        dashboard.filter_date_range(df, 'yesterday')
+
+
+def test_range_views_over_the_api(serve):
+    client, _ = serve(
+        json.dumps({'tweet': f'post {i}', 'reasoning': '', 'confidence_score': 0.5, 'timestamp': timestamp}) + '\n'
+        for i, timestamp in enumerate(TIMESTAMPS)
+    )
+    assert client.get('/api/stats').get_json()['total_posts'] == 30
+    stats = client.get('/api/stats?start=2025-08-03&end=2025-08-04').get_json()
+    assert stats['total_posts'] == 6 and stats['date_range'] == '2025-08-03 to 2025-08-04'
+    assert client.get('/api/figures/word_analysis?start=2025-08-03').status_code == 200
+    assert client.get('/api/stats?start=soon').status_code == 400
@@ -0,0 +1,42 @@
+import threading
+from concurrent.futures import wait
+
+import figure_builder
+import metrics
+import step_3_dashboard as dashboard
+
+
+def frame():
+    return dashboard.prepare_data([
+        {'tweet': f'post {i}', 'reasoning': '', 'confidence_score': (i % 10) / 10, 'timestamp': f'2025-08-{1 + i % 9:02d}T00:00:00Z'}
+        for i in range(50)
+    ])
+
+
+def test_pool_timings_reach_the_waiting_request(monkeypatch):
+    df = frame()
+    release = threading.Event()
+    create = dashboard.create_figure
+
+    def slow_create(*args, **kwargs):
+        release.wait(5)
+        return create(*args, **kwargs)
+
+    monkeypatch.setattr(dashboard, 'create_figure', slow_create)
+    token = metrics.begin_job()
+    futures = figure_builder.submit_figures(df, names=['volume'], executor='thread')
+    # The chart finishes only once result() is already waiting for it
+    threading.Timer(0.2, release.set).start()
+    assert futures['volume'].result().startswith('{')
+    timings = metrics.end_job(token)
+    assert {'create.volume', 'to_json.volume'} <= set(timings)
+
+
+def test_unwaited_timings_feed_the_histogram():
+    before = metrics.STAGE_SECONDS.count(stage='create.distribution')
+    future = figure_builder.submit_figures(frame(), names=['distribution'], executor='thread')['distribution']
+    wait([future])
+    token = metrics.begin_job()
+    future.result()
+    assert 'create.distribution' not in metrics.end_job(token)
+    assert metrics.STAGE_SECONDS.count(stage='create.distribution') == before + 1
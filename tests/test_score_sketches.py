@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import step_3_dashboard as dashboard
+from aggregate_store import AggregateStore
+
+
+def records(scores):
+    return [
+        {'tweet': f'post {i}', 'reasoning': '', 'confidence_score': score, 'timestamp': f'2025-08-01T{i % 24:02d}:00:00Z'}
+        for i, score in enumerate(scores)
+    ]
+
+
+def nearest_rank(scores, q):
+    return float(np.quantile(np.clip(scores, 0, 1), q, method='inverted_cdf'))
+
+
+@pytest.mark.parametrize('from_store', [False, True])
+def test_invalid_scores_counted_once(from_store):
+    # 'Invalid Score' holds both < 0 (broad Negative) and > 1 (broad Positive) scores
+    scores = [-0.5] + [1.5] * 5 + [0.5] * 5
+    df = dashboard.prepare_data(records(scores))
+    stats = dashboard.generate_summary_stats(df, aggregates=AggregateStore.from_frame(df) if from_store else None)
+
+    assert stats['p10_confidence'] == nearest_rank(scores, 0.1) == 0.5
+    assert stats['median_confidence'] == nearest_rank(scores, 0.5) == 0.5
+    assert stats['p90_confidence'] == nearest_rank(scores, 0.9) == 1.0
+    bands = stats['category_confidence_bands']
+    assert bands['Negative'] == {'p10': 0.0, 'p50': 0.0, 'p90': 0.0}
+    assert bands['Neutral'] == {'p10': 0.5, 'p50': 0.5, 'p90': 0.5}
+    assert bands['Positive'] == {'p10': 1.0, 'p50': 1.0, 'p90': 1.0}
+
+
+def test_store_chunks_match_frame():
+    rng = np.random.default_rng(3)
+    scores = np.round(rng.uniform(-0.3, 1.3, 500), 2).tolist()
+    df = dashboard.prepare_data(records(scores))
+    store = AggregateStore.from_frame(df.iloc[:200])
+    store.merge(AggregateStore.from_frame(df.iloc[200:]))
+
+    expected = dashboard.generate_summary_stats(df)
+    actual = dashboard.generate_summary_stats(df, aggregates=store)
+    for key in ('p10_confidence', 'median_confidence', 'p90_confidence', 'category_confidence_bands'):
+        assert actual[key] == expected[key]
+    for q, key in ((0.1, 'p10_confidence'), (0.5, 'median_confidence'), (0.9, 'p90_confidence')):
+        assert expected[key] == nearest_rank(scores, q)
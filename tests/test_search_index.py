@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+
+import search_index
+import step_3_dashboard as dashboard
+from search_index import SearchIndex, search_posts
+
+
+def frame(tweets, offset=0, day=1):
+    df = dashboard.prepare_data([
+        {'tweet': tweet, 'reasoning': 'customers mention the price' if 'price' in tweet else '',
+         'confidence_score': -0.8 if 'bad' in tweet else 0.6, 'timestamp': f'2025-08-{day + i % 5:02d}T00:00:00Z'}
+        for i, tweet in enumerate(tweets)
+    ])
+    return df.set_axis(df.index + offset)
+
+
+TWEETS = ['bad price increase again', 'love the new flavour', 'price price price', 'bad service', 'Price is fine']
+
+
+def test_every_word_must_match_and_tweets_rank_first():
+    df = frame(TWEETS)
+    index = SearchIndex.from_frame(df)
+    labels, scores = index.search('price')
+    assert sorted(labels.tolist()) == sorted(df.index[df['tweet'].str.lower().str.contains('price')].tolist())
+    assert index.search('bad price')[0].tolist() == df.index[df['tweet'] == 'bad price increase again'].tolist()
+    assert len(index.search('?!')[0]) == 0
+    best = labels[np.argmax(scores)]
+    assert df.loc[best, 'tweet'] == 'price price price'
+
+
+def test_search_posts_filters_and_pages():
+    df = frame(TWEETS)
+    index = SearchIndex.from_frame(df)
+    found = search_posts(df, index, 'price', categories=['Negative'])
+    assert found['terms'] == ['price']
+    assert [df.loc[post_id, 'tweet'] for post_id, _ in found['results']] == ['bad price increase again']
+    everything = search_posts(df, index, '', per_page=2, page=2)
+    assert everything['total'] == len(df) and len(everything['results']) == 2
+
+
+def test_extend_matches_one_build(monkeypatch):
+    monkeypatch.setattr(search_index, 'MAX_SEGMENTS', 2)
+    parts = [frame(TWEETS, offset=i * len(TWEETS), day=1 + i) for i in range(4)]
+    index = SearchIndex.from_frame(parts[0])
+    for part in parts[1:]:
+        index.extend(part)
+    assert all(len(segments) <= 2 for segments in index.segments.values())
+    whole = SearchIndex.from_frame(dashboard.combine_prepared(parts, ignore_index=False))
+    for query in ('price', 'bad service', 'flavour'):
+        labels, scores = index.search(query)
+        expected_labels, expected_scores = whole.search(query)
+        np.testing.assert_array_equal(labels, expected_labels)
+        np.testing.assert_allclose(scores, expected_scores)
+
+
+def test_search_during_extend_sees_whole_appends():
+    index = SearchIndex.from_frame(frame(TWEETS))
+    errors = []
+    done = threading.Event()
+
+    def searching():
+        try:
+            while not done.is_set():
+                labels, _ = index.search('price')
+                assert len(labels) % 3 == 0
+        except Exception as exc:
+            errors.append(exc)
+
+    reader = threading.Thread(target=searching)
+    reader.start()
+    try:
+        for i in range(1, 40):
+            index.extend(frame(TWEETS, offset=i * len(TWEETS)))
+    finally:
+        done.set()
+        reader.join()
+    assert errors == []
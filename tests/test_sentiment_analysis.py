@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+import step_2_sentiment_analysis as scoring
+import step_3_dashboard as dashboard
+from step_2_sentiment_analysis import ScoreCache, StubModel, score_file
+
+SCHEMA = {'id', 'tweet', 'confidence_score', 'reasoning', 'timestamp', 'thread_id'}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(scoring, 'BACKOFF_SECONDS', 0.0)
+
+
+def write_posts(path, texts):
+    path.write_text(''.join(
+        json.dumps({'id': f'p{i}', 'tweet': text, 'timestamp': f'2025-08-01T{i % 24:02d}:00:00Z'}) + '\n'
+        for i, text in enumerate(texts)
+    ))
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+OPTIONS = dict(batch_size=2, concurrency=2, requests_per_minute=0)
+
+
+def test_schema_dedup_and_retries(tmp_path):
+    texts = ['I love it', 'bad and expensive', 'I  LOVE it', 'just a post', 'bad and expensive', 'great taste', '']
+    write_posts(tmp_path / 'posts.ndjson', texts)
+    output = tmp_path / 'scored.ndjson'
+    model = StubModel(fail_every=2)
+
+    counts = score_file(tmp_path / 'posts.ndjson', output, model, **OPTIONS)
+
+    records = read_records(output)
+    assert all(set(record) == SCHEMA for record in records)
+    assert sorted(record['id'] for record in records) == [f'p{i}' for i in range(6)]
+    assert all(0.0 <= record['confidence_score'] <= 1.0 for record in records)
+    scores = {record['id']: record['confidence_score'] for record in records}
+    # Reposts differing in case and spacing share one score and are sent once
+    assert scores['p0'] == scores['p2'] and scores['p1'] == scores['p4']
+    assert counts['duplicates'] == 2 and counts['scored'] == 4 and counts['empty'] == 1
+    assert counts['retries'] > 0 and counts['failed'] == 0
+    assert counts['requests'] == model.calls == counts['retries'] + 2
+
+
+def test_failed_batches_are_left_out_and_retried_on_rerun(tmp_path):
+    write_posts(tmp_path / 'posts.ndjson', [f'post number {i}' for i in range(6)])
+    output = tmp_path / 'scored.ndjson'
+
+    counts = score_file(tmp_path / 'posts.ndjson', output, StubModel(fail_every=3), max_attempts=1, **OPTIONS)
+    assert counts['failed'] == 2 and len(read_records(output)) == 4
+
+    counts = score_file(tmp_path / 'posts.ndjson', output, StubModel(), **OPTIONS)
+    assert counts['resumed'] == 4 and counts['scored'] == 2
+    assert sorted(record['id'] for record in read_records(output)) == [f'p{i}' for i in range(6)]
+
+
+def test_interrupted_run_resumes_from_output_and_cache(tmp_path):
+    texts = [f'post number {i}' for i in range(10)]
+    write_posts(tmp_path / 'posts.ndjson', texts)
+    output, cache_path = tmp_path / 'scored.ndjson', tmp_path / 'cache.ndjson'
+    cache = ScoreCache(str(cache_path))
+    score_file(tmp_path / 'posts.ndjson', output, StubModel(), cache=cache, **OPTIONS)
+    cache.close()
+    # Killed mid-write: four records and their scores written, the fifth of each cut off
+    for path, cut in ((output, 20), (cache_path, 10)):
+        lines = path.read_text().splitlines(keepends=True)
+        path.write_text(''.join(lines[:4]) + lines[4][:cut])
+
+    model = StubModel()
+    cache = ScoreCache(str(cache_path))
+    counts = score_file(tmp_path / 'posts.ndjson', output, model, cache=cache, **OPTIONS)
+    cache.close()
+    assert counts['resumed'] == 4 and counts['cached'] == 0 and counts['scored'] == 6 and model.calls == 3
+    records = read_records(output)
+    assert sorted(record['id'] for record in records) == [f'p{i}' for i in range(10)]
+    assert len(dashboard.load_sentiment_data(str(output))) == 10
+
+    # The cache alone is enough for a fresh output: nothing goes to the model
+    model = StubModel()
+    cache = ScoreCache(str(cache_path))
+    counts = score_file(tmp_path / 'posts.ndjson', tmp_path / 'again.ndjson', model, cache=cache, **OPTIONS)
+    cache.close()
+    assert counts['cached'] == 10 and model.calls == 0
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+import snapshot
+import step_3_dashboard as dashboard
+
+
+@pytest.fixture
+def snap_path(tmp_path):
+    texts = ['plain', 'café crème', '', '日本語のポスト', 'emoji 🙂🙂', None, 'naïve']
+    df = dashboard.prepare_data([
+        {'tweet': texts[i % len(texts)], 'reasoning': f'r{i} ü' * (i % 3), 'confidence_score': (i % 11) / 10,
+         'timestamp': f'2025-07-{1 + i % 28:02d}T{i % 24:02d}:00:00Z'}
+        for i in range(103)
+    ])
+    path = str(tmp_path / 'data.snap')
+    snapshot.write_snapshot(df, path)
+    return path
+
+
+@pytest.mark.parametrize('scan_bytes', [3, 64, 1 << 20])
+@pytest.mark.parametrize('chunk_size', [1, 10, 1000])
+def test_chunks_match_full_load(snap_path, monkeypatch, scan_bytes, chunk_size):
+    monkeypatch.setattr(snapshot, 'SCAN_BYTES', scan_bytes)
+    full = snapshot.load_snapshot(snap_path)
+    chunks = list(snapshot.iter_snapshot_chunks(snap_path, chunk_size))
+    assert max(len(chunk) for chunk in chunks) <= chunk_size
+    pd.testing.assert_frame_equal(pd.concat(chunks), full)
+
+
+def test_chunks_of_date_range(snap_path):
+    full = snapshot.load_snapshot(snap_path)
+    expected = dashboard.filter_date_range(full, '2025-07-05', '2025-07-09')
+    chunks = list(snapshot.iter_snapshot_chunks(snap_path, 4, '2025-07-05', '2025-07-09'))
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+    assert list(snapshot.iter_snapshot_chunks(snap_path, 4, '2026-01-01')) == []
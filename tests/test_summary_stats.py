@@ -0,0 +1,89 @@
+import math
+import random
+
+import pytest
+
+import step_3_dashboard as dashboard
+from aggregate_store import AggregateStore
+
+DETAILED_KEYS = {
+    'extremely_negative': 'Extremely Negative',
+    'clearly_negative': 'Clearly Negative',
+    'somewhat_negative': 'Somewhat Negative',
+    'neutral_detailed': 'Neutral',
+    'somewhat_positive': 'Somewhat Positive',
+    'clearly_positive': 'Clearly Positive',
+    'extremely_positive': 'Extremely Positive',
+}
+
+
+def masked_count_stats(df):
+    """generate_summary_stats as it was before the grouped pass: one boolean mask per category"""
+    total_posts = len(df)
+    negative_posts = len(df[df['broad_category'] == 'Negative'])
+    neutral_posts = len(df[df['broad_category'] == 'Neutral'])
+    positive_posts = len(df[df['broad_category'] == 'Positive'])
+    stats = {
+        'total_posts': total_posts,
+        'negative_posts': negative_posts,
+        'neutral_posts': neutral_posts,
+        'positive_posts': positive_posts,
+        'avg_confidence': df['confidence_score'].mean(),
+        'date_range': f"{df['day'].astype(str).min() if total_posts else math.nan} to "
+                      f"{df['day'].astype(str).max() if total_posts else math.nan}",
+        'negative_percentage': (negative_posts / total_posts) * 100 if total_posts > 0 else 0,
+        'neutral_percentage': (neutral_posts / total_posts) * 100 if total_posts > 0 else 0,
+        'positive_percentage': (positive_posts / total_posts) * 100 if total_posts > 0 else 0,
+    }
+    for key, category in DETAILED_KEYS.items():
+        stats[key] = len(df[df['sentiment_category'] == category])
+    return stats
+
+
+def random_records(rng, n):
+    records = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.05:
+            score = None  # missing: prepared as 0.5
+        elif roll < 0.1:
+            score = float('nan')
+        elif roll < 0.2:
+            score = rng.choice([-1.0, -0.01, 1.01, 3.0])  # out of range: 'Invalid Score'
+        else:
+            score = round(rng.random(), rng.choice([1, 2, 3]))
+        day = 1 + rng.randrange(60)
+        records.append({
+            'tweet': f'post {i}',
+            'reasoning': '',
+            'confidence_score': score,
+            'timestamp': f'2025-{6 + day // 31:02d}-{1 + day % 30:02d}T{rng.randrange(24):02d}:00:00Z',
+        })
+    return records
+
+
+def assert_same(actual, expected):
+    for key, value in expected.items():
+        if isinstance(value, float) and math.isnan(value):
+            assert math.isnan(actual[key]), key
+        elif isinstance(value, float):
+            assert actual[key] == pytest.approx(value, rel=1e-12), key
+        else:
+            assert actual[key] == value and type(actual[key]) is type(value), key
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_masked_counts(seed):
+    rng = random.Random(seed)
+    df = dashboard.prepare_data(random_records(rng, rng.choice([0, 1, 7, 250])))
+    expected = masked_count_stats(df)
+    assert_same(dashboard.generate_summary_stats(df), expected)
+    if len(df):
+        assert_same(dashboard.generate_summary_stats(df, aggregates=AggregateStore.from_frame(df)), expected)
+
+
+def test_empty_frame():
+    df = dashboard.prepare_data([])
+    stats = dashboard.generate_summary_stats(df)
+    assert_same(stats, masked_count_stats(df))
+    assert stats['total_posts'] == 0 and stats['date_range'] == 'nan to nan'
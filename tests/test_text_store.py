@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from text_store import TextStore
+
+
+def texts(labels, prefix):
+    return pd.DataFrame({
+        'tweet': [None if label % 4 == 3 else f'{prefix} café {label}' for label in labels],
+        'reasoning': [f'why {label}' for label in labels],
+    }, index=labels)
+
+
+def test_extend_keeps_earlier_rows_readable():
+    store = TextStore.from_frame(texts([2, 0, 1], 'first'))
+    before = store.column(pd.Index([0, 1, 2]), 'tweet')
+    store.extend(texts([5, 3, 4], 'second'))
+    assert list(store.labels) == [0, 1, 2, 3, 4, 5]
+    assert list(store.column(pd.Index([0, 1, 2]), 'tweet')) == list(before)
+    assert store.get(3, 'tweet') is None
+    assert store.get(5, 'tweet') == 'second café 5'
+    assert list(store.attach(pd.DataFrame(index=[4, 0]))['reasoning']) == ['why 4', 'why 0']
+
+
+def test_rejected_extend_leaves_the_store_unchanged():
+    store = TextStore.from_frame(texts([0, 1], 'first'))
+    nbytes = store.nbytes
+    with pytest.raises(ValueError):
+        store.extend(texts([1, 2], 'again'))
+    assert store.nbytes == nbytes and len(store) == 2
+    with pytest.raises(KeyError):
+        store.get(2, 'tweet')
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import step_3_dashboard as dashboard
+import time_pyramid
+from time_pyramid import TimePyramid
+
+
+def frame(hours, start='2025-07-28T00:00:00Z'):
+    base = pd.Timestamp(start)
+    return dashboard.prepare_data([
+        {
+            'tweet': f'post {i}', 'reasoning': '',
+            'confidence_score': None if i % 7 == 3 else (i % 10) / 10,
+            'timestamp': (base + pd.Timedelta(hours=hour)).isoformat(),
+        }
+        for i, hour in enumerate(hours)
+    ])
+
+
+def test_levels_agree_with_the_posts():
+    df = frame(range(0, 24 * 40, 5))
+    pyramid = TimePyramid.from_frame(df)
+    for level in time_pyramid.LEVELS:
+        buckets, chosen = pyramid.buckets(level=level)
+        assert chosen == level
+        assert buckets['tweet'].sum() == len(df)
+    days, _ = pyramid.buckets(level='day')
+    expected = df.groupby('day', observed=True)['confidence_score'].mean()
+    np.testing.assert_allclose(days['confidence_score'], expected.to_numpy())
+    assert list(days['date']) == list(expected.index)
+
+
+def test_weeks_start_on_monday():
+    # 2025-07-28 was a Monday
+    buckets, _ = TimePyramid.from_frame(frame([0, 24 * 6 + 23, 24 * 7])).buckets(level='week')
+    assert list(buckets['date']) == ['2025-07-28', '2025-08-04']
+    assert list(buckets['tweet']) == [2, 1]
+
+
+def test_merge_matches_one_pass():
+    first, second = frame(range(0, 300, 3)), frame(range(200, 500, 4))
+    merged = TimePyramid.from_frame(first).merge(TimePyramid.from_frame(second))
+    whole = TimePyramid.from_frame(dashboard.combine_prepared([first, second]))
+    for level in time_pyramid.LEVELS:
+        pd.testing.assert_frame_equal(merged.buckets(level=level)[0], whole.buckets(level=level)[0])
+
+
+def test_window_picks_the_finest_level_that_fits(monkeypatch):
+    monkeypatch.setattr(time_pyramid, 'MAX_BUCKETS', 48)
+    pyramid = TimePyramid.from_frame(frame(range(24 * 90)))
+    assert pyramid.choose_level('2025-08-01', '2025-08-01') == 'hour'
+    assert pyramid.choose_level('2025-08-01', '2025-08-20') == 'day'
+    assert pyramid.choose_level() == 'week'
+    buckets, level = pyramid.buckets(start='2025-08-01', end='2025-08-01')
+    assert level == 'hour'
+    assert buckets['date'].iloc[0] == '2025-08-01 00:00'
+    assert buckets['date'].iloc[-1] == '2025-08-01 23:00'
+
+
+def test_zoomed_time_figure(serve):
+    import app
+
+    assert set(app.TIME_FIGURES) == set(dashboard.TIME_FIGURES)
+    client, _ = serve(
+        json.dumps({'tweet': f'post {i}', 'reasoning': '', 'confidence_score': 0.5,
+                    'timestamp': f'2025-08-{1 + i % 20:02d}T{i % 24:02d}:00:00Z'}) + '\n'
+        for i in range(400)
+    )
+
+    response = client.get('/api/figures/timeline?from=2025-08-02&to=2025-08-02')
+    assert response.status_code == 200
+    dates = [point for trace in response.get_json()['data'] for point in trace.get('x', [])]
+    assert dates and all(str(point).startswith('2025-08-02') for point in dates)
+    assert client.get('/api/figures/timeline?level=fortnight').status_code == 400
@@ -0,0 +1,40 @@
+import step_3_dashboard as dashboard
+from aggregate_store import AggregateStore
+from word_frequency import WordFrequencyIndex
+
+WORDS = ['price', 'flavour', 'coffee', 'boycott', 'packaging', 'recipe']
+
+
+def frame():
+    return dashboard.prepare_data([
+        {
+            'tweet': f'{WORDS[i % 6]} {WORDS[(i * 5) % 6]} again',
+            'reasoning': '',
+            'confidence_score': 0.1 if i % 3 else 0.9,
+            'timestamp': f'2025-08-{1 + i % 10:02d}T{i % 24:02d}:00:00Z',
+        }
+        for i in range(200)
+    ])
+
+
+def test_day_window_matches_counting_the_slice():
+    df = frame()
+    index = WordFrequencyIndex.from_frame(df, stopwords=())
+    view = dashboard.filter_date_range(df, '2025-08-03', '2025-08-06')
+    expected = WordFrequencyIndex.from_frame(view, stopwords=())
+    window = index.between('2025-08-03', '2025-08-06')
+    for broad in ('Negative', 'Positive', None):
+        assert window.counts(broad_category=broad) == expected.counts(broad_category=broad)
+    assert window.top(3, broad_category='Negative') == expected.top(3, broad_category='Negative')
+    assert index.between().counts() == index.counts()
+
+
+def test_word_chart_from_the_store_window():
+    df = frame()
+    store = AggregateStore.from_frame(df)
+    view = dashboard.filter_date_range(df, '2025-08-02', '2025-08-04')
+    window = store.words.between(str(view['day'].iloc[0]), str(view['day'].iloc[-1]))
+    from_window = dashboard.create_figure('word_analysis', view, word_index=window)
+    from_slice = dashboard.create_figure('word_analysis', view)
+    assert [list(trace.x) for trace in from_window.data] == [list(trace.x) for trace in from_slice.data]
+    assert [list(trace.y) for trace in from_window.data] == [list(trace.y) for trace in from_slice.data]
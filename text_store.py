@@ -0,0 +1,114 @@
+"""Post text kept outside the prepared frame.
+
+In an object column every post is a separate Python ``str`` (about 50 bytes
+of header plus its characters) behind an 8-byte pointer, so the text columns
+dominate the frame's memory. A ``TextStore`` keeps each column as one UTF-8
+blob with 32- or 64-bit byte offsets, addressed by the frame's row labels
+(post ids), and decodes single posts or slices only when they are needed:
+the post details endpoint, or date-range views whose charts read the text.
+Blobs only grow, in place; ``extend`` swaps in the longer labels, offsets
+and null masks as one value, so a reader sees the rows before or after an
+append, never half of it.
+
+    texts = TextStore.from_frame(df)
+    df = df.drop(columns=texts.columns)
+    texts.get(post_id, 'tweet')
+    view = texts.attach(df.iloc[100:200])
+"""
+import numpy as np
+import pandas as pd
+
+
+class TextStore:
+    """Append-only UTF-8 storage for text columns, addressed by row label"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        # bytearray appends are amortized, so the stored text is not copied on every extend
+        self._blobs = {column: bytearray() for column in self.columns}
+        self._rows = (
+            pd.Index([], dtype='int64'),
+            {column: np.zeros(1, dtype=np.int32) for column in self.columns},  # offsets
+            {column: np.zeros(0, dtype=bool) for column in self.columns},  # nulls
+        )
+
+    @property
+    def labels(self):
+        return self._rows[0]
+
+    @classmethod
+    def from_frame(cls, df, columns=('tweet', 'reasoning')):
+        """Copy ``columns`` of ``df`` (kept by its row labels) into a new store"""
+        store = cls([column for column in columns if column in df.columns])
+        store.extend(df)
+        return store
+
+    def extend(self, df):
+        """Append the text columns of ``df``, whose row labels must all exceed those stored"""
+        # Stored in label order so lookups are a binary search away
+        df = df[self.columns].sort_index()
+        old_labels, old_offsets, old_nulls = self._rows
+        if not df.index.is_unique or (len(old_labels) and len(df) and df.index[0] <= old_labels[-1]):
+            raise ValueError('TextStore.extend needs new, unique row labels above the stored ones')
+        # Encode everything before touching the store, so a bad value leaves it as it was
+        encoded = {}
+        for column in self.columns:
+            values = df[column]
+            nulls = values.isna().to_numpy()
+            encoded[column] = ([b'' if null else str(value).encode('utf-8') for value, null in zip(values.tolist(), nulls)], nulls)
+        offsets, nulls = {}, {}
+        for column, (texts, column_nulls) in encoded.items():
+            blob = self._blobs[column]
+            lengths = np.fromiter((len(b) for b in texts), dtype=np.int64, count=len(texts))
+            offsets[column] = _narrow(np.concatenate([old_offsets[column].astype(np.int64), len(blob) + np.cumsum(lengths)]))
+            nulls[column] = np.concatenate([old_nulls[column], column_nulls])
+            # Readers of the old rows only slice bytes before the current end
+            blob += b''.join(texts)
+        self._rows = (old_labels.append(df.index), offsets, nulls)
+        return self
+
+    def _decode(self, rows, column, position):
+        _, offsets, nulls = rows
+        if nulls[column][position]:
+            return None
+        offsets = offsets[column]
+        return self._blobs[column][offsets[position]:offsets[position + 1]].decode('utf-8')
+
+    def _positions(self, labels, rows):
+        positions = rows[0].get_indexer(labels)
+        if (positions < 0).any():
+            raise KeyError([label for label, p in zip(labels, positions) if p < 0][:5])
+        return positions
+
+    def get(self, label, column):
+        """Text of one row; raises ``KeyError`` for unknown labels"""
+        rows = self._rows
+        return self._decode(rows, column, self._positions([label], rows)[0])
+
+    def column(self, labels, column):
+        """Texts for ``labels`` as an object array, in the given order"""
+        rows = self._rows
+        values = np.empty(len(labels), dtype=object)
+        values[:] = [self._decode(rows, column, p) for p in self._positions(labels, rows)]
+        return values
+
+    def attach(self, df):
+        """``df`` with the stored text columns added back for its rows"""
+        return df.assign(**{column: self.column(df.index, column) for column in self.columns})
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def nbytes(self):
+        """Memory held by the blobs, offsets, null masks and labels"""
+        labels, offsets, nulls = self._rows
+        return sum(
+            len(self._blobs[column]) + offsets[column].nbytes + nulls[column].nbytes
+            for column in self.columns
+        ) + labels.memory_usage()
+
+
+def _narrow(offsets):
+    """``offsets`` as int32 when the blob is small enough"""
+    return offsets.astype(np.int32) if offsets[-1] <= np.iinfo(np.int32).max else offsets
@@ -0,0 +1,173 @@
+"""Multi-resolution time buckets behind the timeline and volume charts.
+
+Posts are counted once per wall-clock hour: the score sum, the post count and
+a ``score_sketch`` quantile sketch of each hour. The day, week (starting
+Monday) and month levels are rolled up from the hours when first asked for,
+so all levels come from one pass over the posts and always agree, and two
+pyramids (chunks, shards, appends) merge hour by hour.
+
+``choose_level`` picks the finest level that draws at most ``MAX_BUCKETS``
+buckets over a time window: hours when zoomed in on a few days, months over
+years of history. A chart's payload therefore stays about the same size
+however much history there is.
+
+    pyramid = TimePyramid.from_frame(df)
+    buckets, level = pyramid.buckets(start='2025-08-01', end='2025-08-03')
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import score_sketch
+
+LEVELS = ('hour', 'day', 'week', 'month')
+# Most buckets a chart draws before a coarser level is used
+MAX_BUCKETS = int(os.environ.get('TIME_MAX_BUCKETS', 500))
+
+
+def wall_clock_hours(timestamps):
+    """Each timestamp's wall-clock hour, as naive ``datetime64[h]`` values"""
+    if timestamps.dtype == object:
+        # Mixed UTC offsets: keep each post's own local time, like the day column
+        local = pd.to_datetime(timestamps.map(lambda t: t.replace(tzinfo=None)))
+    else:
+        local = timestamps.dt.tz_localize(None) if timestamps.dt.tz is not None else timestamps
+    return local.to_numpy().astype('datetime64[h]')
+
+
+def level_starts(hours, level):
+    """Start hour of the ``level`` bucket holding each hour"""
+    if level == 'hour':
+        return hours
+    days = hours.astype('datetime64[D]')
+    if level == 'day':
+        starts = days
+    elif level == 'week':
+        # 1970-01-01 was a Thursday, so (days + 3) % 7 counts days since Monday
+        starts = days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+    elif level == 'month':
+        starts = hours.astype('datetime64[M]')
+    else:
+        raise ValueError(f'Unknown time level {level!r}; use one of {", ".join(LEVELS)}')
+    return starts.astype('datetime64[h]')
+
+
+def bucket_labels(starts, level):
+    """Chart labels of bucket starts: '2025-08-01 13:00', '2025-08-01' or '2025-08'"""
+    if level == 'hour':
+        return [label.replace('T', ' ') + ':00' for label in np.datetime_as_string(starts, unit='h').tolist()]
+    return np.datetime_as_string(starts, unit='M' if level == 'month' else 'D').tolist()
+
+
+def _hour_bound(value, end=False):
+    """A window bound as a wall-clock hour; a bare end date covers its whole day"""
+    text = str(value).strip()
+    moment = pd.Timestamp(text)
+    if moment.tzinfo is not None:
+        moment = moment.tz_localize(None)
+    if end and len(text) == 10:
+        moment += pd.Timedelta(hours=23)
+    return np.datetime64(moment.floor('h').to_datetime64(), 'h')
+
+
+def _reduce(keys, sums, counts, sketches):
+    """Add up the rows of sorted ``keys`` that share a key"""
+    if len(keys) == 0:
+        return keys, sums, counts, sketches
+    unique, first = np.unique(keys, return_index=True)
+    return (
+        unique,
+        np.add.reduceat(sums, first),
+        np.add.reduceat(counts, first),
+        np.add.reduceat(sketches, first, axis=0),
+    )
+
+
+class TimePyramid:
+    """Per-hour score sums, post counts and score sketches, rolled up into coarser levels"""
+
+    def __init__(self, hours=None, sums=None, counts=None, sketches=None):
+        self.hours = np.zeros(0, dtype='datetime64[h]') if hours is None else hours  # ascending
+        self.sums = np.zeros(0) if sums is None else sums
+        self.counts = np.zeros(0, dtype=np.int64) if counts is None else counts
+        if sketches is None:
+            sketches = np.zeros((0, score_sketch.SKETCH_BINS), dtype=np.int32)
+        self.sketches = sketches  # [hour, sketch bin]
+        self._levels = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Pyramid of a prepared frame's ``timestamp`` and ``confidence_score`` columns"""
+        hours, rows = np.unique(wall_clock_hours(df['timestamp']), return_inverse=True)
+        scores = df['confidence_score'].to_numpy(dtype='float64')
+        return cls(
+            hours,
+            np.bincount(rows, weights=np.nan_to_num(scores), minlength=len(hours)),
+            np.bincount(rows, minlength=len(hours)).astype(np.int64),
+            score_sketch.grouped_counts(rows, scores, len(hours)).astype(np.int32),
+        )
+
+    def merge(self, other):
+        """Add another pyramid's hours into this one"""
+        hours = np.concatenate([self.hours, other.hours])
+        order = np.argsort(hours, kind='stable')
+        self.hours, self.sums, self.counts, self.sketches = _reduce(
+            hours[order],
+            np.concatenate([self.sums, other.sums])[order],
+            np.concatenate([self.counts, other.counts])[order],
+            np.concatenate([self.sketches, other.sketches])[order],
+        )
+        self._levels = {}
+        return self
+
+    def level(self, level):
+        """``(starts, sums, counts, sketches)`` of the non-empty buckets of ``level``, by start"""
+        if level not in self._levels:
+            self._levels[level] = _reduce(level_starts(self.hours, level), self.sums, self.counts, self.sketches)
+        return self._levels[level]
+
+    def _window(self, level, start=None, end=None):
+        starts = self.level(level)[0]
+        lo = 0 if start in (None, '') else np.searchsorted(starts, level_starts(np.array([_hour_bound(start)]), level)[0])
+        hi = len(starts) if end in (None, '') else np.searchsorted(starts, _hour_bound(end, end=True), side='right')
+        return int(lo), int(max(lo, hi))
+
+    def choose_level(self, start=None, end=None):
+        """Finest level with at most ``MAX_BUCKETS`` buckets in the window, else 'month'"""
+        for level in LEVELS[:-1]:
+            lo, hi = self._window(level, start, end)
+            if hi - lo <= MAX_BUCKETS:
+                return level
+        return LEVELS[-1]
+
+    def buckets(self, level=None, start=None, end=None):
+        """``(frame, level)``: the window's buckets at ``level`` (default: ``choose_level``)
+
+        The frame has the bucket label (``date``), mean ``confidence_score``,
+        post count (``tweet``) and the ``score_sketch.BAND_QUANTILES`` of the
+        scores (``p10``, ``p50``, ``p90``).
+        """
+        level = level or self.choose_level(start, end)
+        lo, hi = self._window(level, start, end)
+        starts, sums, counts, sketches = (values[lo:hi] for values in self.level(level))
+        sketches = sketches.reshape(len(starts), score_sketch.SKETCH_BINS)
+        # Sketches leave out missing scores, so their totals are the scored posts
+        scored = sketches.sum(axis=1)
+        bands = score_sketch.quantiles(sketches)
+        frame = pd.DataFrame({
+            'date': bucket_labels(starts, level),
+            'confidence_score': np.where(scored > 0, sums / np.maximum(scored, 1), np.nan),
+            'tweet': counts,
+        })
+        for i, q in enumerate(score_sketch.BAND_QUANTILES):
+            frame[f'p{round(q * 100)}'] = bands[:, i]
+        return frame, level
+
+    def __len__(self):
+        return len(self.hours)
+
+    @property
+    def nbytes(self):
+        """Memory of the hourly arrays (rolled-up levels are smaller and rebuilt on demand)"""
+        return self.hours.nbytes + self.sums.nbytes + self.counts.nbytes + self.sketches.nbytes
@@ -0,0 +1,167 @@
+"""Word-frequency counting for the dashboard's word analysis.
+
+Posts are tokenized exactly once, into counters bucketed by
+``(broad_category, day)``. Any view of the data (a category, a date range,
+or both) is answered by merging the matching buckets, so date-filtered
+charts reuse the same counts instead of re-scanning text.
+Memory is proportional to the distinct words per bucket, never to the text.
+"""
+import heapq
+import os
+import re
+import sys
+from collections import Counter
+from functools import lru_cache
+
+# Brand names are added per brand, see step_3_dashboard.brand_stopwords
+DEFAULT_STOPWORDS = frozenset([
+    'that', 'this', 'with', 'they', 'have', 'from', 'their', 'would',
+    'been', 'said', 'each', 'more', 'some', 'what', 'them',
+])
+
+# Posts joined per regex scan; bounds the temporary string size
+TOKENIZE_BATCH = 1000
+
+# Size of a typical counted word's str object, for memory estimates
+WORD_ENTRY_BYTES = 56
+
+
+def load_stopwords(path=None, extra=()):
+    """Default stopwords plus words from ``path`` (or $STOPWORDS_FILE) and ``extra``.
+
+    The file holds one word per line; blank lines and ``#`` comments are ignored.
+    """
+    words = set(DEFAULT_STOPWORDS)
+    path = path or os.environ.get('STOPWORDS_FILE')
+    if path:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                word = line.split('#', 1)[0].strip().lower()
+                if word:
+                    words.add(word)
+    words.update(word.lower() for word in extra)
+    return frozenset(words)
+
+
+@lru_cache(maxsize=None)
+def _word_pattern(min_length):
+    return re.compile(r'\b[a-zA-Z]{' + str(min_length) + r',}\b')
+
+
+def tokenize(text, min_length=4):
+    """Lowercase words of at least ``min_length`` ASCII letters, in order"""
+    return _word_pattern(min_length).findall(text.lower())
+
+
+# Put between texts tokenized in one scan (ASCII record separator): not a
+# letter, so it never joins two words, and unlike NUL numpy keeps it in strings
+DOCUMENT_SEPARATOR = '\x1e'
+
+
+@lru_cache(maxsize=None)
+def _separated_pattern(min_length):
+    return re.compile(DOCUMENT_SEPARATOR + '|' + _word_pattern(min_length).pattern)
+
+
+def tokenize_batch(texts, min_length=4):
+    """Tokens of several texts from a single regex scan, the same words ``tokenize`` finds
+
+    The texts' tokens come in order with one ``DOCUMENT_SEPARATOR`` between
+    consecutive texts, so the result holds exactly ``len(texts) - 1`` of them.
+    Texts that are not strings (missing) have no tokens.
+    """
+    texts = [text if isinstance(text, str) else '' for text in texts]
+    joined = DOCUMENT_SEPARATOR.join(texts)
+    if joined.count(DOCUMENT_SEPARATOR) != max(len(texts) - 1, 0):
+        joined = DOCUMENT_SEPARATOR.join(text.replace(DOCUMENT_SEPARATOR, ' ') for text in texts)
+    return _separated_pattern(min_length).findall(joined.lower())
+
+
+def count_words(texts, stopwords=DEFAULT_STOPWORDS, min_length=4):
+    """Count non-stopword tokens across ``texts`` without joining them all at once"""
+    pattern = _word_pattern(min_length)
+    counts = Counter()
+    texts = list(texts)
+    for start in range(0, len(texts), TOKENIZE_BATCH):
+        chunk = ' '.join(texts[start:start + TOKENIZE_BATCH]).lower()
+        counts.update(word for word in pattern.findall(chunk) if word not in stopwords)
+    return counts
+
+
+def top_words(counts, k):
+    """The ``k`` most frequent words via partial selection
+
+    Ties go alphabetically, so the result does not depend on the order posts
+    were counted in (chunks, shards or appends).
+    """
+    return heapq.nsmallest(k, counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+class WordFrequencyIndex:
+    """Mergeable word counters keyed by (broad_category, day)"""
+
+    def __init__(self, stopwords=None, min_length=4):
+        self.stopwords = load_stopwords() if stopwords is None else frozenset(stopwords)
+        self.min_length = min_length
+        self.buckets = {}
+
+    @classmethod
+    def from_frame(cls, df, stopwords=None, min_length=4):
+        """Index the ``tweet`` column of a prepared frame"""
+        index = cls(stopwords=stopwords, min_length=min_length)
+        index.add_frame(df)
+        return index
+
+    def add_frame(self, df):
+        """Tokenize the posts of a prepared frame into their buckets"""
+        for key, tweets in df.groupby(['broad_category', 'day'], sort=True, observed=True)['tweet']:
+            counts = count_words(tweets.tolist(), self.stopwords, self.min_length)
+            self._bucket(key).update(counts)
+
+    def _bucket(self, key):
+        key = tuple(str(part) for part in key)
+        if key not in self.buckets:
+            self.buckets[key] = Counter()
+        return self.buckets[key]
+
+    def merge(self, other):
+        """Add another index's counts into this one"""
+        for key, counts in other.buckets.items():
+            self._bucket(key).update(counts)
+        return self
+
+    def counts(self, broad_category=None, start_day=None, end_day=None):
+        """Merged counts for the buckets matching every given filter
+
+        Days are ``YYYY-MM-DD`` strings and both bounds are inclusive.
+        """
+        merged = Counter()
+        for (broad, day) in self.buckets:
+            if broad_category is not None and broad != broad_category:
+                continue
+            if (start_day is not None and day < start_day) or (end_day is not None and day > end_day):
+                continue
+            merged.update(self.buckets[(broad, day)])
+        return merged
+
+    def between(self, start_day=None, end_day=None):
+        """Index of just the days in [start_day, end_day], sharing this index's counters
+
+        Nothing is tokenized or copied, so a date-range view of a dashboard
+        costs a pass over the bucket keys.
+        """
+        window = WordFrequencyIndex(stopwords=self.stopwords, min_length=self.min_length)
+        window.buckets = {
+            (broad, day): counts for (broad, day), counts in self.buckets.items()
+            if (start_day is None or day >= start_day) and (end_day is None or day <= end_day)
+        }
+        return window
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the counters: hash tables plus one short word string per entry"""
+        return sum(sys.getsizeof(counts) + WORD_ENTRY_BYTES * len(counts) for counts in self.buckets.values())
+
+    def top(self, k, **filters):
+        """Top ``k`` ``(word, count)`` pairs for the given filters"""
+        return top_words(self.counts(**filters), k)